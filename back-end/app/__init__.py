@@ -7,16 +7,34 @@ from .routes.auth import auth_bp
 from .routes.records import records_bp
 from .routes.summary import summary_bp
 from .routes.upload import upload_bp
+from .commands import register_commands
+from .utils import SpooledUploadRequest
+from .auth_cache import init_auth_cache
+from .response_cache import init_response_cache
+from .search import include_object
+from .json_provider import init_json_provider
+from .engine import init_engine
+from .metrics import init_metrics
+from .diagnostics import init_diagnostics
 
 
-def create_app():
+def create_app(config_class=Config):
     app = Flask(__name__)
-    app.config.from_object(Config)
+    app.config.from_object(config_class)
+    app.request_class = SpooledUploadRequest
+    init_json_provider(app)
 
     # 初始化扩展
     db.init_app(app)
-    migrate.init_app(app, db)
-    cors.init_app(app)
+    init_engine(app)
+    # 全文索引表不在模型中，自动生成迁移时忽略
+    migrate.init_app(app, db, include_object=include_object)
+    # 允许前端读取条件请求和增量同步用到的响应头
+    cors.init_app(app, expose_headers=['ETag', 'X-Change-Token'])
+    init_auth_cache(app)
+    init_response_cache(app)
+    init_metrics(app)
+    init_diagnostics(app)
 
     # 注册蓝图
     app.register_blueprint(auth_bp)
@@ -24,4 +42,7 @@ def create_app():
     app.register_blueprint(summary_bp)
     app.register_blueprint(upload_bp)
 
+    # 注册命令行命令
+    register_commands(app)
+
     return app
@@ -0,0 +1,112 @@
+# app/auth_cache.py
+
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect
+from .models import User
+
+# 传给路由的轻量用户对象，只包含认证后需要的字段，不绑定数据库会话
+AuthUser = namedtuple('AuthUser', ['id', 'username'])
+
+
+class AuthCache:
+    """
+    令牌到用户身份的 LRU 缓存，带过期时间。
+    命中时跳过 jwt.decode 和用户查询；条目在缓存有效期和令牌本身的 exp 中较早者到期。
+    用户被删除或修改密码时由模型事件清除该用户的所有条目；
+    其他进程中的修改无法通知到本进程，最长在 ttl 秒后生效。
+    """
+
+    def __init__(self, max_size=1024, ttl=60):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, token):
+        """返回缓存的 AuthUser，未命中或已过期时返回 None。"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    del self._entries[token]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, token, user, token_exp=None):
+        """缓存令牌对应的用户，token_exp 为令牌的 exp（Unix 时间戳）。"""
+        expires_at = time.time() + self.ttl
+        if token_exp is not None:
+            expires_at = min(expires_at, token_exp)
+        with self._lock:
+            self._entries[token] = (user, expires_at)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate_user(self, user_id):
+        """清除某个用户的所有缓存条目。"""
+        with self._lock:
+            tokens = [token for token, (user, _) in self._entries.items() if user.id == user_id]
+            for token in tokens:
+                del self._entries[token]
+            self.invalidations += len(tokens)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """返回缓存大小和命中情况，hit_ratio 为命中次数占查询次数的比例。"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            }
+
+
+def init_auth_cache(app):
+    """按配置创建认证缓存并保存到 app.extensions，AUTH_CACHE_SIZE 或 AUTH_CACHE_TTL 为 0 时不启用。"""
+    size, ttl = app.config['AUTH_CACHE_SIZE'], app.config['AUTH_CACHE_TTL']
+    app.extensions['auth_cache'] = AuthCache(size, ttl) if size > 0 and ttl > 0 else None
+
+
+def get_auth_cache():
+    """返回当前应用的认证缓存，未启用时返回 None。"""
+    return current_app.extensions.get('auth_cache')
+
+
+def _invalidate(user_id):
+    if has_app_context():
+        cache = get_auth_cache()
+        if cache is not None:
+            cache.invalidate_user(user_id)
+
+
+@event.listens_for(User, 'after_delete')
+def _user_deleted(mapper, connection, target):
+    _invalidate(target.id)
+
+
+@event.listens_for(User, 'after_update')
+def _user_updated(mapper, connection, target):
+    if inspect(target).attrs.password_hash.history.has_changes():
+        _invalidate(target.id)
@@ -0,0 +1,360 @@
+# app/commands.py
+
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import event, exc
+from .config import Config
+from .extensions import db
+from .engine import sqlite_pragmas
+from .models import Record
+from .rollup import rebuild_rollups, find_rollup_mismatches
+from .search import rebuild_search_index, index_records_after, get_search_backend
+
+# EXPLAIN QUERY PLAN 中表示全表（或全索引）扫描的行，例如 "SCAN record"。
+# FTS5 虚拟表使用了 MATCH 或 rowid 条件时显示为 "SCAN record_search VIRTUAL TABLE INDEX 0:M..."（冒号后非空），
+# 走的是全文索引或 rowid 查找，不算全表扫描
+_SCAN_PATTERN = re.compile(r'^SCAN (?!CONSTANT ROW)(?!\()(?!\S+ VIRTUAL TABLE INDEX \d+:\S)')
+
+# 在子进程中创建应用，输出耗时、峰值内存（字节）和已加载的模块。
+# Linux 上 ru_maxrss 在 exec 后会保留父进程的峰值（在 pytest 等较大的进程中调用时偏大），
+# 因此优先读取 /proc/self/status 中本进程的 VmHWM（KiB）；macOS 的 ru_maxrss 单位为字节
+_STARTUP_PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+from app import create_app
+create_app()
+elapsed = time.perf_counter() - start
+try:
+    with open('/proc/self/status') as status:
+        rss = next(int(line.split()[1]) for line in status if line.startswith('VmHWM:')) * 1024
+except (OSError, StopIteration):
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    rss = rss if sys.platform == 'darwin' else rss * 1024
+print(json.dumps({"elapsed": elapsed, "rss": rss, "modules": sorted(sys.modules)}))
+"""
+
+# 应用启动时不应加载的重型模块，它们只在导入文件时按需加载
+_LAZY_MODULES = ('pandas', 'numpy', 'openpyxl')
+
+
+def _route_requests(client, headers):
+    """
+    查询计划检查覆盖的路由请求。
+    新增涉及数据库查询的路由时，请在这里补充相应的请求。
+    """
+    yield client.get('/records', headers=headers)
+    page = client.get('/records?limit=1', headers=headers).get_json()
+    yield client.get(f"/records?limit=1&cursor={page['next_cursor']}", headers=headers)
+    yield client.get('/records?stream=ndjson', headers=headers)
+    yield client.get('/records?start_date=2024-05-01&end_date=2024-05-31&type=expense&category=餐饮,交通'
+                     '&min_amount=1&max_amount=100&note=a&sort=-date&fields=id,amount', headers=headers)
+    yield client.get('/records?sort=-amount&limit=1', headers=headers)
+    amount_page = client.get('/records?sort=amount&limit=1', headers=headers).get_json()
+    yield client.get(f"/records?sort=amount&limit=1&cursor={amount_page['next_cursor']}", headers=headers)
+    for period in ['year', 'month', 'day', 'overall']:
+        yield client.get(f'/summary?period={period}', headers=headers)
+    yield client.get('/summary?period=custom&start_date=2024-01-01&end_date=2024-12-31', headers=headers)
+    yield client.get('/summary_pie?period=overall', headers=headers)
+    yield client.get('/summary_pie?period=year&year=2024', headers=headers)
+    yield client.get('/summary_pie?period=month&year=2024&month=5', headers=headers)
+    yield client.get('/summary_pie?period=day&year=2024&month=5&day=1', headers=headers)
+    yield client.put(f"/records/{page['records'][0]['id']}", json={"amount": 1.0}, headers=headers)
+    yield client.delete(f"/records/{page['records'][0]['id']}", headers=headers)
+    yield client.get('/records?since=0', headers=headers)
+    created = client.post('/records/batch', json={"operations": [
+        {"op": "create", "amount": 1.0, "category": "餐饮", "type": "expense"},
+        {"op": "create", "amount": 2.0, "category": "餐饮", "type": "expense"},
+    ]}, headers=headers).get_json()['results']
+    yield client.post('/records/batch', json={"operations": [
+        {"op": "update", "id": created[0]['id'], "amount": 3.0},
+        {"op": "delete", "id": created[1]['id']},
+    ]}, headers=headers)
+    yield client.get('/records/search?q=午饭', headers=headers)
+    yield client.get('/records/search?q=餐&limit=1&offset=1', headers=headers)
+
+
+@click.command('check-query-plans')
+def check_query_plans():
+    """
+    检查路由查询是否走索引（仅 SQLite）。
+    在临时数据库上调用各个路由，捕获执行的 SQL，并对每条语句执行 EXPLAIN QUERY PLAN。
+    只要有语句退化为全表扫描，命令即以非零状态退出，可直接用于 CI。
+    """
+    from . import create_app
+
+    tmp_dir = tempfile.mkdtemp()
+    config_class = type('QueryPlanConfig', (Config,), {
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(tmp_dir, 'query_plan.db'),
+    })
+    app = create_app(config_class)
+    failures = []
+
+    try:
+        with app.app_context():
+            db.create_all()
+            client = app.test_client()
+            client.post('/register', json={"username": "plan_check", "password": "plan_check"})
+            token = client.post('/login', json={"username": "plan_check", "password": "plan_check"}).get_json()['token']
+            headers = {"Authorization": token}
+            for i, (category, type_data) in enumerate([("工资", "income"), ("餐饮", "expense"), ("交通", "expense")]):
+                client.post('/records', json={"amount": 10.0 + i, "category": category, "type": type_data,
+                                              "timeStamp": 1714537200000 + i * 86400000, "note": "午饭"},
+                            headers=headers)
+
+            statements = []
+
+            def capture(conn, cursor, statement, parameters, context, executemany):
+                if not executemany and statement.lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE')):
+                    statements.append((statement, parameters))
+
+            event.listen(db.engine, 'before_cursor_execute', capture)
+            try:
+                for response in _route_requests(client, headers):
+                    if response.status_code >= 400:
+                        raise click.ClickException(f"{response.request.path} 返回 {response.status_code}")
+                    response.get_data()
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', capture)
+
+            with db.engine.connect() as conn:
+                for statement, parameters in dict.fromkeys(statements):
+                    plan = conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).all()
+                    scans = [row[-1] for row in plan if _SCAN_PATTERN.match(row[-1])]
+                    if scans:
+                        failures.append((statement, scans))
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    click.echo(f"共检查 {len(dict.fromkeys(statements))} 条语句。")
+    for statement, scans in failures:
+        click.echo(f"\n全表扫描：{'; '.join(scans)}\n{statement}", err=True)
+    if failures:
+        raise SystemExit(1)
+    click.echo("所有路由查询均使用索引。")
+
+
+@click.command('check-startup')
+@click.option('--runs', type=int, default=5, show_default=True, help='启动次数，取最好的一次。')
+@click.option('--max-seconds', type=float, default=1.5, show_default=True, help='导入并创建应用的耗时上限（秒）。')
+@click.option('--max-rss', type=float, default=96, show_default=True, help='创建应用后进程峰值内存上限（MiB）。')
+@click.option('--top', type=int, default=10, show_default=True, help='列出耗时最多的几个导入。')
+def check_startup(runs, max_seconds, max_rss, top):
+    """
+    检查应用冷启动的耗时和内存（仅 Unix）。
+    在新的 Python 进程中以 -X importtime 导入 app 并调用 create_app，重复多次取最好的一次；
+    pandas 等重型模块被提前加载、或耗时/内存超出上限时以非零状态退出，可直接用于 CI。
+    """
+    back_end = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [back_end, os.environ.get('PYTHONPATH')])))
+    best, best_rss = None, None
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', _STARTUP_PROBE],
+                                cwd=back_end, env=env, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise click.ClickException(f"启动失败：\n{result.stderr[-2000:]}")
+        probe = json.loads(result.stdout.strip().splitlines()[-1])
+        probe['importtime'] = result.stderr
+        if best is None or probe['elapsed'] < best['elapsed']:
+            best = probe
+        best_rss = probe['rss'] if best_rss is None else min(best_rss, probe['rss'])
+
+    # -X importtime 每行格式为 "import time: 自身耗时 | 累计耗时 | 模块名"，模块名前的缩进表示嵌套层级
+    imports = []
+    for line in best['importtime'].splitlines():
+        parts = line.split('|')
+        if len(parts) == 3 and parts[1].strip().isdigit() and parts[2].startswith('   ') \
+                and not parts[2].startswith('     '):
+            imports.append((int(parts[1]), parts[2].strip()))
+    imports.sort(reverse=True)
+
+    elapsed, rss = best['elapsed'], best_rss / 1024 / 1024
+    click.echo(f"启动耗时 {elapsed:.3f}s（上限 {max_seconds}s），峰值内存 {rss:.1f} MiB（上限 {max_rss} MiB）")
+    click.echo("耗时最多的导入：")
+    for cumulative, name in imports[:top]:
+        click.echo(f"  {cumulative / 1000:>8.1f}ms  {name}")
+
+    failures = []
+    loaded = [name for name in _LAZY_MODULES if name in best['modules']]
+    if loaded:
+        failures.append(f"启动时加载了 {', '.join(loaded)}，应改为在使用处按需导入")
+    if elapsed > max_seconds:
+        failures.append(f"启动耗时 {elapsed:.3f}s 超过上限 {max_seconds}s")
+    if rss > max_rss:
+        failures.append(f"峰值内存 {rss:.1f} MiB 超过上限 {max_rss} MiB")
+    for failure in failures:
+        click.echo(failure, err=True)
+    if failures:
+        raise SystemExit(1)
+    click.echo("启动耗时和内存均在预算内。")
+
+
+@click.command('seed')
+@click.option('--users', type=int, default=1000, show_default=True, help='新建的用户数。')
+@click.option('--records', type=int, default=1000000, show_default=True, help='记录总数，按帕累托分布分给各用户。')
+@click.option('--seed', 'random_seed', type=int, default=0, show_default=True, help='随机数种子，相同的种子生成相同的账本。')
+@click.option('--workers', type=int, default=os.cpu_count() or 1, show_default='CPU 核数',
+              help='并行生成和写入的进程数，按用户分片。')
+@click.option('--prefix', default='seed', show_default=True, help='用户名前缀，用户名为前缀加序号。')
+@click.option('--password', default='password', show_default=True, help='所有新用户的密码。')
+@click.option('--start', type=click.DateTime(['%Y-%m-%d']), default='2020-01-01', show_default=True,
+              help='记录时间范围的开始日期。')
+@click.option('--end', type=click.DateTime(['%Y-%m-%d']), default='2025-01-01', show_default=True,
+              help='记录时间范围的结束日期（不含）。')
+@click.option('--chunk-size', type=int, default=100000, show_default=True, help='每次 executemany 写入的记录数。')
+@click.option('--cache-mib', type=int, default=512, show_default=True, help='写入期间 SQLite 页缓存的大小（MiB）。')
+@click.option('--keep-indexes', is_flag=True, help='写入期间保留记录表的索引（默认先删除，写完后重建）。')
+@click.option('--search-index', is_flag=True, help='写完后为新记录建立全文索引（SQLite 上每百万条约需 7 秒）。')
+def seed(users, records, random_seed, workers, prefix, password, start, end, chunk_size, cache_mib, keep_indexes,
+         search_index):
+    """
+    生成大量模拟用户和记录，用于压测和预发环境。
+    记录用 NumPy 按用户生成（见 app/synthetic.py），通过 executemany 批量写入，并直接写入每日汇总。
+    多个进程按用户分片并行生成：SQLite 上各进程写入各自的临时分片文件，再由主进程合并；其他数据库各进程直接写入。
+    SQLite 上写入期间关闭回滚日志和同步、加大页缓存，写完后恢复为 SQLITE_* 配置的值。
+    写入期间会独占数据库，请先停止应用；中途中断可能损坏 SQLite 数据库。
+    """
+    # NumPy 只在这个命令中使用，不在应用启动时导入
+    from .synthetic import create_users, records_per_user, shard_users, load_users, seed_shard, merge_shard, \
+        set_pragmas, BULK_LOAD_PRAGMAS
+
+    if users <= 0 or records < 0 or workers <= 0:
+        raise click.BadParameter('--users 和 --workers 必须为正数，--records 不能为负数。')
+    start, end = start.date(), end.date()
+    if end <= start:
+        raise click.BadParameter('--end 必须晚于 --start。')
+    engine = db.engine
+    is_sqlite = engine.dialect.name == 'sqlite'
+    indexes = [] if keep_indexes else sorted(Record.__table__.indexes, key=lambda index: index.name)
+    started = time.perf_counter()
+
+    def step(message, since):
+        click.echo(f"{message}：{time.perf_counter() - since:.1f}s")
+        return time.perf_counter()
+
+    # 整个过程使用同一个连接，写入期间的 PRAGMA 只作用于它；SQLite 切换日志模式时不能有其他连接
+    with engine.connect() as connection:
+        if is_sqlite:
+            applied = set_pragmas(connection, BULK_LOAD_PRAGMAS + (('cache_size', -cache_mib * 1024),
+                                                                  ('threads', min(workers, 8))))
+            if str(applied['journal_mode']).lower() != 'off':
+                click.echo(f"数据库仍有其他连接，日志模式保持为 {applied['journal_mode']}，写入会变慢。", err=True)
+        try:
+            try:
+                user_ids = create_users(connection, users, password, prefix)
+            except exc.IntegrityError:
+                raise click.ClickException(f"用户名 {prefix}1 等已存在，请换一个 --prefix。")
+            last_id = connection.exec_driver_sql("SELECT coalesce(max(id), 0) FROM record").scalar()
+            for index in indexes:
+                index.drop(connection)
+            connection.commit()
+            since = step(f"创建 {users} 个用户", started)
+
+            counts = records_per_user(users, records, random_seed)
+            shards = shard_users(user_ids, counts.tolist(), workers)
+            options = dict(seed=random_seed, start=start, end=end, chunk_size=chunk_size)
+            if len(shards) == 1:
+                load_users(connection, user_ids, counts, **options)
+                connection.commit()
+            elif is_sqlite:
+                # SQLite 同一时间只能有一个写入者，各进程写入自己的分片文件，合并只是在 SQLite 内部逐表复制
+                with tempfile.TemporaryDirectory(prefix='seed-') as tmp:
+                    paths = [os.path.join(tmp, f"shard{i}.db") for i in range(len(shards))]
+                    with ProcessPoolExecutor(len(shards)) as pool:
+                        list(pool.map(_seed_shard, [
+                            (f"sqlite:///{path}", shard_ids, shard_counts, dict(options, shard=True,
+                                                                                 cache_size=-64 * 1024))
+                            for path, (shard_ids, shard_counts) in zip(paths, shards)
+                        ]))
+                    since = step(f"{len(shards)} 个进程生成 {records} 条记录和每日汇总并写入分片", since)
+                    for path in paths:
+                        merge_shard(connection, path)
+            else:
+                url = engine.url.render_as_string(hide_password=False)
+                with ProcessPoolExecutor(len(shards)) as pool:
+                    list(pool.map(_seed_shard, [(url, shard_ids, shard_counts, options)
+                                                for shard_ids, shard_counts in shards]))
+            since = step("合并分片" if is_sqlite and len(shards) > 1
+                         else f"{len(shards)} 个进程生成并写入 {records} 条记录和每日汇总", since)
+
+            for index in indexes:
+                index.create(connection)
+            connection.commit()
+            if indexes:
+                since = step(f"重建 {len(indexes)} 个索引", since)
+        finally:
+            connection.rollback()
+            if is_sqlite:
+                # 恢复为应用连接的设置；关闭了 SQLITE_PRAGMAS 时恢复为 SQLite 的默认值
+                defaults = [('journal_mode', 'DELETE'), ('synchronous', 'FULL'), ('cache_size', -2000)]
+                set_pragmas(connection, (sqlite_pragmas(current_app.config) if current_app.config['SQLITE_PRAGMAS']
+                                         else defaults) + [('temp_store', 'DEFAULT'), ('threads', 0)])
+
+    if search_index:
+        since = time.perf_counter()
+        index_records_after(last_id)
+        since = step("建立全文索引", since)
+    elif get_search_backend().indexed:
+        click.echo("未建立全文索引，搜索不到新记录；需要时运行 flask search rebuild，或写入时加 --search-index。")
+    elapsed = time.perf_counter() - started
+    click.echo(f"共写入 {records} 条记录，耗时 {elapsed:.1f}s（{records / elapsed:,.0f} 条/秒）。"
+               f"用户名 {prefix}1 到 {prefix}{users}，密码 {password}。")
+
+
+def _seed_shard(args):
+    """工作进程入口：ProcessPoolExecutor 只能传递可序列化的顶层函数。"""
+    from .synthetic import seed_shard
+    url, user_ids, counts, options = args
+    return seed_shard(url, user_ids, counts, **options)
+
+
+rollup_cli = AppGroup('rollup', help='每日汇总表维护命令。')
+
+
+@rollup_cli.command('rebuild')
+@click.option('--user-id', type=int, default=None, help='只重建指定用户，默认重建所有用户。')
+def rollup_rebuild(user_id):
+    """从原始记录重建（或回填）每日汇总表。"""
+    rows = rebuild_rollups(user_id)
+    click.echo(f"已重建 {rows} 条每日汇总。")
+
+
+@rollup_cli.command('check')
+@click.option('--user-id', type=int, default=None, help='只检查指定用户，默认检查所有用户。')
+def rollup_check(user_id):
+    """检查每日汇总表与原始记录是否一致，不一致时以非零状态退出。"""
+    mismatches = find_rollup_mismatches(user_id)
+    for (uid, day, type_data, category), have, want in mismatches:
+        click.echo(f"用户 {uid} {day} {type_data}/{category}：汇总表 {have}，原始记录 {want}", err=True)
+    if mismatches:
+        click.echo(f"发现 {len(mismatches)} 处不一致，可运行 flask rollup rebuild 修复。", err=True)
+        raise SystemExit(1)
+    click.echo("每日汇总表与原始记录一致。")
+
+
+search_cli = AppGroup('search', help='全文索引维护命令。')
+
+
+@search_cli.command('rebuild')
+@click.option('--batch-size', type=int, default=5000, show_default=True, help='每批读取的记录数。')
+def search_rebuild(batch_size):
+    """从记录表重建全文索引（SQLite 和 PostgreSQL，其他数据库没有索引）。"""
+    rows = rebuild_search_index(batch_size)
+    click.echo(f"已为 {rows} 条记录建立全文索引。")
+
+
+def register_commands(app):
+    app.cli.add_command(check_query_plans)
+    app.cli.add_command(check_startup)
+    app.cli.add_command(seed)
+    app.cli.add_command(rollup_cli)
+    app.cli.add_command(search_cli)
@@ -2,9 +2,72 @@
 
 import os
 
+
+def _engine_options():
+    """
+    从环境变量读取 SQLAlchemy 引擎的连接池参数，只包含设置了的项，未设置时使用 SQLAlchemy 的默认值。
+    DB_POOL_SIZE、DB_MAX_OVERFLOW、DB_POOL_TIMEOUT 只适用于 QueuePool（PostgreSQL、MySQL 和 SQLite 文件数据库）。
+    """
+    options = {}
+    for name, key, cast in (
+        ('DB_POOL_SIZE', 'pool_size', int),
+        ('DB_MAX_OVERFLOW', 'max_overflow', int),
+        ('DB_POOL_TIMEOUT', 'pool_timeout', int),
+        ('DB_POOL_RECYCLE', 'pool_recycle', int),
+        ('DB_POOL_PRE_PING', 'pool_pre_ping', lambda value: value.lower() in ('1', 'true', 'yes')),
+    ):
+        if os.environ.get(name):
+            options[key] = cast(os.environ[name])
+    return options
+
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY', 'manwhatcanisay')
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///user_info.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER', 'uploads')
+    SQLALCHEMY_ENGINE_OPTIONS = _engine_options()
+    # SQLite 连接建立时设置的 PRAGMA，SQLITE_PRAGMAS=0 时全部不设置
+    SQLITE_PRAGMAS = os.environ.get('SQLITE_PRAGMAS', '1') == '1'
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+    # 负数表示以 KiB 为单位，-65536 即 64 MiB 页缓存（每个连接）
+    SQLITE_CACHE_SIZE = int(os.environ.get('SQLITE_CACHE_SIZE', -65536))
+    SQLITE_BUSY_TIMEOUT = int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000))
+    # 上传文件不超过该大小时保存在内存中，超过后转存到临时文件（字节）
+    UPLOAD_SPOOL_MAX_SIZE = int(os.environ.get('UPLOAD_SPOOL_MAX_SIZE', 4 * 1024 * 1024))
+    # GET /records 分页与流式输出
+    RECORDS_PAGE_MAX_LIMIT = int(os.environ.get('RECORDS_PAGE_MAX_LIMIT', 1000))
+    RECORDS_STREAM_BATCH_SIZE = int(os.environ.get('RECORDS_STREAM_BATCH_SIZE', 1000))
+    # POST /records/batch 单次最多的操作数
+    RECORDS_BATCH_MAX_OPERATIONS = int(os.environ.get('RECORDS_BATCH_MAX_OPERATIONS', 50000))
+    # GET /records/search 按相关度排序时参与打分的最近匹配条数，更早的匹配按录入时间倒序排在其后
+    SEARCH_RANK_WINDOW = int(os.environ.get('SEARCH_RANK_WINDOW', 1000))
+    # 文件导入
+    IMPORT_CHUNK_SIZE = int(os.environ.get('IMPORT_CHUNK_SIZE', 5000))
+    IMPORT_MAX_REPORTED_REJECTIONS = int(os.environ.get('IMPORT_MAX_REPORTED_REJECTIONS', 1000))
+    IMPORT_WORKERS = int(os.environ.get('IMPORT_WORKERS', 2))
+    # 导入任务的租约（秒）：执行任务的进程每处理完一块就续约，超过该时间未续约的任务
+    # （进程被 gunicorn max_requests 回收、重载或崩溃）在查询、取消或重新上传时标记为失败
+    IMPORT_JOB_LEASE = int(os.environ.get('IMPORT_JOB_LEASE', 600))
+    IMPORT_CSV_ENCODING = os.environ.get('IMPORT_CSV_ENCODING', 'utf-8-sig')
+    # 令牌认证缓存：最多缓存的令牌数和有效期（秒），任一为 0 时关闭缓存
+    AUTH_CACHE_SIZE = int(os.environ.get('AUTH_CACHE_SIZE', 1024))
+    AUTH_CACHE_TTL = int(os.environ.get('AUTH_CACHE_TTL', 60))
+    # /summary 和 /summary_pie 的响应缓存：lru（进程内）、redis 或 none
+    RESPONSE_CACHE_BACKEND = os.environ.get('RESPONSE_CACHE_BACKEND', 'lru')
+    RESPONSE_CACHE_SIZE = int(os.environ.get('RESPONSE_CACHE_SIZE', 4096))
+    RESPONSE_CACHE_URL = os.environ.get('RESPONSE_CACHE_URL', 'redis://localhost:6379/0')
+    RESPONSE_CACHE_TTL = int(os.environ.get('RESPONSE_CACHE_TTL', 3600))
+    # 请求指标：为 1 时统计各路由的延迟、SQL 语句数等并在 /metrics 以 Prometheus 格式输出
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '0') == '1'
+    # SQL 诊断：为 1 时记录慢查询（带参数和执行计划）和 N+1 查询，调试模式或 SQL_TIMELINE=1 时输出每个请求的 SQL 时间线；
+    # 以 JSON Lines 写入 SQL_DIAGNOSTICS_LOG 指定的文件，未设置时写到标准错误
+    SQL_DIAGNOSTICS = os.environ.get('SQL_DIAGNOSTICS', '0') == '1'
+    SQL_SLOW_QUERY_MS = float(os.environ.get('SQL_SLOW_QUERY_MS', 100))
+    SQL_EXPLAIN_SLOW_QUERIES = os.environ.get('SQL_EXPLAIN_SLOW_QUERIES', '1') == '1'
+    SQL_N_PLUS_ONE_THRESHOLD = int(os.environ.get('SQL_N_PLUS_ONE_THRESHOLD', 10))
+    SQL_TIMELINE = os.environ.get('SQL_TIMELINE', '0') == '1'
+    SQL_DIAGNOSTICS_LOG = os.environ.get('SQL_DIAGNOSTICS_LOG', '')
+    # JSON 序列化：auto（安装了 orjson 时使用 orjson）、orjson 或 std（标准库）
+    JSON_PROVIDER = os.environ.get('JSON_PROVIDER', 'auto')
     # 其他配置参数
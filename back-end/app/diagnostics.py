@@ -0,0 +1,216 @@
+# app/diagnostics.py
+
+import datetime
+import json
+import logging
+import re
+import time
+from contextvars import ContextVar
+from flask import current_app, has_request_context, request
+from sqlalchemy import event
+from .extensions import db
+
+# 参数中的长列表和长字符串在日志中截断
+MAX_LOGGED_ITEMS = 20
+MAX_LOGGED_STRING = 200
+# 每个请求的时间线最多记录的语句数
+MAX_TIMELINE_STATEMENTS = 1000
+
+# 各数据库查看执行计划的语句前缀
+EXPLAIN_PREFIXES = {'sqlite': 'EXPLAIN QUERY PLAN ', 'postgresql': 'EXPLAIN ', 'mysql': 'EXPLAIN '}
+# 只有这些语句有执行计划，建表、PRAGMA 等语句不查看
+EXPLAINABLE = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH')
+
+# 语句形状：字面量替换为 ?，IN 列表等连续占位符合并为一个，参数个数不同的同类语句视为同一形状
+_LITERAL_PATTERN = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST_PATTERN = re.compile(r'(?:\?|%s|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%s|%\(\w+\)s|:\w+))+')
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+
+# 当前请求的诊断状态，不在请求中（如导入任务线程）时为 None
+_current = ContextVar('sql_diagnostics', default=None)
+
+logger = logging.getLogger('app.sql_diagnostics')
+
+
+def statement_shape(statement):
+    """把 SQL 语句归一化为形状，用于发现同一请求中反复执行的同类语句（N+1）。"""
+    shape = _LITERAL_PATTERN.sub('?', statement)
+    shape = _PLACEHOLDER_LIST_PATTERN.sub('?', shape)
+    return _WHITESPACE_PATTERN.sub(' ', shape).strip()
+
+
+def _loggable(value):
+    """把绑定参数转换为可写入 JSON 的值，截断过长的列表和字符串。"""
+    if isinstance(value, dict):
+        return {key: _loggable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        items = [_loggable(item) for item in value[:MAX_LOGGED_ITEMS]]
+        if len(value) > MAX_LOGGED_ITEMS:
+            items.append(f"...（共 {len(value)} 项）")
+        return items
+    if isinstance(value, bytes):
+        return f"<{len(value)} 字节>"
+    if isinstance(value, str) and len(value) > MAX_LOGGED_STRING:
+        return value[:MAX_LOGGED_STRING] + '...'
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return str(value)
+
+
+class RequestDiagnostics:
+    """单个请求的 SQL 记录：各形状的执行次数和耗时，以及调试模式下的时间线。"""
+
+    __slots__ = ('start', 'shapes', 'timeline', 'statements')
+
+    def __init__(self, timeline):
+        self.start = time.perf_counter()
+        # 形状 -> [次数, 总耗时]
+        self.shapes = {}
+        self.timeline = [] if timeline else None
+        self.statements = 0
+
+
+class SQLDiagnostics:
+    """
+    基于 SQLAlchemy 执行事件的 SQL 诊断，输出 JSON Lines（每行一个事件，字段 event 区分类型）：
+    - slow_query：耗时不低于 slow_query_ms 的语句，带绑定参数和执行计划，请求外（导入任务等）的语句也会记录；
+    - n_plus_one：同一请求中同一形状的语句执行不少于 n_plus_one_threshold 次；
+    - sql_timeline：timeline 为真或应用处于调试模式时，每个请求结束后输出全部语句的开始时间、耗时和语句。
+    """
+
+    def __init__(self, engine, slow_query_ms=100, explain=True, n_plus_one_threshold=10, timeline=False):
+        self.engine = engine
+        self.slow_query_seconds = slow_query_ms / 1000
+        self.explain_prefix = EXPLAIN_PREFIXES.get(engine.dialect.name) if explain else None
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.timeline = timeline
+
+    def emit(self, event_name, **fields):
+        record = {"event": event_name, "ts": datetime.datetime.now(datetime.timezone.utc).isoformat()}
+        record.update(fields)
+        logger.info(json.dumps(record, ensure_ascii=False, default=str))
+
+    def _explain(self, conn, statement, parameters):
+        """在同一个 DBAPI 连接上查看执行计划，不经过 SQLAlchemy，避免再次触发执行事件。"""
+        cursor = conn.connection.dbapi_connection.cursor()
+        try:
+            cursor.execute(self.explain_prefix + statement, parameters)
+            return [' | '.join(str(column) for column in row) for row in cursor.fetchall()]
+        except Exception as e:
+            return [f"无法获取执行计划：{e}"]
+        finally:
+            cursor.close()
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        context._diagnostics_start = time.perf_counter()
+
+    def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        start = getattr(context, '_diagnostics_start', None)
+        if start is None:
+            return
+        elapsed = time.perf_counter() - start
+        state = _current.get()
+
+        if elapsed >= self.slow_query_seconds:
+            fields = {
+                "duration_ms": round(elapsed * 1000, 3),
+                "statement": statement,
+                "parameters": _loggable(parameters),
+                "executemany": executemany,
+            }
+            if has_request_context():
+                fields.update(endpoint=request.endpoint, method=request.method, path=request.path)
+            # executemany 的参数是多组，无法直接用于 EXPLAIN
+            if self.explain_prefix is not None and not executemany \
+                    and statement.lstrip().upper().startswith(EXPLAINABLE):
+                fields["plan"] = self._explain(conn, statement, parameters)
+            self.emit('slow_query', **fields)
+
+        if state is None:
+            return
+        state.statements += 1
+        # 导入等批量写入按块重复执行 INSERT 是预期行为，不计入 N+1
+        if not executemany and not statement.lstrip()[:6].upper() == 'INSERT':
+            shape = statement_shape(statement)
+            entry = state.shapes.get(shape)
+            if entry is None:
+                state.shapes[shape] = [1, elapsed]
+            else:
+                entry[0] += 1
+                entry[1] += elapsed
+        if state.timeline is not None and len(state.timeline) < MAX_TIMELINE_STATEMENTS:
+            state.timeline.append({
+                "offset_ms": round((start - state.start) * 1000, 3),
+                "duration_ms": round(elapsed * 1000, 3),
+                "statement": statement,
+                "parameters": _loggable(parameters),
+            })
+
+    def finish_request(self, state, endpoint, method, path, status):
+        """请求结束（流式响应发送完毕）时检查 N+1，并在需要时输出时间线。"""
+        for shape, (count, elapsed) in state.shapes.items():
+            if count >= self.n_plus_one_threshold:
+                self.emit('n_plus_one', endpoint=endpoint, method=method, path=path, count=count,
+                          total_ms=round(elapsed * 1000, 3), statement=shape)
+        if state.timeline is not None:
+            self.emit('sql_timeline', endpoint=endpoint, method=method, path=path, status=status,
+                      duration_ms=round((time.perf_counter() - state.start) * 1000, 3),
+                      statement_count=state.statements,
+                      truncated=state.statements > len(state.timeline), statements=state.timeline)
+
+
+def _configure_logger(path):
+    """诊断日志只输出消息本身（一行 JSON），写入 path 指定的文件，未设置时写到标准错误。"""
+    if logger.handlers:
+        return
+    handler = logging.FileHandler(path, encoding='utf-8') if path else logging.StreamHandler()
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+def init_diagnostics(app):
+    """
+    SQL_DIAGNOSTICS 为真时在 db.engine 上注册执行事件，开启慢查询日志和 N+1 检测；
+    调试模式（app.debug）或 SQL_TIMELINE 为真时还会输出每个请求的 SQL 时间线。关闭时什么都不注册。
+    """
+    if not app.config['SQL_DIAGNOSTICS']:
+        app.extensions['sql_diagnostics'] = None
+        return
+    with app.app_context():
+        engine = db.engine
+    diagnostics = SQLDiagnostics(
+        engine,
+        slow_query_ms=app.config['SQL_SLOW_QUERY_MS'],
+        explain=app.config['SQL_EXPLAIN_SLOW_QUERIES'],
+        n_plus_one_threshold=app.config['SQL_N_PLUS_ONE_THRESHOLD'],
+        timeline=app.config['SQL_TIMELINE'],
+    )
+    app.extensions['sql_diagnostics'] = diagnostics
+    _configure_logger(app.config['SQL_DIAGNOSTICS_LOG'])
+    event.listen(engine, 'before_cursor_execute', diagnostics.before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', diagnostics.after_cursor_execute)
+
+    @app.before_request
+    def _start_diagnostics():
+        # app.run(debug=True) 在创建应用之后才打开调试模式，每个请求开始时再判断
+        _current.set(RequestDiagnostics(diagnostics.timeline or current_app.debug))
+
+    @app.after_request
+    def _finish_diagnostics(response):
+        state = _current.get()
+        if state is None:
+            return response
+        endpoint, method, path, status = request.endpoint, request.method, request.path, response.status_code
+
+        def finish():
+            _current.set(None)
+            diagnostics.finish_request(state, endpoint, method, path, status)
+
+        # 流式响应在发送过程中还会执行查询，发送完毕（关闭响应）时再检查
+        if response.is_streamed:
+            response.call_on_close(finish)
+        else:
+            finish()
+        return response
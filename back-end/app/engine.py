@@ -0,0 +1,37 @@
+# app/engine.py
+
+from sqlalchemy import event
+from .extensions import db
+
+
+def sqlite_pragmas(config):
+    """按配置返回 SQLite 连接需要设置的 (PRAGMA, 值) 列表。"""
+    return [
+        # WAL 模式下读不阻塞写、写不阻塞读，多个工作进程同时读写时不再频繁出现 database is locked
+        ('journal_mode', config['SQLITE_JOURNAL_MODE']),
+        # WAL 模式下 NORMAL 只在检查点时同步磁盘，断电可能丢失最近的事务，但不会损坏数据库
+        ('synchronous', config['SQLITE_SYNCHRONOUS']),
+        ('mmap_size', config['SQLITE_MMAP_SIZE']),
+        ('cache_size', config['SQLITE_CACHE_SIZE']),
+        # 遇到锁时最多等待的毫秒数，超时后才报 database is locked
+        ('busy_timeout', config['SQLITE_BUSY_TIMEOUT']),
+    ]
+
+
+def init_engine(app):
+    """使用 SQLite 时，在每个新连接上设置 SQLITE_* 配置的 PRAGMA。"""
+    if not app.config['SQLITE_PRAGMAS']:
+        return
+    with app.app_context():
+        engine = db.engine
+    if engine.dialect.name != 'sqlite':
+        return
+
+    pragmas = sqlite_pragmas(app.config)
+
+    @event.listens_for(engine, 'connect')
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas:
+            cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
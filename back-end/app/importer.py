@@ -0,0 +1,310 @@
+# app/importer.py
+
+import datetime
+import hashlib
+import zipfile
+import numpy as np
+import pandas as pd
+from pytz import timezone
+from sqlalchemy import insert, select
+from .extensions import db
+from .models import Record, MAX_AMOUNT
+from .rollup import apply_record_deltas
+from .response_cache import next_data_version
+from .search import index_records
+
+east_asia_tz = timezone('Asia/Shanghai')
+
+REQUIRED_COLUMNS = {'时间', '类别', '金额', '类型', '备注'}
+TYPE_MAPPING = {"收入": "income", "支出": "expense"}
+DATE_FORMATS = ['%Y-%m-%d %H:%M', '%Y/%m/%d %H:%M']
+MISSING_CELL_TEXT = '空'
+
+
+class MissingColumnsError(ValueError):
+    """导入文件缺少必要的列。"""
+
+    def __init__(self, missing):
+        self.missing = missing
+        super().__init__(f"文件缺少必要的列。缺少列：{', '.join(missing)}")
+
+
+class UnreadableFileError(ValueError):
+    """导入文件为空、编码不符或格式损坏，无法读取。"""
+
+
+def record_fingerprint(user_id, date, amount, type_data, category, note, occurrence=0):
+    """
+    计算一条流水的内容指纹，用于导入时去重。
+    金额按分取整，时间精确到秒，避免浮点误差和格式差异导致同一条流水得到不同指纹。
+    occurrence 为该行在同一文件中是第几次出现（从 0 开始）：同一文件中内容完全相同的多行
+    （如同一分钟内两笔相同的车费）是不同的流水，各自得到不同的指纹；重新导入同一文件时序号相同，仍会去重。
+    第一次出现时不加序号，与之前导入的记录指纹一致。
+    date 为 None 表示文件中未填写时间：按空值计算，而不是导入时填入的当前时间，重新导入时仍能去重。
+    """
+    parts = [
+        str(user_id),
+        date.strftime('%Y-%m-%d %H:%M:%S') if date is not None else '',
+        str(round(amount * 100)),
+        type_data,
+        category,
+        note or '',
+    ]
+    if occurrence:
+        parts.append(f"#{occurrence}")
+    return hashlib.sha256('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
+
+class OccurrenceCounter:
+    """
+    统计一个文件中各内容指纹已经出现的次数，为每行给出它在相同的行中的序号。
+    按指纹的前 64 位计数，保存在有序的 numpy 数组中，每个不同的指纹约占 16 字节，流式导入的内存仍与文件大小基本无关。
+    """
+
+    def __init__(self):
+        self.keys = np.empty(0, dtype=np.uint64)
+        self.counts = np.empty(0, dtype=np.int64)
+
+    def ordinals(self, keys):
+        """返回 keys 中每一项之前（包括之前各块）出现过的次数，并把本块计入。"""
+        n = len(keys)
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+        # 块内序号：在相同的键中排第几
+        starts = np.ones(n, dtype=bool)
+        starts[1:] = sorted_keys[1:] != sorted_keys[:-1]
+        positions = np.arange(n)
+        rank = positions - np.maximum.accumulate(np.where(starts, positions, 0))
+        # 之前各块中的出现次数
+        index = np.searchsorted(self.keys, sorted_keys)
+        found = np.zeros(n, dtype=bool)
+        if len(self.keys):
+            found = self.keys[np.minimum(index, len(self.keys) - 1)] == sorted_keys
+        previous = np.zeros(n, dtype=np.int64)
+        previous[found] = self.counts[index[found]]
+
+        result = np.empty(n, dtype=np.int64)
+        result[order] = previous + rank
+
+        # 计入本块：已有的键累加次数，新键按顺序插入
+        group_counts = np.diff(np.append(np.flatnonzero(starts), n))
+        group_index, group_found = index[starts], found[starts]
+        self.counts[group_index[group_found]] += group_counts[group_found]
+        new = ~group_found
+        self.keys = np.insert(self.keys, group_index[new], sorted_keys[starts][new])
+        self.counts = np.insert(self.counts, group_index[new], group_counts[new])
+        return result
+
+
+def normalize_columns(df):
+    """
+    去除列名两侧空格并检查必要的列。
+    返回缺少的列名集合，为空表示检查通过。
+    """
+    df.columns = [str(col).strip() for col in df.columns]
+    return REQUIRED_COLUMNS - set(df.columns)
+
+
+def _parse_dates(raw):
+    """按已知格式逐列解析时间，Excel 已解析为日期的单元格直接沿用。"""
+    if pd.api.types.is_datetime64_any_dtype(raw):
+        return raw
+    dates = pd.to_datetime(raw, format=DATE_FORMATS[0], errors='coerce')
+    for date_format in DATE_FORMATS[1:]:
+        missing = dates.isna() & raw.notna()
+        if not missing.any():
+            break
+        dates[missing] = pd.to_datetime(raw[missing], format=date_format, errors='coerce')
+    return dates
+
+
+def _cell_text(value):
+    """单元格在错误信息中的显示文本，空单元格（NaN、None）显示为“空”而不是 nan。"""
+    if pd.api.types.is_scalar(value) and pd.isna(value):
+        return MISSING_CELL_TEXT
+    return value
+
+
+def parse_frame(df, user_id, first_row=2, occurrences=None):
+    """
+    按列校验并转换一批导入数据。
+    df 的列名需已经过 normalize_columns 处理；first_row 为 df 第一行在文件中的行号（标题行为第 1 行）；
+    occurrences 为同一文件各块共用的 OccurrenceCounter，为空时只在本块内给相同的行编号。
+    返回 (rows, rejected)：rows 为可直接插入 Record 表的字典列表（含去重用的 fingerprint），
+    rejected 为 {"row": 行号, "error": 原因} 列表。
+    """
+    amount = pd.to_numeric(df['金额'], errors='coerce')
+    category = df['类别']
+    type_data = df['类型'].astype(str).str.strip().map(TYPE_MAPPING)
+    note = df['备注']
+    raw_dates = df['时间']
+    dates = _parse_dates(raw_dates)
+
+    rules = [
+        # 非数字、非有限值和超过 MAX_AMOUNT 的金额均无效（NaN 的比较结果为假）
+        ('金额', "无效的金额", ~(np.abs(amount.to_numpy(dtype=float, na_value=np.nan)) <= MAX_AMOUNT)),
+        ('类别', "类别不能为空", (category.isna() | (category.astype(str).str.strip() == '')).to_numpy()),
+        ('类型', "无效的类型", type_data.isna().to_numpy()),
+        ('时间', "无效的时间", (dates.isna() & raw_dates.notna()).to_numpy()),
+    ]
+
+    # 每行只报告第一个不满足的规则
+    invalid = np.zeros(len(df), dtype=bool)
+    rejected = []
+    for column, message, mask in rules:
+        for position in np.flatnonzero(mask & ~invalid):
+            rejected.append({"row": int(position) + first_row,
+                             "error": f"{message}：{_cell_text(df[column].iloc[position])}"})
+        invalid |= mask
+    rejected.sort(key=lambda item: item["row"])
+
+    valid = ~invalid
+    # 未填写时间的行使用当前时间，指纹仍按未填写计算
+    now = datetime.datetime.now(east_asia_tz).replace(tzinfo=None)
+    note = note[valid]
+    missing_dates = dates[valid].isna().tolist()
+
+    rows = [
+        {"user_id": user_id, "amount": row_amount, "category": row_category, "type": row_type,
+         "note": row_note, "date": row_date}
+        for row_amount, row_category, row_type, row_note, row_date in zip(
+            amount[valid].tolist(),
+            category[valid].astype(str).tolist(),
+            type_data[valid].tolist(),
+            note.astype(str).where(note.notna(), None).tolist(),
+            pd.DatetimeIndex(dates[valid].fillna(now)).to_pydatetime().tolist()
+        )
+    ]
+    fingerprint_dates = [None if missing else row["date"] for row, missing in zip(rows, missing_dates)]
+    fingerprints = [
+        record_fingerprint(user_id, date, row["amount"], row["type"], row["category"], row["note"])
+        for row, date in zip(rows, fingerprint_dates)
+    ]
+    if occurrences is None:
+        occurrences = OccurrenceCounter()
+    ordinals = occurrences.ordinals(np.array([int(fingerprint[:16], 16) for fingerprint in fingerprints],
+                                             dtype=np.uint64))
+    for row, date, fingerprint, ordinal in zip(rows, fingerprint_dates, fingerprints, ordinals.tolist()):
+        # 同一文件中重复出现的行加上序号重新计算指纹
+        row["fingerprint"] = fingerprint if ordinal == 0 else record_fingerprint(
+            user_id, date, row["amount"], row["type"], row["category"], row["note"], ordinal
+        )
+    return rows, rejected
+
+
+def read_frames(source, chunk_size, extension, csv_encoding='utf-8-sig'):
+    """
+    按文件类型读取导入数据，每次返回最多 chunk_size 行的 DataFrame。
+    CSV 和 NDJSON 流式分块读取，峰值内存只与 chunk_size 有关；
+    Excel 需要整体加载后再切分。所有单元格按原始文本读取，由 parse_frame 统一转换。
+    文件为空、不是 csv_encoding 编码或 Excel 文件损坏时抛出 UnreadableFileError（可能在读取若干块之后）。
+    """
+    try:
+        if extension == 'csv':
+            yield from pd.read_csv(source, chunksize=chunk_size, dtype=object, encoding=csv_encoding)
+            return
+        if extension in ('ndjson', 'jsonl'):
+            empty = True
+            for df in pd.read_json(source, lines=True, chunksize=chunk_size, dtype=False,
+                                   convert_dates=False, encoding=csv_encoding):
+                empty = False
+                yield df
+            if empty:
+                raise UnreadableFileError("文件为空。")
+            return
+    except pd.errors.EmptyDataError:
+        raise UnreadableFileError("文件为空。") from None
+    except UnicodeDecodeError:
+        raise UnreadableFileError(f"无法按 {csv_encoding} 编码读取文件，请另存为 UTF-8 编码后重新上传。") from None
+
+    try:
+        df = pd.read_excel(source)
+    except (ValueError, zipfile.BadZipFile):
+        raise UnreadableFileError("无法读取 Excel 文件，文件为空或已损坏。") from None
+    for start in range(0, max(len(df), 1), chunk_size):
+        yield df.iloc[start:start + chunk_size]
+
+
+def iter_parsed_chunks(frames, user_id):
+    """
+    逐块校验并转换导入数据，依次返回每块的 (rows, rejected)。
+    第一块缺少必要的列时抛出 MissingColumnsError；行号在各块之间连续（NDJSON 为行号加 1），
+    相同的行在各块之间连续编号（见 record_fingerprint）。
+    """
+    first_row = 2
+    occurrences = OccurrenceCounter()
+    for df in frames:
+        missing = normalize_columns(df)
+        if missing:
+            if first_row == 2:
+                raise MissingColumnsError(missing)
+            # NDJSON 的后续分块可能整块都缺少某个字段，补为空值后按行校验
+            df = df.reindex(columns=[*df.columns, *missing])
+        yield parse_frame(df, user_id, first_row, occurrences)
+        first_row += len(df)
+
+
+def _insert_ignore_statement(dialect_name):
+    """
+    返回跳过重复指纹并带回已插入行的语句，不支持的数据库返回 None。
+    SQLite 和 PostgreSQL 均支持 INSERT ... ON CONFLICT DO NOTHING RETURNING。
+    """
+    if dialect_name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif dialect_name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        return None
+
+    # render_nulls：备注为空的行也写出 note 列，所有行的列相同才能合并为一批，否则按连续的相同列逐段执行
+    return dialect_insert(Record).on_conflict_do_nothing(index_elements=[Record.fingerprint]).returning(
+        Record.user_id, Record.date, Record.type, Record.category, Record.amount, Record.id, Record.note
+    ).execution_options(render_nulls=True)
+
+
+def _new_rows(chunk):
+    """去掉指纹已存在或在本块内重复的行，用于不支持 ON CONFLICT 的数据库。"""
+    fingerprints = [row["fingerprint"] for row in chunk]
+    seen = set(db.session.scalars(
+        select(Record.fingerprint).where(Record.fingerprint.in_(fingerprints))
+    ))
+    rows = []
+    for row in chunk:
+        if row["fingerprint"] not in seen:
+            seen.add(row["fingerprint"])
+            rows.append(row)
+    return rows
+
+
+def insert_records(rows, chunk_size):
+    """
+    分块批量插入记录，指纹已存在的行直接跳过，并在同一事务中更新每日汇总表、全文索引和用户的数据版本号。
+    rows 需属于同一用户。只执行语句不提交，由调用方决定事务边界。返回实际插入的条数。
+    """
+    if not rows:
+        return 0
+
+    version = next_data_version(rows[0]["user_id"])
+    for row in rows:
+        row["created_version"] = row["updated_version"] = version
+
+    stmt = _insert_ignore_statement(db.session.get_bind().dialect.name)
+    inserted = 0
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        if stmt is not None:
+            inserted_rows = db.session.execute(stmt, chunk).all()
+            deltas = [(row.user_id, row.date, row.type, row.category, row.amount, 1) for row in inserted_rows]
+            # 新插入的行同步写入全文索引（非 SQLite 时为空操作）
+            index_records((row.id, row.user_id, row.note, row.category) for row in inserted_rows)
+        else:
+            chunk = _new_rows(chunk)
+            if chunk:
+                db.session.execute(insert(Record).execution_options(render_nulls=True), chunk)
+            deltas = [
+                (row["user_id"], row["date"], row["type"], row["category"], row["amount"], 1) for row in chunk
+            ]
+
+        apply_record_deltas(deltas)
+        inserted += len(deltas)
+    return inserted
@@ -0,0 +1,187 @@
+# app/jobs.py
+
+import os
+import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from pytz import timezone
+from sqlalchemy import func, update
+from .extensions import db
+from .models import ImportJob, ImportedFile
+from .utils import file_extension
+
+east_asia_tz = timezone('Asia/Shanghai')
+
+FINISHED_STATUSES = {'completed', 'failed', 'cancelled'}
+
+_executor = None
+_executor_lock = threading.Lock()
+# 本进程已提交、尚未结束的任务 ID，排队中的任务由正在执行的任务一起续约
+_active_jobs = set()
+
+
+def _now():
+    """当前的本地时间（不带时区，与数据库中保存的格式一致）。"""
+    return datetime.datetime.now(east_asia_tz).replace(tzinfo=None)
+
+
+def _get_executor(max_workers):
+    """按需创建本进程的导入线程池（在 fork 之后创建，避免与 gunicorn 预加载冲突）。"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='import-job')
+        return _executor
+
+
+def submit_import_job(job_id, path):
+    """将已创建的导入任务提交到线程池，path 为待导入的临时文件，任务结束后删除。"""
+    app = current_app._get_current_object()
+    with _executor_lock:
+        _active_jobs.add(job_id)
+    _get_executor(app.config['IMPORT_WORKERS']).submit(_run_import_job, app, job_id, path)
+
+
+def _renew_leases():
+    """为本进程所有未结束的任务续约，与调用方的改动一起提交。"""
+    with _executor_lock:
+        job_ids = list(_active_jobs)
+    if job_ids:
+        db.session.execute(update(ImportJob).where(ImportJob.id.in_(job_ids)).values(heartbeat_at=_now()),
+                           execution_options={"synchronize_session": False})
+
+
+def expire_stale_jobs(user_id=None):
+    """
+    将超过 IMPORT_JOB_LEASE 秒未续约的未结束任务标记为失败并提交，user_id 不为空时只处理该用户的任务。
+    执行任务的进程退出后任务不会再有进展，标记为失败后可以重新上传同一文件（已导入的块按指纹去重）。
+    """
+    deadline = _now() - datetime.timedelta(seconds=current_app.config['IMPORT_JOB_LEASE'])
+    stmt = update(ImportJob).where(
+        ImportJob.status.notin_(FINISHED_STATUSES),
+        func.coalesce(ImportJob.heartbeat_at, ImportJob.created_at) < deadline
+    ).values(status='failed', error='执行任务的进程已退出，任务中断。', finished_at=_now())
+    if user_id is not None:
+        stmt = stmt.where(ImportJob.user_id == user_id)
+    if db.session.execute(stmt, execution_options={"synchronize_session": False}).rowcount:
+        db.session.commit()
+
+
+def job_to_dict(job):
+    """将导入任务转换为接口返回的字典格式，throughput 为每秒处理的行数。"""
+    throughput = None
+    if job.started_at:
+        elapsed = ((job.finished_at or _now()) - job.started_at).total_seconds()
+        throughput = round(job.rows_processed / elapsed, 1) if elapsed > 0 else None
+    return {
+        "job_id": job.id,
+        "filename": job.filename,
+        "status": job.status,
+        "rows_processed": job.rows_processed,
+        "rows_imported": job.rows_imported,
+        "rows_duplicate": job.rows_duplicate,
+        "rows_rejected": job.rows_rejected,
+        "rejected_rows": job.rejected_rows or [],
+        "throughput": throughput,
+        "error": job.error,
+        "created_at": job.created_at.strftime('%Y-%m-%d %H:%M:%S') if job.created_at else None,
+        "started_at": job.started_at.strftime('%Y-%m-%d %H:%M:%S') if job.started_at else None,
+        "finished_at": job.finished_at.strftime('%Y-%m-%d %H:%M:%S') if job.finished_at else None,
+    }
+
+
+def _job_state(job_id):
+    """读取任务的 (cancel_requested, status)，判断是否已请求取消或已因租约过期被标记为失败。"""
+    return db.session.query(ImportJob.cancel_requested, ImportJob.status).filter_by(id=job_id).one()
+
+
+def _set_status(job_id, from_statuses, **values):
+    """
+    仅当任务仍处于 from_statuses 之一、且本进程持有租约时修改任务状态，返回是否修改成功。
+    任务已被 expire_stale_jobs 标记为失败时不再覆盖。由调用方提交。
+    """
+    stmt = update(ImportJob).where(ImportJob.id == job_id, ImportJob.status.in_(from_statuses))
+    if 'running' in from_statuses:
+        stmt = stmt.where(ImportJob.heartbeat_at.isnot(None))
+    return db.session.execute(stmt.values(**values), execution_options={"synchronize_session": False}).rowcount == 1
+
+
+def _run_import_job(app, job_id, path):
+    """
+    在线程池中执行导入任务。
+    每块数据单独提交一个事务（记录和每日汇总一起提交），并同步更新任务进度；
+    每块开始前检查取消标记，取消后已提交的块保留，任务状态为 cancelled。
+    每块提交时为本进程的任务续约；任务已因租约过期被标记为失败时停止，
+    状态的变更都以任务仍为 pending/running 为条件，不会覆盖过期标记。
+    """
+    from .importer import read_frames, iter_parsed_chunks, insert_records, MissingColumnsError, UnreadableFileError
+
+    with app.app_context():
+        try:
+            job = db.session.get(ImportJob, job_id)
+            if job.cancel_requested:
+                _set_status(job_id, ('pending',), status='cancelled', finished_at=_now())
+                db.session.commit()
+                return
+
+            if not _set_status(job_id, ('pending',), status='running', started_at=_now(), heartbeat_at=_now()):
+                db.session.rollback()
+                return
+            _renew_leases()
+            db.session.commit()
+
+            chunk_size = app.config['IMPORT_CHUNK_SIZE']
+            max_reported = app.config['IMPORT_MAX_REPORTED_REJECTIONS']
+            status = 'completed'
+            frames = read_frames(path, chunk_size, file_extension(job.filename), app.config['IMPORT_CSV_ENCODING'])
+            for rows, rejected in iter_parsed_chunks(frames, job.user_id):
+                cancel_requested, current_status = _job_state(job_id)
+                if current_status != 'running':
+                    return
+                if cancel_requested:
+                    status = 'cancelled'
+                    break
+
+                imported = insert_records(rows, chunk_size)
+                job.rows_processed += len(rows) + len(rejected)
+                job.rows_imported += imported
+                job.rows_duplicate += len(rows) - imported
+                job.rows_rejected += len(rejected)
+                reported = job.rejected_rows or []
+                if rejected and len(reported) < max_reported:
+                    job.rejected_rows = reported + rejected[:max_reported - len(reported)]
+                _renew_leases()
+                db.session.commit()
+
+            if not _set_status(job_id, ('running',), status=status, finished_at=_now()):
+                # 处理期间租约过期，任务已被标记为失败；已提交的数据块保留，文件可重新上传
+                db.session.rollback()
+                app.logger.warning(f"导入任务 {job_id} 已被标记为失败，不再修改其状态。")
+                return
+            if status == 'completed' and job.file_hash:
+                # 只有完整导入的文件才记录哈希，取消后的文件允许重新上传
+                db.session.add(ImportedFile(user_id=job.user_id, sha256=job.file_hash, filename=job.filename,
+                                            imported_records=job.rows_imported))
+            db.session.commit()
+
+        except (MissingColumnsError, UnreadableFileError) as e:
+            # 与 /upload 返回 400 的情况相同，错误信息直接展示给用户
+            db.session.rollback()
+            _set_status(job_id, ('pending', 'running'), status='failed', error=str(e)[:255], finished_at=_now())
+            db.session.commit()
+
+        except Exception as e:
+            db.session.rollback()
+            app.logger.error(f"导入任务 {job_id} 执行失败：{str(e)}")
+            _set_status(job_id, ('pending', 'running'), status='failed', error=str(e)[:255], finished_at=_now())
+            db.session.commit()
+
+        finally:
+            with _executor_lock:
+                _active_jobs.discard(job_id)
+            db.session.remove()
+            try:
+                os.remove(path)
+            except OSError:
+                pass
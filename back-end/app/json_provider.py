@@ -0,0 +1,48 @@
+# app/json_provider.py
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖，未安装时使用标准库
+    orjson = None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    基于 orjson 的 JSON 提供者，jsonify、request.get_json 和流式响应都经过它。
+    输出与默认提供者等价：键按字母排序，datetime、Decimal 等类型仍交给 Flask 的 default 处理；
+    区别在于非 ASCII 字符直接以 UTF-8 输出，不再转义为 \\uXXXX。
+    orjson 无法处理的值（超过 64 位的整数等）和标准库才接受的输入（NaN 等）退回标准库。
+    """
+
+    _option = (orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+               if orjson is not None else 0)
+
+    def dumps(self, obj, **kwargs):
+        option = self._option | (orjson.OPT_INDENT_2 if kwargs.get('indent') else 0)
+        try:
+            return orjson.dumps(obj, default=self.default, option=option).decode()
+        except orjson.JSONEncodeError:
+            return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        try:
+            return orjson.loads(s)
+        except orjson.JSONDecodeError:
+            return super().loads(s, **kwargs)
+
+
+def init_json_provider(app):
+    """
+    按 JSON_PROVIDER 设置应用的 JSON 提供者：
+    auto 在安装了 orjson 时使用 OrjsonProvider，否则使用标准库；orjson 要求必须安装；std 使用 Flask 默认实现。
+    """
+    provider = app.config['JSON_PROVIDER']
+    if provider not in ('auto', 'orjson', 'std'):
+        raise ValueError(f"未知的 JSON_PROVIDER：{provider}")
+    if provider == 'orjson' and orjson is None:
+        raise RuntimeError("JSON_PROVIDER 为 orjson，但未安装 orjson 包。")
+    use_orjson = provider == 'orjson' or (provider == 'auto' and orjson is not None)
+    app.json = OrjsonProvider(app) if use_orjson else DefaultJSONProvider(app)
+
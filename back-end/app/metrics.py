@@ -0,0 +1,208 @@
+# app/metrics.py
+
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from flask import Blueprint, current_app, request
+from sqlalchemy import event
+from .extensions import db
+from .auth_cache import get_auth_cache
+from .response_cache import get_response_cache
+
+# 直方图的桶上界，最后隐含 +Inf
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 1000, 10000, 100000)
+
+# 当前请求的统计状态，未启用指标或不在请求中（如导入任务线程）时为 None
+_current = ContextVar('request_metrics', default=None)
+
+metrics_bp = Blueprint('metrics', __name__)
+
+
+class Histogram:
+    """按标签分组的累积直方图，输出 Prometheus 的 _bucket、_sum 和 _count。"""
+
+    def __init__(self, name, help_text, labels, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+        # 标签值元组 -> [各桶计数..., +Inf 桶计数, 总和]
+        self._series = {}
+
+    def observe(self, label_values, value):
+        series = self._series.get(label_values)
+        if series is None:
+            series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for label_values, series in sorted(self._series.items()):
+            labels = _format_labels(self.labels, label_values)
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), series[:-1]):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{{{labels + ',' if labels else ''}{le}}} {cumulative}")
+            lines.append(f"{self.name}_sum{{{labels}}} {series[-1]}")
+            lines.append(f"{self.name}_count{{{labels}}} {cumulative}")
+        return lines
+
+
+class RequestState:
+    """单个请求的统计：开始时间、SQL 语句数、数据库耗时、响应字节数和输出的行数。"""
+
+    __slots__ = ('start', 'statements', 'db_seconds', 'size', 'rows')
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.size = 0
+        self.rows = 0
+
+
+class MetricsRegistry:
+    """
+    进程内的请求指标。
+    每个请求结束（响应体发送完毕）时按 endpoint 记录一次延迟、SQL 语句数、数据库耗时、响应大小和输出行数。
+    gunicorn 多个工作进程各自统计，Prometheus 每次抓取只得到其中一个进程的数据。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (endpoint, method, status) -> 请求数
+        self.requests = {}
+        self.latency = Histogram('http_request_duration_seconds', '请求处理耗时（含流式响应的发送时间）。',
+                                 ('endpoint', 'method'), LATENCY_BUCKETS)
+        self.response_size = Histogram('http_response_size_bytes', '响应体字节数。',
+                                       ('endpoint', 'method'), SIZE_BUCKETS)
+        self.statements = Histogram('db_statements_per_request', '每个请求执行的 SQL 语句数。',
+                                    ('endpoint', 'method'), COUNT_BUCKETS)
+        self.db_time = Histogram('db_duration_seconds_per_request', '每个请求执行 SQL 的总耗时。',
+                                 ('endpoint', 'method'), LATENCY_BUCKETS)
+        self.rows = Histogram('http_response_rows', '每个请求输出的记录或汇总行数。',
+                              ('endpoint', 'method'), COUNT_BUCKETS)
+
+    def record(self, endpoint, method, status, state, elapsed):
+        key, status_key = (endpoint, method), (endpoint, method, str(status))
+        with self._lock:
+            self.requests[status_key] = self.requests.get(status_key, 0) + 1
+            self.latency.observe(key, elapsed)
+            self.response_size.observe(key, state.size)
+            self.statements.observe(key, state.statements)
+            self.db_time.observe(key, state.db_seconds)
+            self.rows.observe(key, state.rows)
+
+    def render(self):
+        """返回 Prometheus 文本格式的全部指标，包括认证缓存和响应缓存的命中情况。"""
+        with self._lock:
+            lines = ["# HELP http_requests_total 请求数。", "# TYPE http_requests_total counter"]
+            for label_values, count in sorted(self.requests.items()):
+                lines.append(f"http_requests_total{{{_format_labels(('endpoint', 'method', 'status'), label_values)}}} "
+                             f"{count}")
+            for histogram in (self.latency, self.response_size, self.statements, self.db_time, self.rows):
+                lines.extend(histogram.render())
+
+        for prefix, cache in (('auth_cache', get_auth_cache()), ('response_cache', get_response_cache())):
+            # Redis 后端的命中统计在 Redis 服务端，不在这里输出
+            stats = cache.stats() if hasattr(cache, 'stats') else None
+            if stats is None:
+                continue
+            for key in ('hits', 'misses', 'evictions', 'invalidations'):
+                if key in stats:
+                    lines.append(f"# TYPE {prefix}_{key}_total counter")
+                    lines.append(f"{prefix}_{key}_total {stats[key]}")
+            lines.append(f"# TYPE {prefix}_size gauge")
+            lines.append(f"{prefix}_size {stats['size']}")
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values):
+    return ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+def count_rows(n):
+    """路由输出记录或汇总行时调用，累加到当前请求的 rows；未启用指标时只读取一次上下文变量。"""
+    state = _current.get()
+    if state is not None:
+        state.rows += n
+
+
+def _count_bytes(body, state):
+    for chunk in body:
+        state.size += len(chunk)
+        yield chunk
+
+
+def _before_request():
+    _current.set(RequestState())
+
+
+def _after_request(response):
+    state = _current.get()
+    if state is None:
+        return response
+    registry = current_app.extensions['metrics']
+    # 未匹配路由的请求归为同一个 endpoint，避免任意路径产生大量标签
+    endpoint, method, status = request.endpoint or 'unmatched', request.method, response.status_code
+
+    def finish():
+        registry.record(endpoint, method, status, state, time.perf_counter() - state.start)
+        _current.set(None)
+
+    if response.is_streamed:
+        # 流式响应在发送过程中才执行查询和产生数据，按编码后的字节计数，发送完毕（关闭响应）时再记录
+        response.response = _count_bytes(response.iter_encoded(), state)
+        response.call_on_close(finish)
+    else:
+        state.size = response.calculate_content_length() or 0
+        finish()
+    return response
+
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """
+    Prometheus 指标路由（METRICS_ENABLED=1 时注册）。
+    输出各 endpoint 的请求数、延迟、SQL 语句数、数据库耗时、响应大小和输出行数的直方图，以及缓存命中统计。
+    """
+    return current_app.response_class(current_app.extensions['metrics'].render(),
+                                      mimetype='text/plain; version=0.0.4')
+
+
+def init_metrics(app):
+    """
+    METRICS_ENABLED 为真时创建指标注册表，注册请求钩子、SQL 执行事件和 /metrics 路由。
+    关闭时什么都不注册，请求和 SQL 执行不经过任何统计代码。
+    """
+    if not app.config['METRICS_ENABLED']:
+        app.extensions['metrics'] = None
+        return
+    app.extensions['metrics'] = MetricsRegistry()
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.register_blueprint(metrics_bp)
+
+    with app.app_context():
+        engine = db.engine
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if _current.get() is not None:
+            context._metrics_start = time.perf_counter()
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        state = _current.get()
+        if state is not None and hasattr(context, '_metrics_start'):
+            state.statements += 1
+            state.db_seconds += time.perf_counter() - context._metrics_start
@@ -2,10 +2,48 @@
 
 from .extensions import db
 import datetime
+import math
 from pytz import timezone
 
 east_asia_tz = timezone('Asia/Shanghai')
 
+# 单条金额绝对值的上限（元）。以分存为 BIGINT 时远未到上限：在此范围内以元为单位的浮点数能精确换算到分，
+# 大量记录求和也不会超出 BIGINT
+MAX_AMOUNT = 10 ** 13
+BIGINT_MAX = 2 ** 63 - 1
+
+
+def is_valid_amount(value):
+    """金额是否为有限值且绝对值不超过 MAX_AMOUNT。"""
+    return math.isfinite(value) and abs(value) <= MAX_AMOUNT
+
+
+class Money(db.TypeDecorator):
+    """
+    金额类型。
+    数据库中以整数“分”存储，读写时与以元为单位的浮点数互相转换，接口返回的格式不变。
+    SUM 等聚合在数据库中按整数计算，结果精确，不会随记录数增多产生浮点误差。
+    """
+    impl = db.BigInteger
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if not math.isfinite(value):
+            raise ValueError(f"金额必须是有限值：{value}")
+        cents = int(round(value * 100))
+        if abs(cents) > BIGINT_MAX:
+            raise ValueError(f"金额超出范围：{value}")
+        return cents
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        # PostgreSQL 中 SUM(bigint) 返回 numeric，驱动给出 Decimal，转换后接口中仍为数字而不是字符串
+        return int(value) / 100
+
+
 class User(db.Model):
     """
     用户模型类。
@@ -14,10 +52,12 @@ class User(db.Model):
     - id: 用户的唯一标识符，主键。
     - username: 用户名，必须唯一且不能为空。
     - password_hash: 用户密码的哈希值，不能为空。
+    - data_version: 数据版本号，用户的记录每次变化时加 1，用于响应缓存失效和 ETag。
     """
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     password_hash = db.Column(db.String(128), nullable=False)
+    data_version = db.Column(db.Integer, nullable=False, default=0)
 
 class Record(db.Model):
     """
@@ -26,16 +66,143 @@ class Record(db.Model):
     包含以下字段：
     - id: 记录的唯一标识符，主键。
     - user_id: 关联的用户 ID，外键，不能为空。
-    - amount: 金额，不能为空。
+    - amount: 金额，以分为单位的整数存储（见 Money），不能为空。
     - category: 类别，不能为空。
     - date: 记录的日期和时间，默认为当前时间。
     - type: 记录的类型（收入或支出），不能为空。
     - note: 备注，可选字段。
+    - fingerprint: 导入记录的内容指纹（用户、时间、金额、类型、类别、备注的 SHA-256），
+      手动添加的记录为空；唯一索引保证同一条流水不会被重复导入。
+    - created_version / updated_version: 创建和最后一次修改时用户的 data_version，
+      用于 GET /records?since= 增量同步。
+
+    索引：
+    - (user_id, date): 记录列表、分页和按时间范围汇总。
+    - (user_id, type, category, date): 按类型和类别分组的饼图汇总。
+    - (user_id, updated_version): 增量同步时查找某个版本之后变化的记录。
+    - (user_id, amount): GET /records 按金额排序和金额范围筛选。
+    SQLite 上使用 AUTOINCREMENT，删除的 ID 不会再分配给新记录。
     """
+    __table_args__ = (
+        db.Index('ix_record_user_date', 'user_id', 'date'),
+        db.Index('ix_record_user_type_category_date', 'user_id', 'type', 'category', 'date'),
+        db.Index('ux_record_fingerprint', 'fingerprint', unique=True),
+        db.Index('ix_record_user_updated_version', 'user_id', 'updated_version'),
+        db.Index('ix_record_user_amount', 'user_id', 'amount'),
+        # SQLite 默认会复用已删除的最大 ID，增量同步中同一个 ID 会同时出现在 deleted 和 inserted 中
+        {'sqlite_autoincrement': True},
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    amount = db.Column(db.Float, nullable=False)
+    amount = db.Column(Money, nullable=False)
     category = db.Column(db.String(50), nullable=False)
     date = db.Column(db.DateTime, default=lambda: datetime.datetime.now(east_asia_tz))
     type = db.Column(db.String(10), nullable=False)
-    note = db.Column(db.String(255), nullable=True)
\ No newline at end of file
+    note = db.Column(db.String(255), nullable=True)
+    fingerprint = db.Column(db.String(64), nullable=True)
+    created_version = db.Column(db.Integer, nullable=False, default=0)
+    updated_version = db.Column(db.Integer, nullable=False, default=0)
+
+class RecordTombstone(db.Model):
+    """
+    已删除记录模型类。
+    记录被删除时留下一条墓碑，供 GET /records?since= 返回删除的记录 ID。
+    包含以下字段：
+    - id: 主键。
+    - user_id: 关联的用户 ID，外键，不能为空。
+    - record_id: 被删除记录的 ID。
+    - created_version: 被删除记录创建时的 data_version，同步窗口内新增又删除的记录无需通知客户端。
+    - deleted_version: 删除时用户的 data_version。
+    """
+    __table_args__ = (
+        db.Index('ix_record_tombstone_user_version', 'user_id', 'deleted_version'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    record_id = db.Column(db.Integer, nullable=False)
+    created_version = db.Column(db.Integer, nullable=False, default=0)
+    deleted_version = db.Column(db.Integer, nullable=False)
+
+class DailyRollup(db.Model):
+    """
+    每日汇总模型类。
+    按 (用户, 日期, 类型, 类别) 预先汇总的记录金额和条数，
+    在记录增删改和导入时于同一事务中增量维护，供 /summary 和 /summary_pie 读取。
+    包含以下字段：
+    - user_id: 关联的用户 ID，主键之一。
+    - day: 记录所在的日期（本地时间），主键之一。
+    - type: 记录的类型（收入或支出），主键之一。
+    - category: 类别，主键之一。
+    - amount: 当天该类别的金额合计。
+    - count: 当天该类别的记录条数。
+    """
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    type = db.Column(db.String(10), primary_key=True)
+    category = db.Column(db.String(50), primary_key=True)
+    amount = db.Column(Money, nullable=False, default=0)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class ImportJob(db.Model):
+    """
+    导入任务模型类。
+    表示一次在后台线程池中执行的文件导入，任务状态保存在数据库中，任何工作进程都可以查询或取消。
+    包含以下字段：
+    - id: 任务 ID（32 位十六进制字符串），主键。
+    - user_id: 关联的用户 ID，外键，不能为空。
+    - filename: 上传的文件名。
+    - status: 任务状态，pending、running、completed、failed 或 cancelled。
+    - rows_processed: 已处理的行数。
+    - rows_imported: 已导入的行数。
+    - rows_rejected: 被跳过的行数。
+    - rows_duplicate: 因与已有记录重复而跳过的行数。
+    - file_hash: 上传文件的 SHA-256，任务完成后记录到 ImportedFile。
+    - rejected_rows: 被跳过的行号及原因（最多保留 IMPORT_MAX_REPORTED_REJECTIONS 条）。
+    - error: 任务失败时的错误信息。
+    - cancel_requested: 是否已请求取消。
+    - created_at / started_at / finished_at: 创建、开始和结束时间。
+    - heartbeat_at: 执行任务的进程最近一次确认任务仍在处理的时间，超过 IMPORT_JOB_LEASE 未更新的任务视为已中断。
+    """
+    id = db.Column(db.String(32), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    filename = db.Column(db.String(255), nullable=True)
+    status = db.Column(db.String(20), nullable=False, default='pending')
+    rows_processed = db.Column(db.Integer, nullable=False, default=0)
+    rows_imported = db.Column(db.Integer, nullable=False, default=0)
+    rows_rejected = db.Column(db.Integer, nullable=False, default=0)
+    rows_duplicate = db.Column(db.Integer, nullable=False, default=0)
+    file_hash = db.Column(db.String(64), nullable=True)
+    rejected_rows = db.Column(db.JSON, nullable=True)
+    error = db.Column(db.String(255), nullable=True)
+    cancel_requested = db.Column(db.Boolean, nullable=False, default=False)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.datetime.now(east_asia_tz))
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    heartbeat_at = db.Column(db.DateTime, nullable=True)
+
+
+class ImportedFile(db.Model):
+    """
+    已导入文件模型类。
+    记录每个用户成功导入过的文件内容哈希，相同的文件再次上传时无需解析即可直接拒绝。
+    包含以下字段：
+    - id: 主键。
+    - user_id: 关联的用户 ID，外键，不能为空。
+    - sha256: 文件内容的 SHA-256，同一用户内唯一。
+    - filename: 上传时的文件名。
+    - imported_records: 该文件导入的记录条数。
+    - created_at: 导入时间。
+    """
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'sha256', name='uq_imported_file_user_sha256'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    sha256 = db.Column(db.String(64), nullable=False)
+    filename = db.Column(db.String(255), nullable=True)
+    imported_records = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.datetime.now(east_asia_tz))
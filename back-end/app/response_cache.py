@@ -0,0 +1,205 @@
+# app/response_cache.py
+
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import wraps
+from urllib.parse import urlencode
+from flask import current_app, request, make_response, g
+from sqlalchemy import update
+from .extensions import db
+from .models import User
+
+
+class LRUCacheBackend:
+    """进程内 LRU 缓存，按条目数限制大小。默认后端。"""
+
+    def __init__(self, max_size=1024):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            }
+
+
+class RedisCacheBackend:
+    """
+    Redis 缓存后端，多个进程共享缓存。
+    client 只需提供 get(key) 和 set(key, value, ex=秒) 两个方法，
+    不传时按 url 创建 redis.Redis 客户端（需要安装 redis 包）；测试时可传入兼容的替身对象。
+    """
+
+    def __init__(self, url=None, ttl=3600, client=None, prefix='response:'):
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key):
+        return self.client.get(self.prefix + key)
+
+    def set(self, key, value):
+        self.client.set(self.prefix + key, value, ex=self.ttl)
+
+
+def init_response_cache(app):
+    """
+    按 RESPONSE_CACHE_BACKEND 创建响应缓存并保存到 app.extensions：
+    lru 为进程内缓存，redis 使用 RESPONSE_CACHE_URL，none 关闭缓存（ETag 仍然生效）。
+    """
+    backend = app.config['RESPONSE_CACHE_BACKEND']
+    if backend == 'lru':
+        cache = LRUCacheBackend(app.config['RESPONSE_CACHE_SIZE'])
+    elif backend == 'redis':
+        cache = RedisCacheBackend(app.config['RESPONSE_CACHE_URL'], app.config['RESPONSE_CACHE_TTL'])
+    elif backend == 'none':
+        cache = None
+    else:
+        raise ValueError(f"未知的 RESPONSE_CACHE_BACKEND：{backend}")
+    app.extensions['response_cache'] = cache
+
+
+def get_response_cache():
+    """返回当前应用的响应缓存后端，未启用时返回 None。"""
+    return current_app.extensions.get('response_cache')
+
+
+def get_data_version(user_id):
+    """读取用户的数据版本号。"""
+    return db.session.query(User.data_version).filter(User.id == user_id).scalar()
+
+
+def bump_data_version(*user_ids):
+    """
+    将用户的数据版本号加 1，不传 user_ids 时更新所有用户。
+    在写入记录的同一事务中调用，由调用方提交；提交后旧版本的缓存和 ETag 自然失效。
+    """
+    stmt = update(User).values(data_version=User.data_version + 1)
+    if user_ids:
+        stmt = stmt.where(User.id.in_(user_ids))
+    db.session.execute(stmt)
+
+
+def next_data_version(user_id):
+    """
+    将用户的数据版本号加 1 并返回新值，用于给本次写入的记录打上版本。
+    更新语句会锁住用户行直到事务结束，同一用户的并发写入因此按版本号顺序提交。
+    """
+    bump_data_version(user_id)
+    return get_data_version(user_id)
+
+
+# 路由本身不区分大小写的查询参数，只有这些参数在缓存键中转为小写；
+# category、note 等筛选条件区分大小写，必须保留原值，否则不同结果会共用同一个缓存条目和 ETag
+CASE_INSENSITIVE_PARAMS = frozenset({'period'})
+
+
+def _cache_key(user_id, version):
+    """由路由、用户、数据版本和规范化后的查询参数组成缓存键，参数顺序不影响结果。"""
+    # 按参数名稳定排序，同名参数保持原有顺序（路由取第一个值）
+    params = urlencode(sorted(((key, value.lower() if key in CASE_INSENSITIVE_PARAMS else value)
+                               for key, value in request.args.items(multi=True)),
+                              key=lambda item: item[0]))
+    return f"{request.endpoint}:{user_id}:{version}:{params}"
+
+
+def _etag(key):
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+def _not_modified(etag):
+    """客户端的 If-None-Match 与 etag 匹配时返回 304 响应，否则返回 None。"""
+    if request.if_none_match.contains(etag):
+        return make_response('', 304)
+    return None
+
+
+def _finish(response, etag):
+    response.set_etag(etag)
+    # 结果因用户而异，只允许客户端缓存，且每次使用前需重新验证
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def cached_response(f):
+    """
+    缓存 GET 路由的 200 响应，需放在 token_required 之后。
+    缓存键包含用户的数据版本号，记录变化后旧条目不会再被命中，无需逐条删除；
+    响应带 ETag，请求头 If-None-Match 匹配时直接返回 304，不查询也不序列化。
+    """
+    @wraps(f)
+    def decorated(current_user, *args, **kwargs):
+        key = _cache_key(current_user.id, get_data_version(current_user.id))
+        etag = _etag(key)
+
+        response = _not_modified(etag)
+        if response is None:
+            cache = get_response_cache()
+            body = cache.get(key) if cache is not None else None
+            if body is not None:
+                response = current_app.response_class(body, mimetype='application/json')
+            else:
+                response = make_response(f(current_user, *args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                if cache is not None:
+                    cache.set(key, response.get_data())
+
+        return _finish(response, etag)
+
+    return decorated
+
+
+def conditional_response(f):
+    """
+    为 GET 路由提供基于数据版本号的 ETag，不缓存响应体，适用于流式响应。需放在 token_required 之后。
+    If-None-Match 匹配时只读取一次版本号即返回 304；读取到的版本号保存在 g.data_version，
+    并通过 X-Change-Token 响应头返回，客户端可用作下次增量同步的 since 参数。
+    """
+    @wraps(f)
+    def decorated(current_user, *args, **kwargs):
+        g.data_version = get_data_version(current_user.id)
+        # 同一地址可按 Accept 返回不同格式，ETag 需要区分
+        key = f"{_cache_key(current_user.id, g.data_version)}:{request.headers.get('Accept', '')}"
+        etag = _etag(key)
+
+        response = _not_modified(etag)
+        if response is None:
+            response = make_response(f(current_user, *args, **kwargs))
+            if response.status_code != 200:
+                return response
+
+        response.headers['X-Change-Token'] = str(g.data_version)
+        return _finish(response, etag)
+
+    return decorated
@@ -0,0 +1,148 @@
+# app/rollup.py
+
+import datetime
+from sqlalchemy import func, insert, delete, update
+from .extensions import db
+from .models import Record, DailyRollup
+from .response_cache import bump_data_version
+
+
+def _day_of(value):
+    """取记录时间所在的日期（按存储的本地时间）。"""
+    return value.date() if isinstance(value, datetime.datetime) else value
+
+
+def _upsert_statement(dialect_name):
+    """
+    返回带冲突累加的插入语句，不支持的数据库返回 None。
+    SQLite 和 PostgreSQL 均支持 INSERT ... ON CONFLICT DO UPDATE。
+    """
+    if dialect_name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif dialect_name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        return None
+
+    stmt = dialect_insert(DailyRollup)
+    return stmt.on_conflict_do_update(
+        index_elements=[DailyRollup.user_id, DailyRollup.day, DailyRollup.type, DailyRollup.category],
+        set_={
+            'amount': DailyRollup.amount + stmt.excluded.amount,
+            'count': DailyRollup.count + stmt.excluded.count,
+        }
+    )
+
+
+def apply_record_deltas(deltas):
+    """
+    将记录变化累加到每日汇总表。
+    deltas 为 (user_id, date, type, category, amount, count) 的可迭代对象：
+    新增记录 count 为 1，删除记录 count 为 -1 且 amount 取相反数，修改记录拆成一删一增。
+    只在当前会话中执行，与记录的写入处于同一事务，由调用方负责提交。
+    """
+    totals = {}
+    for user_id, date, type_data, category, amount, count in deltas:
+        if date is None:
+            continue
+        key = (user_id, _day_of(date), type_data, category)
+        total = totals.setdefault(key, [0, 0])
+        total[0] += amount
+        total[1] += count
+
+    rows = [
+        {"user_id": user_id, "day": day, "type": type_data, "category": category, "amount": amount, "count": count}
+        for (user_id, day, type_data, category), (amount, count) in totals.items()
+        if count or amount
+    ]
+    if not rows:
+        return
+
+    upsert = _upsert_statement(db.session.get_bind().dialect.name)
+    if upsert is not None:
+        db.session.execute(upsert, rows)
+    else:
+        # 其他数据库：先更新，更新不到再插入
+        for row in rows:
+            result = db.session.execute(
+                update(DailyRollup)
+                .where(DailyRollup.user_id == row['user_id'], DailyRollup.day == row['day'],
+                       DailyRollup.type == row['type'], DailyRollup.category == row['category'])
+                .values(amount=DailyRollup.amount + row['amount'], count=DailyRollup.count + row['count'])
+            )
+            if result.rowcount == 0:
+                db.session.execute(insert(DailyRollup), [row])
+
+    # 清理已经没有记录的汇总行
+    if any(row['count'] < 0 for row in rows):
+        user_ids = {row['user_id'] for row in rows}
+        db.session.execute(
+            delete(DailyRollup).where(DailyRollup.user_id.in_(user_ids), DailyRollup.count <= 0)
+        )
+
+
+def record_delta(record, sign=1):
+    """根据记录生成一条汇总变化，sign 为 1 表示新增，-1 表示删除。"""
+    return record.user_id, record.date, record.type, record.category, sign * record.amount, sign
+
+
+def _grouped_records(user_id=None):
+    """按 (user_id, 日期, 类型, 类别) 对原始记录分组汇总的查询。"""
+    day = func.date(Record.date)
+    query = db.session.query(
+        Record.user_id,
+        day.label('day'),
+        Record.type,
+        Record.category,
+        func.sum(Record.amount).label('amount'),
+        func.count().label('count')
+    ).filter(Record.date.isnot(None))
+    if user_id is not None:
+        query = query.filter(Record.user_id == user_id)
+    return query.group_by(Record.user_id, day, Record.type, Record.category)
+
+
+def rebuild_rollups(user_id=None):
+    """从原始记录重建每日汇总表，user_id 为空时重建所有用户。返回写入的汇总行数。"""
+    stmt = delete(DailyRollup)
+    if user_id is not None:
+        stmt = stmt.where(DailyRollup.user_id == user_id)
+    db.session.execute(stmt)
+
+    result = db.session.execute(
+        insert(DailyRollup).from_select(
+            ['user_id', 'day', 'type', 'category', 'amount', 'count'],
+            _grouped_records(user_id).statement
+        )
+    )
+    # 重建结果可能与原汇总不同，使相关用户的汇总缓存失效
+    bump_data_version(*([user_id] if user_id is not None else []))
+    db.session.commit()
+    return result.rowcount
+
+
+def find_rollup_mismatches(user_id=None, tolerance=1e-6):
+    """
+    比较每日汇总表与原始记录的分组结果。
+    返回不一致项列表，每项为 (键, 汇总表中的 (amount, count), 原始记录的 (amount, count))，
+    缺失的一方为 None。
+    """
+    expected = {
+        (row.user_id, str(row.day), row.type, row.category): (row.amount, row.count)
+        for row in _grouped_records(user_id)
+    }
+
+    query = db.session.query(DailyRollup)
+    if user_id is not None:
+        query = query.filter(DailyRollup.user_id == user_id)
+    actual = {
+        (row.user_id, str(row.day), row.type, row.category): (row.amount, row.count)
+        for row in query
+    }
+
+    mismatches = []
+    for key in sorted(expected.keys() | actual.keys(), key=str):
+        have, want = actual.get(key), expected.get(key)
+        if have is None or want is None or have[1] != want[1] or abs(have[0] - want[0]) > tolerance:
+            mismatches.append((key, have, want))
+    return mismatches
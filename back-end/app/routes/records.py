@@ -1,15 +1,277 @@
 # app/routes/records.py
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context, g
+from sqlalchemy import or_, insert, update, delete
+import base64
+import json
 from ..extensions import db
-from ..models import Record
+from ..models import Record, RecordTombstone, is_valid_amount
 from ..utils import token_required
+from ..rollup import apply_record_deltas, record_delta
+from ..response_cache import next_data_version, conditional_response
+from ..search import index_records, remove_records, search_entry, search_record_ids
+from ..metrics import count_rows
 import datetime
 from pytz import timezone
 
 records_bp = Blueprint('records', __name__)
 east_asia_tz = timezone('Asia/Shanghai')
 
+RECORD_TYPES = ('income', 'expense')
+BATCH_OPERATIONS = ('create', 'update', 'delete')
+# 批量操作可修改的字段（Record 的列名）
+BATCH_FIELDS = ('amount', 'category', 'type', 'note', 'date')
+# GET /records 可用的排序字段，均有 (user_id, 字段) 索引
+SORT_COLUMNS = {'date': Record.date, 'amount': Record.amount}
+# IN 列表每批的 ID 个数，低于 SQLite 的绑定参数上限
+ID_CHUNK_SIZE = 5000
+
+
+# 接口输出记录时读取的列。查询这些列得到轻量的 Row，不创建 ORM 实体，也不进入会话的标识映射
+RECORD_COLUMNS = (Record.id, Record.amount, Record.category, Record.date, Record.type, Record.note)
+# fields 参数中每个字段需要读取的列
+FIELD_COLUMNS = {
+    "id": Record.id,
+    "amount": Record.amount,
+    "category": Record.category,
+    "date": Record.date,
+    "time": Record.date,
+    "timeStamp": Record.date,
+    "type": Record.type,
+    "note": Record.note,
+}
+# 修改和删除记录时，更新每日汇总表和全文索引需要的列
+WRITE_COLUMNS = (Record.id, Record.user_id, Record.date, Record.type, Record.category, Record.amount, Record.note)
+
+
+def _format_date(date):
+    # 数据库返回的时间不带时区，isoformat 的结果与 strftime('%Y-%m-%d %H:%M') 相同，但快一倍
+    return date.isoformat(' ', 'minutes')
+
+
+def _record_to_dict(record):
+    """将记录（Record 实例或包含 RECORD_COLUMNS 的 Row）转换为接口返回的字典格式，日期只格式化一次。"""
+    date = record.date
+    formatted = _format_date(date)
+    return {
+        "id": record.id,
+        "amount": record.amount,
+        "category": record.category,
+        "date": formatted,
+        "time": formatted,
+        "timeStamp": int(date.timestamp()) * 1000,  # 返回时间戳
+        "type": record.type,
+        "note": record.note  # 返回备注字段
+    }
+
+
+# fields 参数可选的字段及取值方式，与 _record_to_dict 的输出一致；date 和 time 单独处理
+_FIELD_GETTERS = {
+    "id": lambda record: record.id,
+    "amount": lambda record: record.amount,
+    "category": lambda record: record.category,
+    "date": None,
+    "time": None,
+    "timeStamp": lambda record: int(record.date.timestamp()) * 1000,
+    "type": lambda record: record.type,
+    "note": lambda record: record.note,
+}
+
+
+def _record_serializer(fields):
+    """返回只输出 fields 中字段的序列化函数，fields 为空时返回 _record_to_dict。"""
+    if not fields:
+        return _record_to_dict
+    getters = [(field, _FIELD_GETTERS[field]) for field in fields if _FIELD_GETTERS[field] is not None]
+    date_fields = [field for field in fields if _FIELD_GETTERS[field] is None]
+
+    def serialize(record):
+        item = {field: getter(record) for field, getter in getters}
+        if date_fields:
+            formatted = _format_date(record.date)
+            for field in date_fields:
+                item[field] = formatted
+        return item
+    return serialize
+
+
+def _record_columns(fields):
+    """返回输出 fields 中字段需要查询的列，始终包含 id（分页游标使用）；fields 为空时返回全部列。"""
+    if not fields:
+        return RECORD_COLUMNS
+    return tuple(dict.fromkeys([Record.id] + [FIELD_COLUMNS[field] for field in fields]))
+
+
+def _encode_cursor(sort, record):
+    """
+    将一页最后一条记录的 (排序键, id) 编码为不透明的游标字符串。
+    游标自带排序键，下一页不需要再读取这条记录，记录被删除后分页仍可继续。
+    """
+    key = record.date.isoformat() if sort.lstrip('-') == 'date' else record.amount
+    payload = json.dumps([sort, key, record.id], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+
+
+def _decode_cursor(raw, sort):
+    """解析 _encode_cursor 生成的游标，返回 (排序键, id)；格式无效或与本次的 sort 不一致时返回 None。"""
+    try:
+        cursor_sort, key, record_id = json.loads(base64.urlsafe_b64decode(raw + '=' * (-len(raw) % 4)))
+        if cursor_sort != sort or not isinstance(record_id, int) or isinstance(record_id, bool):
+            return None
+        if sort.lstrip('-') == 'date':
+            return datetime.datetime.fromisoformat(key), record_id
+        key = _parse_amount(key) if isinstance(key, (int, float)) else None
+        if key is None:
+            return None
+        return key, record_id
+    except (ValueError, TypeError):
+        return None
+
+
+def _parse_amount(value):
+    """将请求中的金额转换为浮点数；不是数字、不是有限值或绝对值超过 MAX_AMOUNT 时返回 None。"""
+    if isinstance(value, bool):
+        return None
+    try:
+        amount = float(value)
+    except (TypeError, ValueError, OverflowError):
+        return None
+    return amount if is_valid_amount(amount) else None
+
+
+def _parse_limit():
+    """解析 limit 参数，返回 (limit, 错误信息)；未传时 limit 为 None，非正整数时返回错误。"""
+    raw = request.args.get('limit')
+    if raw is None:
+        return None, None
+    try:
+        limit = int(raw)
+    except ValueError:
+        limit = 0
+    if limit <= 0:
+        return None, "limit 必须是正整数。"
+    return limit, None
+
+
+def _parse_fields():
+    """解析 fields 参数（逗号分隔），返回 (字段列表, 错误信息)。"""
+    raw = request.args.get('fields')
+    if not raw:
+        return None, None
+    fields = list(dict.fromkeys(field.strip() for field in raw.split(',') if field.strip()))
+    unknown = [field for field in fields if field not in _FIELD_GETTERS]
+    if unknown or not fields:
+        return None, f"无效的 fields 参数：{', '.join(unknown) or raw}"
+    return fields, None
+
+
+def _parse_record_filters(user_id):
+    """
+    将 GET /records 的筛选参数转换为 SQL 条件，返回 (条件列表, 错误信息)。
+    start_date/end_date 为包含两端的日期；category 可重复或以逗号分隔；note 为备注子串。
+    """
+    args = request.args
+    filters = [Record.user_id == user_id]
+
+    try:
+        if args.get('start_date'):
+            start = datetime.datetime.strptime(args['start_date'], '%Y-%m-%d')
+            filters.append(Record.date >= start)
+        if args.get('end_date'):
+            end = datetime.datetime.strptime(args['end_date'], '%Y-%m-%d') + datetime.timedelta(days=1)
+            filters.append(Record.date < end)
+    except ValueError:
+        return None, "无效的日期参数。"
+
+    if args.get('type'):
+        if args['type'] not in RECORD_TYPES:
+            return None, "无效的 type 参数。可选值为 'income' 或 'expense'。"
+        filters.append(Record.type == args['type'])
+
+    categories = [category.strip() for value in args.getlist('category')
+                  for category in value.split(',') if category.strip()]
+    if categories:
+        filters.append(Record.category.in_(categories))
+
+    for name, compare in (('min_amount', Record.amount.__ge__), ('max_amount', Record.amount.__le__)):
+        if args.get(name):
+            value = _parse_amount(args[name])
+            if value is None:
+                return None, f"无效的 {name} 参数。"
+            filters.append(compare(value))
+
+    if args.get('note'):
+        # autoescape 转义 % 和 _，按字面子串匹配
+        filters.append(Record.note.contains(args['note'], autoescape=True))
+
+    return filters, None
+
+
+def _batched(records, batch_size):
+    """将记录迭代器按 batch_size 分组，减少流式响应中的小块写入。"""
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= batch_size:
+            count_rows(len(batch))
+            yield batch
+            batch = []
+    if batch:
+        count_rows(len(batch))
+        yield batch
+
+
+def _stream_json_array(records, batch_size, serialize=_record_to_dict):
+    """以分块方式输出 JSON 数组，每块只调用一次 dumps，再去掉外层的方括号拼接。"""
+    dumps = current_app.json.dumps
+    yield '['
+    first = True
+    for batch in _batched(records, batch_size):
+        chunk = dumps([serialize(record) for record in batch])[1:-1]
+        yield chunk if first else ',' + chunk
+        first = False
+    yield ']'
+
+
+def _stream_ndjson(records, batch_size, serialize=_record_to_dict):
+    """以 NDJSON 格式逐行输出记录。"""
+    dumps = current_app.json.dumps
+    for batch in _batched(records, batch_size):
+        yield ''.join(dumps(serialize(record)) + '\n' for record in batch)
+
+
+def _changes_since(user_id, since):
+    """返回 since 版本之后新增、修改和删除的记录 ID，版本号由 conditional_response 读取。"""
+    try:
+        since = int(since)
+    except ValueError:
+        since = -1
+    if since < 0 or since > g.data_version:
+        return jsonify({"error": "无效的 since。"}), 400
+
+    # created_version <= updated_version，按 updated_version 一次查出新增和修改的记录
+    inserted, updated = [], []
+    changed = db.session.query(Record.id, Record.created_version).filter(
+        Record.user_id == user_id, Record.updated_version > since
+    ).order_by(Record.id)
+    for record_id, created_version in changed:
+        (inserted if created_version > since else updated).append(record_id)
+
+    # 同步窗口内新增又删除的记录客户端从未见过，不必返回
+    deleted = [row.record_id for row in db.session.query(RecordTombstone.record_id).filter(
+        RecordTombstone.user_id == user_id,
+        RecordTombstone.deleted_version > since,
+        RecordTombstone.created_version <= since
+    ).order_by(RecordTombstone.record_id)]
+
+    return jsonify({
+        "change_token": g.data_version,
+        "inserted": inserted,
+        "updated": updated,
+        "deleted": deleted
+    }), 200
+
+
 @records_bp.route('/records', methods=['POST'])
 @token_required
 def add_record(current_user):
@@ -36,7 +298,9 @@ def add_record(current_user):
     }
     """
     data = request.json
-    amount = float(data.get('amount'))
+    amount = _parse_amount(data.get('amount'))
+    if amount is None:
+        return jsonify({"error": "无效的金额。"}), 400
     category = data.get('category')
     type_data = data.get('type')
     note = data.get('note')  # 可选字段
@@ -54,22 +318,43 @@ def add_record(current_user):
     record = Record(user_id=current_user.id, amount=amount, category=category, type=type_data, note=note,
                     date=record_date)
     try:
+        record.created_version = record.updated_version = next_data_version(current_user.id)
         db.session.add(record)
+        db.session.flush()
+        apply_record_deltas([record_delta(record)])
+        index_records([search_entry(record)])
         db.session.commit()
         return jsonify({"message": "记录添加成功。"}), 200
     except Exception as e:
+        db.session.rollback()
         return jsonify({"error": "记录添加失败", "details": str(e)}), 400
 
 @records_bp.route('/records', methods=['GET'])
 @token_required
+@conditional_response
 def get_records(current_user):
     """
     获取记录路由。
-    获取当前用户的所有记录。
-    返回记录列表和状态码 200。
+    获取当前用户的记录，默认按 (date, id) 升序排列。
+    - 筛选：start_date/end_date（YYYY-MM-DD，含两端）、type、category（可多个）、
+      min_amount/max_amount、note（备注子串），均在 SQL 中执行。
+    - sort 为 date、-date、amount 或 -amount，同值按 id 排序，游标分页随排序方式变化。
+    - fields 为逗号分隔的字段列表，只输出这些字段，例如 fields=id,amount,category,timeStamp。
+    - 不带分页参数时，以分块方式流式输出完整的 JSON 数组（格式与以往一致）。
+    - 带 limit（可选 cursor）时，使用游标分页，返回一页记录和下一页的游标 next_cursor。
+      游标是编码了最后一条记录排序键和 id 的不透明字符串，该记录被删除后仍可继续翻页。
+    - stream=ndjson 或 Accept: application/x-ndjson 时，逐行输出 NDJSON。
+    - 带 since（上次响应头 X-Change-Token 或增量响应中的 change_token）时，
+      只返回该版本之后新增、修改和删除的记录 ID。
+    只查询输出字段需要的列，得到轻量的 Row 而非 ORM 实体；数据库端使用 yield_per 分批读取，内存占用与记录总数无关。
+    响应带 ETag，数据未变化时 If-None-Match 请求返回 304，不读取记录。
 
     示例请求:
     GET /records
+    GET /records?limit=100&cursor=WyJkYXRlIiwiMjAyNC0wNS0wMVQxMjowMDowMCIsMjUwXQ
+    GET /records?start_date=2024-05-01&end_date=2024-05-31&type=expense&category=餐饮,交通&sort=-amount
+    GET /records?stream=ndjson
+    GET /records?since=42
 
     示例响应:
     [
@@ -84,21 +369,150 @@ def get_records(current_user):
             "note": "Lunch"
         }
     ]
+
+    分页响应:
+    {
+        "records": [...],
+        "next_cursor": "WyJkYXRlIiwiMjAyNC0wNS0wMlQwOTozMDowMCIsMzUwXQ"
+    }
+
+    增量响应:
+    {
+        "change_token": 45,
+        "inserted": [351, 352],
+        "updated": [12],
+        "deleted": [7]
+    }
     """
-    records = Record.query.filter_by(user_id=current_user.id).all()
-    records_list = [
-        {
-            "id": record.id,
-            "amount": record.amount,
-            "category": record.category,
-            "date": record.date.strftime('%Y-%m-%d %H:%M'),
-            "time": record.date.strftime('%Y-%m-%d %H:%M'),
-            "timeStamp": int(record.date.timestamp()) * 1000,  # 返回时间戳
-            "type": record.type,
-            "note": record.note  # 返回备注字段
-        } for record in records
-    ]
-    return jsonify(records_list), 200
+    if 'since' in request.args:
+        return _changes_since(current_user.id, request.args['since'])
+
+    limit, error = _parse_limit()
+    if error:
+        return jsonify({"error": error}), 400
+    ndjson = (request.args.get('stream') == 'ndjson'
+              or request.accept_mimetypes.best == 'application/x-ndjson')
+
+    sort = request.args.get('sort', 'date')
+    descending = sort.startswith('-')
+    sort_column = SORT_COLUMNS.get(sort.lstrip('-'))
+    if sort_column is None:
+        return jsonify({"error": "无效的 sort 参数。可选值为 'date'、'-date'、'amount' 或 '-amount'。"}), 400
+
+    fields, error = _parse_fields()
+    if error:
+        return jsonify({"error": error}), 400
+    serialize = _record_serializer(fields)
+
+    filters, error = _parse_record_filters(current_user.id)
+    if error:
+        return jsonify({"error": error}), 400
+    # 额外读取排序列，用于生成下一页的游标
+    query = db.session.query(*dict.fromkeys(_record_columns(fields) + (sort_column,))).filter(*filters)
+
+    if request.args.get('cursor'):
+        cursor = _decode_cursor(request.args['cursor'], sort)
+        if cursor is None:
+            return jsonify({"error": "无效的 cursor。"}), 400
+        cursor_value, after_id = cursor
+        # (key, id) 越过游标，先用 key >= cursor（降序为 <=）限定索引范围
+        if descending:
+            query = query.filter(sort_column <= cursor_value,
+                                 or_(sort_column < cursor_value, Record.id < after_id))
+        else:
+            query = query.filter(sort_column >= cursor_value,
+                                 or_(sort_column > cursor_value, Record.id > after_id))
+
+    if descending:
+        query = query.order_by(sort_column.desc(), Record.id.desc())
+    else:
+        query = query.order_by(sort_column, Record.id)
+
+    if limit is not None and not ndjson:
+        max_limit = current_app.config['RECORDS_PAGE_MAX_LIMIT']
+        if limit <= 0 or limit > max_limit:
+            return jsonify({"error": f"limit 必须在 1 到 {max_limit} 之间。"}), 400
+
+        # 多取一条用于判断是否还有下一页
+        records = query.limit(limit + 1).all()
+        has_more = len(records) > limit
+        records = records[:limit]
+        count_rows(len(records))
+        return jsonify({
+            "records": [serialize(record) for record in records],
+            "next_cursor": _encode_cursor(sort, records[-1]) if has_more else None
+        }), 200
+
+    if limit is not None:
+        query = query.limit(limit)
+
+    batch_size = current_app.config['RECORDS_STREAM_BATCH_SIZE']
+    records = query.yield_per(batch_size)
+    if ndjson:
+        body = _stream_ndjson(records, batch_size, serialize)
+        mimetype = 'application/x-ndjson'
+    else:
+        body = _stream_json_array(records, batch_size, serialize)
+        mimetype = 'application/json'
+    return Response(stream_with_context(body), status=200, mimetype=mimetype)
+
+@records_bp.route('/records/search', methods=['GET'])
+@token_required
+def search_records(current_user):
+    """
+    搜索记录路由。
+    在当前用户记录的备注和类别中搜索关键词 q，结果按相关度排序并分页
+    （最近录入的 SEARCH_RANK_WINDOW 条匹配按相关度排序，更早的匹配按录入时间倒序排在其后）。
+    关键词可包含多个词（以空格分隔），记录需同时包含所有词；任意长度的中文或英文片段均可匹配。
+    - limit 为每页条数（默认 20），offset 为跳过的条数，响应中的 next_offset 为下一页的 offset。
+    - fields 与 GET /records 相同，只输出指定字段。
+    SQLite 上使用 FTS5 全文索引，PostgreSQL 上使用 tsvector 和 GIN 索引（见 app/search.py），其他数据库退化为子串匹配。
+
+    示例请求:
+    GET /records/search?q=午饭&limit=20
+
+    示例响应:
+    {
+        "records": [...],
+        "next_offset": 20
+    }
+    """
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({"error": "缺少搜索关键词。"}), 400
+
+    limit = request.args.get('limit', default=20, type=int)
+    offset = request.args.get('offset', default=0, type=int)
+    max_limit = current_app.config['RECORDS_PAGE_MAX_LIMIT']
+    if limit <= 0 or limit > max_limit:
+        return jsonify({"error": f"limit 必须在 1 到 {max_limit} 之间。"}), 400
+    if offset < 0:
+        return jsonify({"error": "offset 不能为负数。"}), 400
+
+    fields, error = _parse_fields()
+    if error:
+        return jsonify({"error": error}), 400
+    serialize = _record_serializer(fields)
+
+    try:
+        # 多取一条用于判断是否还有下一页
+        record_ids = search_record_ids(current_user.id, query, limit + 1, offset,
+                                       current_app.config['SEARCH_RANK_WINDOW'])
+        has_more = len(record_ids) > limit
+        record_ids = record_ids[:limit]
+        records = {record.id: record for record in db.session.query(*_record_columns(fields)).filter(
+            Record.user_id == current_user.id, Record.id.in_(record_ids)
+        )} if record_ids else {}
+        count_rows(len(records))
+    except Exception as e:
+        current_app.logger.error(f"搜索记录时出错：{str(e)}")
+        return jsonify({"error": "搜索记录时出错。"}), 500
+
+    return jsonify({
+        # 按相关度顺序输出
+        "records": [serialize(records[record_id]) for record_id in record_ids if record_id in records],
+        "next_offset": offset + limit if has_more else None
+    }), 200
 
 @records_bp.route('/records/<int:record_id>', methods=['PUT'])
 @token_required
@@ -106,7 +520,8 @@ def update_record(current_user, record_id):
     """
     更新记录路由。
     接收 JSON 格式的请求数据，包含金额、类别、类型、备注（可选）和时间戳（可选）。
-    验证记录是否存在，更新记录字段。
+    使用一条 UPDATE ... RETURNING 更新当前用户的记录；修改金额、类别、类型或时间时，
+    先只读取需要的列得到旧值，用于更新每日汇总表。
     返回更新成功的消息和状态码 200。
 
     示例请求:
@@ -125,34 +540,46 @@ def update_record(current_user, record_id):
         "updated_date": "2021-10-01 12:00"
     }
     """
-    data = request.json
-    record = Record.query.filter_by(id=record_id, user_id=current_user.id).first()
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "请求体必须是 JSON 对象。"}), 400
+    # 与批量操作中的 update 使用相同的校验，只修改出现的字段
+    values, error = _parse_batch_fields(data, partial=True)
+    if error:
+        return jsonify({"error": error}), 400
 
-    if not record:
-        return jsonify({"error": "记录未找到。"}), 404
+    # 先加版本号锁住用户行再读取旧值，同一用户的并发修改按顺序执行，不会基于同一个过期的旧值计算汇总变化
+    values['updated_version'] = next_data_version(current_user.id)
 
-    # 更新记录字段
-    record.amount = data.get('amount', record.amount)
-    record.category = data.get('category', record.category)
-    record.type = data.get('type', record.type)
-    record.note = data.get('note', record.note)  # 更新备注内容
+    # 修改了金额、类别、类型或时间时，需要旧值来更新每日汇总表；只修改备注时一条 UPDATE 即可
+    old = None
+    if values.keys() & {'amount', 'category', 'type', 'date'}:
+        old = db.session.query(*WRITE_COLUMNS).filter_by(id=record_id, user_id=current_user.id).first()
+        if old is None:
+            db.session.rollback()
+            return jsonify({"error": "记录未找到。"}), 404
 
-    # 如果前端传递了时间戳，则将其转换为 datetime 对象
-    if 'timeStamp' in data:
-        try:
-            record.date = datetime.datetime.fromtimestamp(data['timeStamp'] / 1000, tz=east_asia_tz)
-        except (ValueError, TypeError):
-            return jsonify({"error": "无效的时间戳。"}), 400
+    record = db.session.execute(
+        update(Record).where(Record.id == record_id, Record.user_id == current_user.id)
+        .values(**values).returning(*WRITE_COLUMNS),
+        execution_options={"synchronize_session": False}
+    ).first()
+    if record is None:
+        db.session.rollback()
+        return jsonify({"error": "记录未找到。"}), 404
 
+    if old is not None:
+        apply_record_deltas([record_delta(old, -1), record_delta(record)])
+    index_records([search_entry(record)])
     db.session.commit()
-    return jsonify({"message": "记录更新成功。", "updated_date": record.date.strftime('%Y-%m-%d %H:%M')}), 200
+    return jsonify({"message": "记录更新成功。", "updated_date": _format_date(record.date)}), 200
 
 @records_bp.route('/records/<int:record_id>', methods=['DELETE'])
 @token_required
 def delete_record(current_user, record_id):
     """
     删除记录路由。
-    验证记录是否存在，删除记录。
+    先加版本号锁住用户行，再使用一条 DELETE ... RETURNING 删除当前用户的记录，并取回更新每日汇总表需要的字段。
     返回删除成功的消息和状态码 200。
 
     示例请求:
@@ -163,11 +590,223 @@ def delete_record(current_user, record_id):
         "message": "记录删除成功。"
     }
     """
-    record = Record.query.filter_by(id=record_id, user_id=current_user.id).first()
+    # 与新增、修改和批量操作相同，先锁用户行再改记录表，同一用户的并发写入不会以相反的顺序加锁
+    deleted_version = next_data_version(current_user.id)
+    record = db.session.execute(
+        delete(Record).where(Record.id == record_id, Record.user_id == current_user.id)
+        .returning(*WRITE_COLUMNS, Record.created_version),
+        execution_options={"synchronize_session": False}
+    ).first()
 
     if not record:
+        # 没有删除任何记录，撤销版本号的增加
+        db.session.rollback()
         return jsonify({"error": "记录未找到。"}), 404
 
-    db.session.delete(record)
+    db.session.add(RecordTombstone(user_id=current_user.id, record_id=record.id,
+                                   created_version=record.created_version,
+                                   deleted_version=deleted_version))
+    apply_record_deltas([record_delta(record, -1)])
+    remove_records([record.id])
     db.session.commit()
-    return jsonify({"message": "记录删除成功。"}), 200
\ No newline at end of file
+    return jsonify({"message": "记录删除成功。"}), 200
+
+def _parse_batch_fields(operation, partial):
+    """
+    校验批量操作中的记录字段，返回 (字段字典, 错误信息)。
+    partial 为真（update）时只校验出现的字段；否则（create）金额、类别和类型必填，时间缺省为当前时间。
+    """
+    values = {}
+    if 'amount' in operation or not partial:
+        amount = _parse_amount(operation.get('amount'))
+        if amount is None:
+            return None, "无效的金额。"
+        values['amount'] = amount
+
+    if 'category' in operation or not partial:
+        category = operation.get('category')
+        if not isinstance(category, str) or not category.strip():
+            return None, "类别不能为空。"
+        values['category'] = category
+
+    if 'type' in operation or not partial:
+        if operation.get('type') not in RECORD_TYPES:
+            return None, "无效的类型。"
+        values['type'] = operation['type']
+
+    if 'note' in operation or not partial:
+        note = operation.get('note')
+        values['note'] = None if note is None else str(note)
+
+    if operation.get('timeStamp') is not None:
+        try:
+            values['date'] = datetime.datetime.fromtimestamp(operation['timeStamp'] / 1000, tz=east_asia_tz)
+        except (ValueError, TypeError, OverflowError, OSError):
+            return None, "无效的时间戳。"
+    elif not partial:
+        values['date'] = datetime.datetime.now(east_asia_tz)
+
+    return values, None
+
+
+def _fetch_owned_records(user_id, record_ids):
+    """按 ID 分批读取当前用户的记录（只取需要的列），返回 {id: 行}。"""
+    records = {}
+    for start in range(0, len(record_ids), ID_CHUNK_SIZE):
+        chunk = record_ids[start:start + ID_CHUNK_SIZE]
+        rows = db.session.query(
+            Record.id, Record.user_id, Record.created_version, *(getattr(Record, field) for field in BATCH_FIELDS)
+        ).filter(Record.user_id == user_id, Record.id.in_(chunk))
+        records.update((row.id, row) for row in rows)
+    return records
+
+
+@records_bp.route('/records/batch', methods=['POST'])
+@token_required
+def batch_records(current_user):
+    """
+    批量操作记录路由。
+    接收 create/update/delete 操作列表，先整体校验，全部通过后在一个事务中执行：
+    删除和更新按 ID 批量执行，新增使用一条多行插入，每日汇总表和数据版本号只更新一次。
+    任一操作校验失败时不执行任何操作，返回 400 和每个失败操作的原因。
+    成功时按请求顺序返回每个操作的结果和状态码 200。
+
+    示例请求:
+    POST /records/batch
+    {
+        "operations": [
+            {"op": "create", "amount": 100.0, "category": "Food", "type": "expense", "note": "Lunch",
+             "timeStamp": 1633072800000},
+            {"op": "update", "id": 12, "amount": 150.0},
+            {"op": "delete", "id": 7}
+        ]
+    }
+
+    示例响应:
+    {
+        "message": "批量操作成功。",
+        "created": 1,
+        "updated": 1,
+        "deleted": 1,
+        "results": [
+            {"index": 0, "op": "create", "id": 351},
+            {"index": 1, "op": "update", "id": 12},
+            {"index": 2, "op": "delete", "id": 7}
+        ]
+    }
+    """
+    data = request.get_json(silent=True)
+    operations = data.get('operations') if isinstance(data, dict) else None
+    if not isinstance(operations, list) or not operations:
+        return jsonify({"error": "operations 必须是非空数组。"}), 400
+
+    max_operations = current_app.config['RECORDS_BATCH_MAX_OPERATIONS']
+    if len(operations) > max_operations:
+        return jsonify({"error": f"单次最多 {max_operations} 个操作。"}), 400
+
+    # 逐个校验字段，按操作类型分组
+    errors = []
+    creates, updates, deletes = [], [], []
+    seen_ids = set()
+    for index, operation in enumerate(operations):
+        kind = operation.get('op') if isinstance(operation, dict) else None
+        error = None
+        if kind not in BATCH_OPERATIONS:
+            error = "无效的操作类型。"
+        elif kind == 'create':
+            values, error = _parse_batch_fields(operation, partial=False)
+            if not error:
+                creates.append((index, values))
+        else:
+            record_id = operation.get('id')
+            if not isinstance(record_id, int) or isinstance(record_id, bool):
+                error = "无效的记录 ID。"
+            elif record_id in seen_ids:
+                error = "同一记录在一次批量操作中只能出现一次。"
+            elif kind == 'update':
+                seen_ids.add(record_id)
+                values, error = _parse_batch_fields(operation, partial=True)
+                if not error:
+                    updates.append((index, record_id, values))
+            else:
+                seen_ids.add(record_id)
+                deletes.append((index, record_id))
+        if error:
+            errors.append({"index": index, "error": error})
+
+    # 先加版本号锁住用户行，再一次性读取要修改和删除的记录并确认都属于当前用户：
+    # 同一用户的并发写入按顺序执行，计算汇总变化和墓碑用到的旧值不会过期
+    version = next_data_version(current_user.id)
+    existing = _fetch_owned_records(current_user.id, [record_id for _, record_id, _ in updates]
+                                    + [record_id for _, record_id in deletes])
+    errors.extend({"index": index, "error": "记录未找到。"}
+                  for index, record_id, *_ in updates + deletes if record_id not in existing)
+
+    if errors:
+        db.session.rollback()
+        errors.sort(key=lambda item: item["index"])
+        return jsonify({"error": "批量操作校验失败，未执行任何操作。", "errors": errors}), 400
+
+    results = [None] * len(operations)
+    deltas = []
+    try:
+        if deletes:
+            delete_ids = [record_id for _, record_id in deletes]
+            for start in range(0, len(delete_ids), ID_CHUNK_SIZE):
+                db.session.execute(
+                    delete(Record).where(Record.user_id == current_user.id,
+                                         Record.id.in_(delete_ids[start:start + ID_CHUNK_SIZE])),
+                    execution_options={"synchronize_session": False}
+                )
+            db.session.execute(insert(RecordTombstone), [
+                {"user_id": current_user.id, "record_id": record_id,
+                 "created_version": existing[record_id].created_version, "deleted_version": version}
+                for record_id in delete_ids
+            ])
+            for index, record_id in deletes:
+                deltas.append(record_delta(existing[record_id], -1))
+                results[index] = {"index": index, "op": "delete", "id": record_id}
+            remove_records(delete_ids)
+
+        if updates:
+            rows = []
+            for index, record_id, values in updates:
+                old = existing[record_id]
+                row = {field: values.get(field, getattr(old, field)) for field in BATCH_FIELDS}
+                rows.append({"id": record_id, **row, "updated_version": version})
+                deltas.append(record_delta(old, -1))
+                deltas.append((current_user.id, row['date'], row['type'], row['category'], row['amount'], 1))
+                results[index] = {"index": index, "op": "update", "id": record_id}
+            # 按主键批量更新（executemany）
+            db.session.execute(update(Record), rows)
+            index_records((row['id'], current_user.id, row['note'], row['category']) for row in rows)
+
+        if creates:
+            rows = [{"user_id": current_user.id, **values, "created_version": version, "updated_version": version}
+                    for _, values in creates]
+            # render_nulls：备注为空的行也写出 note 列，所有行才能合并为一批插入
+            new_ids = db.session.scalars(
+                insert(Record).returning(Record.id, sort_by_parameter_order=True).execution_options(render_nulls=True),
+                rows
+            ).all()
+            for (index, values), record_id in zip(creates, new_ids):
+                deltas.append((current_user.id, values['date'], values['type'], values['category'],
+                               values['amount'], 1))
+                results[index] = {"index": index, "op": "create", "id": record_id}
+            index_records((record_id, current_user.id, values['note'], values['category'])
+                          for (_, values), record_id in zip(creates, new_ids))
+
+        apply_record_deltas(deltas)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"批量操作记录时出错：{str(e)}")
+        return jsonify({"error": "批量操作失败。"}), 500
+
+    return jsonify({
+        "message": "批量操作成功。",
+        "created": len(creates),
+        "updated": len(updates),
+        "deleted": len(deletes),
+        "results": results
+    }), 200
@@ -2,15 +2,54 @@
 
 from flask import Blueprint, request, jsonify, current_app
 from ..extensions import db
-from ..models import Record
+from ..models import DailyRollup
 from ..utils import token_required
+from ..response_cache import cached_response
+from ..metrics import count_rows
 from sqlalchemy import extract, func, case
 import datetime
 
 summary_bp = Blueprint('summary', __name__)
 
+
+def _period_range(period, year=None, month=None, day=None):
+    """
+    将 year/month/day 参数转换为半开区间 [start, end)。
+    period 为 overall 时返回 None；日期参数无效时抛出 ValueError。
+    """
+    if period == 'year':
+        return datetime.datetime(year, 1, 1), datetime.datetime(year + 1, 1, 1)
+    if period == 'month':
+        start = datetime.datetime(year, month, 1)
+        end = datetime.datetime(year + 1, 1, 1) if month == 12 else datetime.datetime(year, month + 1, 1)
+        return start, end
+    if period == 'day':
+        start = datetime.datetime(year, month, day)
+        return start, start + datetime.timedelta(days=1)
+    return None
+
+
+def _totals():
+    """收入、支出和结余的合计列。金额以分为单位在数据库中求和，结余同样在 SQL 中算出，结果精确。"""
+    return (
+        func.sum(case(
+            (DailyRollup.type == 'income', DailyRollup.amount),
+            else_=0
+        )).label('total_income'),
+        func.sum(case(
+            (DailyRollup.type == 'expense', DailyRollup.amount),
+            else_=0
+        )).label('total_expense'),
+        func.sum(case(
+            (DailyRollup.type == 'income', DailyRollup.amount),
+            (DailyRollup.type == 'expense', -DailyRollup.amount),
+            else_=0
+        )).label('balance')
+    )
+
 @summary_bp.route('/summary', methods=['GET'])
 @token_required
+@cached_response
 def get_summary(current_user):
     """
     获取汇总信息路由。
@@ -44,26 +83,20 @@ def get_summary(current_user):
         return jsonify({"error": "无效的 period 参数。可选值为 'year'、'month'、'day'、'overall' 或 'custom'."}), 400
 
     try:
-        filters = [Record.user_id == current_user.id]
+        # 从每日汇总表读取，查询代价与天数成正比，与记录条数无关
+        filters = [DailyRollup.user_id == current_user.id]
         if start_date and end_date:
-            start_date = datetime.datetime.strptime(start_date, '%Y-%m-%d')
-            end_date = datetime.datetime.strptime(end_date + " 23:59", '%Y-%m-%d %H:%M')
-            filters.append(Record.date >= start_date)
-            filters.append(Record.date <= end_date)
+            start_date = datetime.datetime.strptime(start_date, '%Y-%m-%d').date()
+            end_date = datetime.datetime.strptime(end_date, '%Y-%m-%d').date()
+            filters.append(DailyRollup.day >= start_date)
+            filters.append(DailyRollup.day <= end_date)
 
         summary = []
 
         if period == 'year':
             summary_query = db.session.query(
-                extract('year', Record.date).label('year'),
-                func.sum(case(
-                    (Record.type == 'income', Record.amount),
-                    else_=0
-                )).label('total_income'),
-                func.sum(case(
-                    (Record.type == 'expense', Record.amount),
-                    else_=0
-                )).label('total_expense')
+                extract('year', DailyRollup.day).label('year'),
+                *_totals()
             ).filter(*filters).group_by('year').order_by('year').all()
 
             summary = [
@@ -71,23 +104,16 @@ def get_summary(current_user):
                     "year": int(row.year),
                     "total_income": row.total_income or 0,
                     "total_expense": row.total_expense or 0,
-                    "balance": (row.total_income or 0) - (row.total_expense or 0)
+                    "balance": row.balance or 0
                 }
                 for row in summary_query
             ]
 
         elif period == 'month':
             summary_query = db.session.query(
-                extract('year', Record.date).label('year'),
-                extract('month', Record.date).label('month'),
-                func.sum(case(
-                    (Record.type == 'income', Record.amount),
-                    else_=0
-                )).label('total_income'),
-                func.sum(case(
-                    (Record.type == 'expense', Record.amount),
-                    else_=0
-                )).label('total_expense')
+                extract('year', DailyRollup.day).label('year'),
+                extract('month', DailyRollup.day).label('month'),
+                *_totals()
             ).filter(*filters).group_by('year', 'month').order_by('year', 'month').all()
 
             summary = [
@@ -96,24 +122,17 @@ def get_summary(current_user):
                     "month": int(row.month),
                     "total_income": row.total_income or 0,
                     "total_expense": row.total_expense or 0,
-                    "balance": (row.total_income or 0) - (row.total_expense or 0)
+                    "balance": row.balance or 0
                 }
                 for row in summary_query
             ]
 
         elif period == 'day':
             summary_query = db.session.query(
-                extract('year', Record.date).label('year'),
-                extract('month', Record.date).label('month'),
-                extract('day', Record.date).label('day'),
-                func.sum(case(
-                    (Record.type == 'income', Record.amount),
-                    else_=0
-                )).label('total_income'),
-                func.sum(case(
-                    (Record.type == 'expense', Record.amount),
-                    else_=0
-                )).label('total_expense')
+                extract('year', DailyRollup.day).label('year'),
+                extract('month', DailyRollup.day).label('month'),
+                extract('day', DailyRollup.day).label('day'),
+                *_totals()
             ).filter(*filters).group_by('year', 'month', 'day').order_by('year', 'month', 'day').all()
 
             summary = [
@@ -123,42 +142,28 @@ def get_summary(current_user):
                     "day": int(row.day),
                     "total_income": row.total_income or 0,
                     "total_expense": row.total_expense or 0,
-                    "balance": (row.total_income or 0) - (row.total_expense or 0)
+                    "balance": row.balance or 0
                 }
                 for row in summary_query
             ]
 
         elif period == 'overall':
             overall_summary = db.session.query(
-                func.sum(case(
-                    (Record.type == 'income', Record.amount),
-                    else_=0
-                )).label('total_income'),
-                func.sum(case(
-                    (Record.type == 'expense', Record.amount),
-                    else_=0
-                )).label('total_expense')
+                *_totals()
             ).filter(*filters).one()
 
             summary = [{
                 "total_income": overall_summary.total_income or 0,
                 "total_expense": overall_summary.total_expense or 0,
-                "balance": (overall_summary.total_income or 0) - (overall_summary.total_expense or 0)
+                "balance": overall_summary.balance or 0
             }]
 
         elif period == 'custom':
             summary_query = db.session.query(
-                extract('year', Record.date).label('year'),
-                extract('month', Record.date).label('month'),
-                extract('day', Record.date).label('day'),
-                func.sum(case(
-                    (Record.type == 'income', Record.amount),
-                    else_=0
-                )).label('total_income'),
-                func.sum(case(
-                    (Record.type == 'expense', Record.amount),
-                    else_=0
-                )).label('total_expense')
+                extract('year', DailyRollup.day).label('year'),
+                extract('month', DailyRollup.day).label('month'),
+                extract('day', DailyRollup.day).label('day'),
+                *_totals()
             ).filter(*filters).group_by('year', 'month', 'day').order_by('year', 'month', 'day').all()
 
             summary = [
@@ -168,11 +173,12 @@ def get_summary(current_user):
                     "day": int(row.day),
                     "total_income": row.total_income or 0,
                     "total_expense": row.total_expense or 0,
-                    "balance": (row.total_income or 0) - (row.total_expense or 0)
+                    "balance": row.balance or 0
                 }
                 for row in summary_query
             ]
 
+        count_rows(len(summary))
         return jsonify({
             "period": period,
             "summary": summary
@@ -184,6 +190,7 @@ def get_summary(current_user):
 
 @summary_bp.route('/summary_pie', methods=['GET'])
 @token_required
+@cached_response
 def get_summary_pie(current_user):
     """
     获取分类汇总信息路由。
@@ -217,39 +224,39 @@ def get_summary_pie(current_user):
     month = request.args.get('month', type=int)
     day = request.args.get('day', type=int)
 
-    try:
-        filters = [Record.user_id == current_user.id]
+    if period == 'year' and not year:
+        return jsonify({"error": "缺少必要的参数：year。"}), 400
+    if period == 'month' and (not year or not month):
+        return jsonify({"error": "缺少必要的参数：year 或 month。"}), 400
+    if period == 'day' and (not year or not month or not day):
+        return jsonify({"error": "缺少必要的参数：year、month 或 day。"}), 400
 
-        if period == 'year':
-            if not year:
-                return jsonify({"error": "缺少必要的参数：year。"}), 400
-            filters.append(extract('year', Record.date) == year)
-        elif period == 'month':
-            if not year or not month:
-                return jsonify({"error": "缺少必要的参数：year 或 month。"}), 400
-            filters.append(extract('year', Record.date) == year)
-            filters.append(extract('month', Record.date) == month)
-        elif period == 'day':
-            if not year or not month or not day:
-                return jsonify({"error": "缺少必要的参数：year、month 或 day。"}), 400
-            filters.append(extract('year', Record.date) == year)
-            filters.append(extract('month', Record.date) == month)
-            filters.append(extract('day', Record.date) == day)
-
-        income_summary = db.session.query(
-            Record.category,
-            func.sum(Record.amount).label('amount')
-        ).filter(*filters, Record.type == 'income').group_by(Record.category).all()
-
-        expense_summary = db.session.query(
-            Record.category,
-            func.sum(Record.amount).label('amount')
-        ).filter(*filters, Record.type == 'expense').group_by(Record.category).all()
+    try:
+        date_range = _period_range(period, year, month, day)
+    except ValueError:
+        return jsonify({"error": "无效的日期参数。"}), 400
 
+    try:
+        filters = [DailyRollup.user_id == current_user.id, DailyRollup.type.in_(['income', 'expense'])]
+        if date_range:
+            start, end = date_range
+            filters.append(DailyRollup.day >= start.date())
+            filters.append(DailyRollup.day < end.date())
+
+        # 一次分组查询同时得到收入和支出的分类汇总
+        category_summary = db.session.query(
+            DailyRollup.type,
+            DailyRollup.category,
+            func.sum(DailyRollup.amount).label('amount')
+        ).filter(*filters).group_by(DailyRollup.type, DailyRollup.category).all()
+
+        count_rows(len(category_summary))
         response_data = {
             "period": period,
-            "income_categories": [{"category": row.category, "amount": row.amount} for row in income_summary],
-            "expense_categories": [{"category": row.category, "amount": row.amount} for row in expense_summary]
+            "income_categories": [{"category": row.category, "amount": row.amount}
+                                  for row in category_summary if row.type == 'income'],
+            "expense_categories": [{"category": row.category, "amount": row.amount}
+                                   for row in category_summary if row.type == 'expense']
         }
 
         if period != 'overall':
@@ -1,34 +1,57 @@
 # app/routes/upload.py
 
 from flask import Blueprint, request, jsonify, current_app
-from werkzeug.utils import secure_filename
 import os
-import pandas as pd
-import datetime
+import tempfile
+import uuid
 from ..extensions import db
-from ..models import Record
-from ..utils import token_required, allowed_file
-from pytz import timezone
+from sqlalchemy.exc import IntegrityError
+from ..models import ImportJob, ImportedFile
+from ..utils import token_required, allowed_file, file_extension, hash_stream
+from ..jobs import submit_import_job, job_to_dict, expire_stale_jobs, FINISHED_STATUSES
 
 upload_bp = Blueprint('upload', __name__)
-east_asia_tz = timezone('Asia/Shanghai')
+
+def _already_imported(user_id, file_hash, include_jobs=False):
+    """
+    判断用户是否已导入过相同内容的文件；include_jobs 为真时未结束的导入任务也算在内，
+    执行进程已退出（租约过期）的任务先标记为失败，不再阻止重新上传。
+    """
+    if db.session.query(
+        ImportedFile.query.filter_by(user_id=user_id, sha256=file_hash).exists()
+    ).scalar():
+        return True
+    if not include_jobs:
+        return False
+    expire_stale_jobs(user_id)
+    return db.session.query(
+        ImportJob.query.filter(ImportJob.user_id == user_id, ImportJob.file_hash == file_hash,
+                               ImportJob.status.notin_(FINISHED_STATUSES)).exists()
+    ).scalar()
+
 
 @upload_bp.route('/upload', methods=['POST'])
 @token_required
 def upload_file(current_user):
     """
     文件上传路由。
-    接收上传的 Excel 文件（.xls 或 .xlsx 格式），解析文件内容并将记录导入数据库。
+    接收上传的 Excel（.xls、.xlsx）、CSV 或 NDJSON（.ndjson、.jsonl）文件，按列解析和校验文件内容，
+    并将有效记录分块批量导入数据库。CSV 和 NDJSON 流式分块读取，内存占用与文件大小无关。
+    无效的行会被跳过，并在响应中按行号列出原因；与已有记录完全相同的行不会重复导入。
+    内容完全相同的文件再次上传时不做解析，直接返回 409。
     返回上传和导入成功的消息和状态码 200。
 
     示例请求:
     POST /upload
-    - 文件：包含时间、类别、金额、类型和备注列的 Excel 文件
+    - 文件：包含时间、类别、金额、类型和备注列的 Excel、CSV 或 NDJSON 文件
 
     示例响应:
     {
         "message": "文件上传并导入成功。",
-        "imported_records": 10
+        "imported_records": 10,
+        "duplicate_records": 2,
+        "rejected_count": 1,
+        "rejected_rows": [{"row": 4, "error": "无效的金额：abc"}]
     }
     """
     if 'file' not in request.files:
@@ -40,76 +63,178 @@ def upload_file(current_user):
         return jsonify({"error": "未选择文件。"}), 400
 
     if not allowed_file(file.filename):
-        return jsonify({"error": "无效的文件类型。只能上传 .xls 或 .xlsx 文件。"}), 400
+        return jsonify({"error": "无效的文件类型。只能上传 .xls、.xlsx、.csv 或 .ndjson 文件。"}), 400
 
-    filename = secure_filename(file.filename)
-    file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
-    file.save(file_path)
+    file_hash = hash_stream(file.stream)
+    if _already_imported(current_user.id, file_hash):
+        return jsonify({"error": "该文件已导入过。"}), 409
 
-    try:
-        df = pd.read_excel(file_path)
-        required_columns = {'时间', '类别', '金额', '类型', '备注'}
-        existing_columns = set(df.columns.str.strip())
-        if not required_columns.issubset(existing_columns):
-            missing = required_columns - existing_columns
-            return jsonify({"error": f"Excel 文件缺少必要的列。缺少列：{', '.join(missing)}"}), 400
-
-        df.columns = [col.strip() for col in df.columns]
-
-        column_mapping = {
-            '时间': 'date',
-            '类别': 'category',
-            '金额': 'amount',
-            '类型': 'type',
-            '备注': 'note'
-        }
+    # 导入模块依赖 pandas 和 numpy，首次上传时才加载，应用启动和不处理上传的工作进程不必导入
+    from ..importer import read_frames, iter_parsed_chunks, insert_records, MissingColumnsError, UnreadableFileError
 
+    try:
+        chunk_size = current_app.config['IMPORT_CHUNK_SIZE']
+        max_reported = current_app.config['IMPORT_MAX_REPORTED_REJECTIONS']
+        # 直接从请求流解析：小文件在内存中，大文件已由请求类转存到临时文件
+        frames = read_frames(file.stream, chunk_size, file_extension(file.filename),
+                             current_app.config['IMPORT_CSV_ENCODING'])
         imported_records = 0
+        valid_records = 0
+        rejected_count = 0
+        rejected = []
+        # 逐块解析、校验并批量插入，每块插入后即释放
+        for rows, chunk_rejected in iter_parsed_chunks(frames, current_user.id):
+            imported_records += insert_records(rows, chunk_size)
+            valid_records += len(rows)
+            rejected_count += len(chunk_rejected)
+            rejected.extend(chunk_rejected[:max_reported - len(rejected)])
+        db.session.add(ImportedFile(user_id=current_user.id, sha256=file_hash, filename=file.filename[-255:],
+                                    imported_records=imported_records))
+        db.session.commit()
 
-        for index, row in df.iterrows():
-            try:
-                amount = float(row['金额'])
-                category = str(row['类别'])
-                type_data = str(row['类型'])
-                note = str(row['备注']) if not pd.isna(row['备注']) else None
-
-                if pd.isna(row['时间']):
-                    record_date = datetime.datetime.now(east_asia_tz)
-                else:
-                    if isinstance(row['时间'], pd.Timestamp):
-                        record_date = row['时间'].to_pydatetime().replace(tzinfo=east_asia_tz)
-                    else:
-                        try:
-                            record_date = datetime.datetime.strptime(row['时间'], '%Y-%m-%d %H:%M').replace(
-                                tzinfo=east_asia_tz)
-                        except ValueError:
-                            record_date = datetime.datetime.strptime(row['时间'], '%Y/%m/%d %H:%M').replace(
-                                tzinfo=east_asia_tz)
-
-                type_mapping = {"收入": "income", "支出": "expense"}
-                type_data = type_mapping[type_data]
-                if type_data not in ['income', 'expense']:
-                    raise ValueError(f"无效的类型：{type_data}")
-
-                record = Record(
-                    user_id=current_user.id,
-                    amount=amount,
-                    category=category,
-                    type=type_data,
-                    note=note,
-                    date=record_date
-                )
-                db.session.add(record)
-                imported_records += 1
-            except Exception as e:
-                current_app.logger.error(f"导入第 {index + 2} 行时出错：{str(e)}")
-                continue
+        if rejected:
+            current_app.logger.error(f"导入文件时跳过 {rejected_count} 行，首个错误位于第 {rejected[0]['row']} 行：{rejected[0]['error']}")
 
-        db.session.commit()
-        os.remove(file_path)
+        return jsonify({
+            "message": "文件上传并导入成功。",
+            "imported_records": imported_records,
+            "duplicate_records": valid_records - imported_records,
+            "rejected_count": rejected_count,
+            "rejected_rows": rejected
+        }), 200
 
-        return jsonify({"message": "文件上传并导入成功。", "imported_records": imported_records}), 200
+    except (MissingColumnsError, UnreadableFileError) as e:
+        # 文件本身的问题属于客户端错误；读取中途出错时回滚已插入的块
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 400
+
+    except IntegrityError:
+        # 同一文件的并发上传：先提交的请求已导入，本次整体回滚
+        db.session.rollback()
+        return jsonify({"error": "该文件已导入过。"}), 409
 
     except Exception as e:
+        db.session.rollback()
         current_app.logger.error(f"处理上传文件时出错：{str(e)}")
-        return jsonify({"error": "处理文件时出错。"}), 500
\ No newline at end of file
+        return jsonify({"error": "处理文件时出错。"}), 500
+
+@upload_bp.route('/upload/jobs', methods=['POST'])
+@token_required
+def create_import_job(current_user):
+    """
+    创建导入任务路由。
+    接收上传的导入文件（格式同 /upload），立即返回任务 ID，由后台线程池分块解析和导入，
+    每块单独提交事务。适用于请求内处理会超时的大文件。
+    已导入过或正在导入的相同文件直接返回 409。
+    返回任务信息和状态码 202。
+
+    示例请求:
+    POST /upload/jobs
+    - 文件：包含时间、类别、金额、类型和备注列的 Excel、CSV 或 NDJSON 文件
+
+    示例响应:
+    {
+        "message": "导入任务已创建。",
+        "job_id": "3f2b8c1e9d7a4b6c8e0f1a2b3c4d5e6f",
+        "status": "pending"
+    }
+    """
+    if 'file' not in request.files:
+        return jsonify({"error": "未找到文件。"}), 400
+
+    file = request.files['file']
+
+    if file.filename == '':
+        return jsonify({"error": "未选择文件。"}), 400
+
+    if not allowed_file(file.filename):
+        return jsonify({"error": "无效的文件类型。只能上传 .xls、.xlsx、.csv 或 .ndjson 文件。"}), 400
+
+    # 请求结束后文件流即关闭，先写入唯一的临时文件，由任务结束时删除
+    fd, path = tempfile.mkstemp(suffix='.' + file_extension(file.filename))
+    with os.fdopen(fd, 'wb') as tmp_file:
+        file_hash = hash_stream(file.stream, copy_to=tmp_file)
+
+    if _already_imported(current_user.id, file_hash, include_jobs=True):
+        os.remove(path)
+        return jsonify({"error": "该文件已导入过。"}), 409
+
+    job = ImportJob(id=uuid.uuid4().hex, user_id=current_user.id, filename=file.filename[-255:],
+                    file_hash=file_hash, status='pending')
+    try:
+        db.session.add(job)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        os.remove(path)
+        current_app.logger.error(f"创建导入任务时出错：{str(e)}")
+        return jsonify({"error": "创建导入任务失败。"}), 500
+
+    submit_import_job(job.id, path)
+    return jsonify({"message": "导入任务已创建。", "job_id": job.id, "status": job.status}), 202
+
+
+@upload_bp.route('/upload/jobs/<job_id>', methods=['GET'])
+@token_required
+def get_import_job(current_user, job_id):
+    """
+    查询导入任务路由。
+    返回任务状态、已处理/已导入/被跳过的行数和处理速度（行/秒）。
+
+    示例请求:
+    GET /upload/jobs/3f2b8c1e9d7a4b6c8e0f1a2b3c4d5e6f
+
+    示例响应:
+    {
+        "job_id": "3f2b8c1e9d7a4b6c8e0f1a2b3c4d5e6f",
+        "filename": "records.xlsx",
+        "status": "running",
+        "rows_processed": 20000,
+        "rows_imported": 19990,
+        "rows_duplicate": 8,
+        "rows_rejected": 2,
+        "rejected_rows": [{"row": 4, "error": "无效的金额：abc"}],
+        "throughput": 8500.0,
+        "error": null,
+        "created_at": "2024-05-01 10:00:00",
+        "started_at": "2024-05-01 10:00:00",
+        "finished_at": null
+    }
+    """
+    expire_stale_jobs(current_user.id)
+    job = ImportJob.query.filter_by(id=job_id, user_id=current_user.id).first()
+
+    if not job:
+        return jsonify({"error": "导入任务未找到。"}), 404
+
+    return jsonify(job_to_dict(job)), 200
+
+
+@upload_bp.route('/upload/jobs/<job_id>', methods=['DELETE'])
+@token_required
+def cancel_import_job(current_user, job_id):
+    """
+    取消导入任务路由。
+    设置取消标记，任务在处理下一块数据前停止；已提交的数据块会保留。
+    返回取消请求已接受的消息和状态码 202。
+
+    示例请求:
+    DELETE /upload/jobs/3f2b8c1e9d7a4b6c8e0f1a2b3c4d5e6f
+
+    示例响应:
+    {
+        "message": "已请求取消导入任务。"
+    }
+    """
+    expire_stale_jobs(current_user.id)
+    job = ImportJob.query.filter_by(id=job_id, user_id=current_user.id).first()
+
+    if not job:
+        return jsonify({"error": "导入任务未找到。"}), 404
+
+    if job.status in FINISHED_STATUSES:
+        return jsonify({"error": "导入任务已结束，无法取消。"}), 409
+
+    job.cancel_requested = True
+    db.session.commit()
+    return jsonify({"message": "已请求取消导入任务。"}), 202
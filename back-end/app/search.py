@@ -0,0 +1,406 @@
+# app/search.py
+
+from sqlalchemy import DDL, event, text
+from .extensions import db
+from .models import Record
+
+# 全文索引表，与 record.id 一一对应。SQLite 上为 FTS5 虚拟表（rowid 即记录 ID，FTS5 会再创建以该名称开头的几张内部表），
+# PostgreSQL 上为带 GIN 索引的 tsvector 表
+SEARCH_TABLE = 'record_search'
+
+# owner 列保存 "u<用户 ID>"，将匹配限定在当前用户；note 和 category 列保存二元切分后的词
+CREATE_SEARCH_TABLE = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} "
+    "USING fts5(owner, note, category, tokenize='unicode61 remove_diacritics 2', prefix='1')"
+)
+
+# 相关度打分参数（与 FTS5 bm25() 的默认值相同），以及 note、category 两列的权重
+BM25_K1 = 1.2
+BM25_B = 0.75
+COLUMN_WEIGHTS = (1.0, 2.0)
+
+# PostgreSQL 的 document 列中，owner 词元为 "#<用户 ID>"（不带位置，search_terms 不会切分出 #），
+# 备注和类别的二元词元分别带权重 B 和 A，类别的位置与备注隔开，短语不会跨列匹配
+CREATE_PG_SEARCH_TABLE = f"CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} (id INTEGER PRIMARY KEY, document TSVECTOR NOT NULL)"
+CREATE_PG_SEARCH_INDEX = f"CREATE INDEX IF NOT EXISTS ix_{SEARCH_TABLE}_document ON {SEARCH_TABLE} USING GIN (document)"
+
+# ts_rank 的权重数组，依次为 D、C、B、A 四级：owner 不参与打分，备注与类别之比同 COLUMN_WEIGHTS（权重不能大于 1）
+TS_RANK_WEIGHTS = '{0,0,%g,%g}' % (COLUMN_WEIGHTS[0] / max(COLUMN_WEIGHTS), COLUMN_WEIGHTS[1] / max(COLUMN_WEIGHTS))
+# tsvector 中位置的上限，更大的位置会被截断为该值
+TS_MAX_POSITION = 16383
+
+# db.create_all() 时同时创建搜索表，迁移中另有对应的建表脚本
+event.listen(db.metadata, 'after_create', DDL(CREATE_SEARCH_TABLE).execute_if(dialect='sqlite'))
+event.listen(db.metadata, 'after_create', DDL(CREATE_PG_SEARCH_TABLE).execute_if(dialect='postgresql'))
+event.listen(db.metadata, 'after_create', DDL(CREATE_PG_SEARCH_INDEX).execute_if(dialect='postgresql'))
+
+
+def _runs(value):
+    """将文本按非字母数字字符切分成连续片段，统一为小写。"""
+    runs, current = [], []
+    for char in (value or '').lower():
+        if char.isalnum():
+            current.append(char)
+        elif current:
+            runs.append(''.join(current))
+            current = []
+    if current:
+        runs.append(''.join(current))
+    return runs
+
+
+def search_terms(value):
+    """
+    把文本切分为供全文索引的词：每个片段输出相邻两字的组合，最后再输出末尾的单字。
+    中文没有空格分词，按两字切分后任意长度的子串都能检索：
+    两字及以上的关键词转换为相邻二元组的短语，单字关键词用前缀查询匹配以它开头的二元组或末尾单字。
+    例如 "午饭 Lunch" 切分为 "午饭 饭 lu un nc ch h"。
+    """
+    terms = []
+    for run in _runs(value):
+        terms.extend(run[i:i + 2] for i in range(len(run) - 1))
+        terms.append(run[-1])
+    return ' '.join(terms)
+
+
+def _query_phrases(query):
+    """
+    将搜索关键词转换为短语列表，每个短语为 (词元列表, 是否前缀匹配)：
+    两字及以上的片段转换为相邻二元组组成的短语，单字片段前缀匹配。
+    """
+    phrases = []
+    for run in _runs(query):
+        if len(run) == 1:
+            phrases.append(([run], True))
+        else:
+            phrases.append(([run[i:i + 2] for i in range(len(run) - 1)], False))
+    return phrases
+
+
+def search_entry(record):
+    """根据记录生成一条索引项 (id, user_id, note, category)。"""
+    return record.id, record.user_id, record.note, record.category
+
+
+def _phrase_count(tokens, phrase):
+    """短语在词元列表中出现的次数。"""
+    words, prefix = phrase
+    n = len(words)
+    if prefix:
+        return sum(1 for token in tokens if token.startswith(words[0]))
+    return sum(1 for i in range(len(tokens) - n + 1) if tokens[i:i + n] == words)
+
+
+def _bm25_scores(candidates, phrases):
+    """
+    按 BM25 的词频饱和与长度归一化为候选 (id, note 词元, category 词元) 打分，返回 (id, 分数) 列表。
+    所有候选都包含全部短语，逆文档频率对排序没有影响，因此省略。类别命中的权重高于备注。
+    """
+    columns = [(row[0], [row[1].split(), row[2].split()]) for row in candidates]
+    average = [max(1.0, sum(len(cols[c]) for _, cols in columns) / len(columns)) for c in range(2)]
+    scores = []
+    for record_id, cols in columns:
+        score = 0.0
+        for c, tokens in enumerate(cols):
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * len(tokens) / average[c])
+            for phrase in phrases:
+                tf = _phrase_count(tokens, phrase)
+                score += COLUMN_WEIGHTS[c] * tf * (BM25_K1 + 1) / (tf + norm)
+        scores.append((record_id, score))
+    return scores
+
+
+def _quote_lexeme(lexeme):
+    """按 tsvector/tsquery 文本格式给词元加引号，词元按原样保存，不经过 PostgreSQL 的分词和词典。"""
+    return "'" + lexeme.replace('\\', '\\\\').replace("'", "''") + "'"
+
+
+def tsvector_literal(user_id, note, category):
+    """
+    生成记录的 tsvector 文本：owner 词元，加上备注（权重 B）和类别（权重 A）按 search_terms 切分的词元和位置。
+    类别的位置从备注之后空一位开始，相邻位置（<->）的短语不会跨越两列。
+    """
+    lexemes = [_quote_lexeme(f'#{user_id}')]
+    position = 0
+    for value, weight in ((note, 'B'), (category, 'A')):
+        for term in search_terms(value).split():
+            position += 1
+            lexemes.append(f"{_quote_lexeme(term)}:{min(position, TS_MAX_POSITION)}{weight}")
+        position += 1
+    return ' '.join(lexemes)
+
+
+def tsquery_literal(user_id, phrases):
+    """将短语列表转换为 tsquery 文本，限定在当前用户的记录中，所有短语都需出现。"""
+    terms = [_quote_lexeme(f'#{user_id}')]
+    for tokens, prefix in phrases:
+        if prefix:
+            terms.append(_quote_lexeme(tokens[0]) + ':*')
+        elif len(tokens) == 1:
+            terms.append(_quote_lexeme(tokens[0]))
+        else:
+            terms.append('(' + ' <-> '.join(_quote_lexeme(token) for token in tokens) + ')')
+    return ' & '.join(terms)
+
+
+class SearchBackend:
+    """
+    全文搜索后端的接口，按数据库方言选择（见 get_search_backend）。
+    index 和 remove 与记录的写入处于同一事务，由调用方提交；没有索引的后端不需要维护，默认什么也不做。
+    """
+    # 是否维护索引表：为真时批量写入记录后需要建立索引才能搜索到
+    indexed = False
+
+    def index(self, entries):
+        """将记录写入（或覆盖）索引。entries 为 (id, user_id, note, category) 的列表。"""
+
+    def remove(self, record_ids):
+        """从索引中删除记录。"""
+
+    def search(self, user_id, query, limit, offset, window):
+        """返回按相关度排序的记录 ID 列表。"""
+        raise NotImplementedError
+
+    def rebuild(self, batch_size):
+        """从记录表重建索引并提交，返回写入的记录数。"""
+        return 0
+
+    def index_after(self, last_id):
+        """为 id 大于 last_id 的记录建立索引并提交，返回写入的记录数。"""
+        return 0
+
+
+class LikeSearchBackend(SearchBackend):
+    """
+    没有全文索引的数据库：每个以空格分隔的词一个 LIKE 子串条件，按时间倒序，不计算相关度。
+    查询需要扫描用户的全部记录，只适合记录较少的账本。
+    """
+
+    def search(self, user_id, query, limit, offset, window):
+        # 与全文索引一致：每个词都需出现在备注或类别中，不区分大小写
+        conditions = [
+            Record.note.icontains(term, autoescape=True) | Record.category.icontains(term, autoescape=True)
+            for term in query.split()
+        ]
+        rows = db.session.query(Record.id).filter(
+            Record.user_id == user_id, *conditions
+        ).order_by(Record.date.desc(), Record.id.desc()).limit(limit).offset(offset)
+        return [row.id for row in rows]
+
+
+class RankedSearchBackend(SearchBackend):
+    """
+    有全文索引的后端共用的查询流程：取最近录入的 window 条匹配按相关度排序，其余匹配按记录 ID 倒序接在后面。
+    只为窗口内的候选打分，索引按 ID 倒序取满 LIMIT 即可结束，每次查询的代价与匹配总数基本无关。
+    子类实现 _candidates、_older 和 _clear。
+    """
+    indexed = True
+
+    def _candidates(self, user_id, phrases, window):
+        """返回最近的 window 条匹配的 (id, 分数) 列表，按 ID 倒序。"""
+        raise NotImplementedError
+
+    def _older(self, user_id, phrases, before_id, limit, offset):
+        """返回 ID 小于 before_id 的匹配，按 ID 倒序分页。"""
+        raise NotImplementedError
+
+    def _clear(self):
+        raise NotImplementedError
+
+    def search(self, user_id, query, limit, offset, window):
+        phrases = _query_phrases(query)
+        if not phrases:
+            return []
+        candidates = self._candidates(user_id, phrases, window)
+        if not candidates:
+            return []
+        ranked = sorted(candidates, key=lambda item: (-item[1], -item[0]))
+        record_ids = [record_id for record_id, _ in ranked[offset:offset + limit]]
+        if len(candidates) < window or len(record_ids) == limit:
+            return record_ids
+        return record_ids + self._older(user_id, phrases, candidates[-1][0], limit - len(record_ids),
+                                        max(0, offset - window))
+
+    def rebuild(self, batch_size):
+        self._clear()
+        total = self._index_batches(0, batch_size)
+        db.session.commit()
+        return total
+
+    def index_after(self, last_id, batch_size=5000):
+        total = self._index_batches(last_id, batch_size)
+        db.session.commit()
+        return total
+
+    def _index_batches(self, last_id, batch_size):
+        total = 0
+        while True:
+            rows = db.session.query(Record.id, Record.user_id, Record.note, Record.category).filter(
+                Record.id > last_id
+            ).order_by(Record.id).limit(batch_size).all()
+            if not rows:
+                return total
+            self.index([tuple(row) for row in rows])
+            total += len(rows)
+            last_id = rows[-1].id
+
+
+class SqliteSearchBackend(RankedSearchBackend):
+    """
+    SQLite FTS5 索引。
+    FTS5 内置的 bm25() 需要先扫描每个词的完整倒排列表以计算逆文档频率，
+    常见词（以及限定用户的 owner 词）在百万级账本上有几十万条，耗时与匹配总数成正比；
+    这里只读取窗口内候选的词元，在 Python 中按 BM25 打分（见 _bm25_scores）。
+    """
+
+    @staticmethod
+    def _match_expression(user_id, phrases):
+        """将短语列表转换为 FTS5 查询表达式，限定在当前用户的记录中，所有短语都需出现。"""
+        terms = [f'"{" ".join(tokens)}"' + ('*' if prefix else '') for tokens, prefix in phrases]
+        return f'owner:u{user_id} AND {{note category}}:({" AND ".join(terms)})'
+
+    def index(self, entries):
+        params = [{"id": record_id, "owner": f"u{user_id}", "note": search_terms(note),
+                   "category": search_terms(category)}
+                  for record_id, user_id, note, category in entries]
+        if params:
+            db.session.execute(
+                text(f"INSERT OR REPLACE INTO {SEARCH_TABLE} (rowid, owner, note, category) "
+                     "VALUES (:id, :owner, :note, :category)"),
+                params
+            )
+
+    def remove(self, record_ids):
+        if record_ids:
+            db.session.execute(text(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = :id"),
+                               [{"id": record_id} for record_id in record_ids])
+
+    def _candidates(self, user_id, phrases, window):
+        rows = db.session.execute(
+            text(f"SELECT rowid, note, category FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :match "
+                 "ORDER BY rowid DESC LIMIT :window"),
+            {"match": self._match_expression(user_id, phrases), "window": window}
+        ).all()
+        return _bm25_scores(rows, phrases) if rows else []
+
+    def _older(self, user_id, phrases, before_id, limit, offset):
+        rows = db.session.execute(
+            text(f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :match AND rowid < :last "
+                 "ORDER BY rowid DESC LIMIT :limit OFFSET :offset"),
+            {"match": self._match_expression(user_id, phrases), "last": before_id, "limit": limit,
+             "offset": offset}
+        )
+        return [row[0] for row in rows]
+
+    def _clear(self):
+        db.session.execute(text(f"DELETE FROM {SEARCH_TABLE}"))
+
+    def index_after(self, last_id):
+        """
+        备注和类别按不同的取值各切分一次，再用一条 INSERT ... SELECT 写入，
+        适合取值重复多的数据（如 flask seed 生成的记录）。
+        """
+        values = {value for column in (Record.note, Record.category)
+                  for value, in db.session.query(column).filter(Record.id > last_id, column.isnot(None)).distinct()}
+        db.session.execute(text("CREATE TEMP TABLE IF NOT EXISTS search_terms_map (value TEXT PRIMARY KEY, terms TEXT)"))
+        db.session.execute(text("DELETE FROM search_terms_map"))
+        if values:
+            db.session.execute(text("INSERT INTO search_terms_map (value, terms) VALUES (:value, :terms)"),
+                               [{"value": value, "terms": search_terms(value)} for value in values])
+        result = db.session.execute(
+            text(f"INSERT OR REPLACE INTO {SEARCH_TABLE} (rowid, owner, note, category) "
+                 "SELECT r.id, 'u' || r.user_id, coalesce(n.terms, ''), coalesce(c.terms, '') FROM record r "
+                 "LEFT JOIN search_terms_map n ON n.value = r.note "
+                 "LEFT JOIN search_terms_map c ON c.value = r.category "
+                 "WHERE r.id > :last_id"),
+            {"last_id": last_id}
+        )
+        db.session.execute(text("DROP TABLE search_terms_map"))
+        db.session.commit()
+        return result.rowcount
+
+
+class PostgresSearchBackend(RankedSearchBackend):
+    """
+    PostgreSQL 索引：record_search.document 为 tsvector，GIN 索引。
+    词元与 SQLite 相同，由 search_terms 切分后按原样写入，不依赖数据库的分词配置，中文同样可以检索；
+    窗口内的候选由 ts_rank 打分（类别权重高于备注，按文档长度归一化）。
+    """
+
+    def index(self, entries):
+        params = [{"id": record_id, "document": tsvector_literal(user_id, note, category)}
+                  for record_id, user_id, note, category in entries]
+        if params:
+            db.session.execute(
+                text(f"INSERT INTO {SEARCH_TABLE} (id, document) VALUES (:id, CAST(:document AS tsvector)) "
+                     "ON CONFLICT (id) DO UPDATE SET document = excluded.document"),
+                params
+            )
+
+    def remove(self, record_ids):
+        if record_ids:
+            db.session.execute(text(f"DELETE FROM {SEARCH_TABLE} WHERE id = ANY(:ids)"), {"ids": list(record_ids)})
+
+    def _candidates(self, user_id, phrases, window):
+        rows = db.session.execute(
+            text("SELECT id, ts_rank(CAST(:weights AS float4[]), document, CAST(:query AS tsquery), 1) "
+                 f"FROM {SEARCH_TABLE} WHERE document @@ CAST(:query AS tsquery) ORDER BY id DESC LIMIT :window"),
+            {"weights": TS_RANK_WEIGHTS, "query": tsquery_literal(user_id, phrases), "window": window}
+        )
+        return [(row[0], row[1]) for row in rows]
+
+    def _older(self, user_id, phrases, before_id, limit, offset):
+        rows = db.session.execute(
+            text(f"SELECT id FROM {SEARCH_TABLE} WHERE document @@ CAST(:query AS tsquery) AND id < :last "
+                 "ORDER BY id DESC LIMIT :limit OFFSET :offset"),
+            {"query": tsquery_literal(user_id, phrases), "last": before_id, "limit": limit, "offset": offset}
+        )
+        return [row[0] for row in rows]
+
+    def _clear(self):
+        db.session.execute(text(f"DELETE FROM {SEARCH_TABLE}"))
+
+
+SEARCH_BACKENDS = {
+    'sqlite': SqliteSearchBackend(),
+    'postgresql': PostgresSearchBackend(),
+}
+FALLBACK_SEARCH_BACKEND = LikeSearchBackend()
+
+
+def get_search_backend():
+    """按当前连接的数据库方言返回搜索后端，没有对应索引实现的数据库退化为 LikeSearchBackend。"""
+    return SEARCH_BACKENDS.get(db.session.get_bind().dialect.name, FALLBACK_SEARCH_BACKEND)
+
+
+def index_records(entries):
+    """将记录写入（或覆盖）全文索引，entries 为 (id, user_id, note, category) 的可迭代对象。由调用方提交。"""
+    get_search_backend().index(list(entries))
+
+
+def remove_records(record_ids):
+    """从全文索引中删除记录。由调用方提交。"""
+    get_search_backend().remove(record_ids)
+
+
+def search_record_ids(user_id, query, limit, offset=0, window=1000):
+    """
+    在当前用户的记录中搜索备注和类别，返回按相关度排序的记录 ID 列表：
+    最近录入的 window 条匹配按相关度排序，更早的匹配按录入时间倒序排在其后（见 RankedSearchBackend）。
+    """
+    return get_search_backend().search(user_id, query, limit, offset, window)
+
+
+def rebuild_search_index(batch_size=5000):
+    """从记录表重建全文索引，返回写入的记录数；没有索引的数据库返回 0。"""
+    return get_search_backend().rebuild(batch_size)
+
+
+def index_records_after(last_id):
+    """为 id 大于 last_id 的记录批量建立全文索引，用于一次写入大量记录之后，返回写入的记录数。"""
+    return get_search_backend().index_after(last_id)
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    """供 Alembic 自动生成迁移时忽略全文索引表（它不在模型中，由迁移脚本单独创建）。"""
+    return not (type_ == 'table' and name.startswith(SEARCH_TABLE))
@@ -0,0 +1,313 @@
+# app/synthetic.py
+
+import datetime
+import heapq
+import numpy as np
+from sqlalchemy import create_engine, insert
+from werkzeug.security import generate_password_hash
+from .models import Record, User, DailyRollup
+
+# (类别, 相对频率, 金额中位数（元）, 金额对数标准差, 备注候选)
+# 频率明显偏斜：少数日常类别占大部分记录，大额类别（住房、旅行）次数少、金额大
+EXPENSE_CATEGORIES = [
+    ('餐饮', 30, 35, 0.7, ['午饭', '晚饭', '早餐', '外卖', '咖啡', '奶茶', '和同事聚餐']),
+    ('交通', 16, 12, 0.8, ['地铁', '公交', '打车', '加油', '停车费', '高铁']),
+    ('购物', 14, 120, 1.0, ['超市', '日用品', '衣服', '网购', '数码产品']),
+    ('娱乐', 8, 80, 0.9, ['电影', '游戏', 'KTV', '演唱会', '视频会员']),
+    ('其他', 5, 50, 1.2, ['红包', '礼物', '捐款']),
+    ('住房', 3, 2500, 0.4, ['房租', '物业费', '水电', '燃气']),
+    ('医疗', 3, 150, 1.0, ['药店', '挂号', '体检']),
+    ('通讯', 3, 60, 0.4, ['话费', '宽带']),
+    ('教育', 2, 300, 1.0, ['书籍', '网课', '培训']),
+    ('旅行', 1, 1500, 0.9, ['机票', '酒店', '景区门票']),
+]
+INCOME_CATEGORIES = [
+    ('工资', 60, 12000, 0.3, ['工资', '月薪']),
+    ('理财', 20, 300, 1.2, ['基金收益', '存款利息', '股票分红']),
+    ('兼职', 10, 800, 0.8, ['兼职', '稿费', '外包项目']),
+    ('奖金', 10, 5000, 0.8, ['年终奖', '绩效奖金']),
+]
+# 收入记录的比例和有备注的记录比例
+INCOME_RATIO = 0.08
+NOTE_RATIO = 0.7
+# 批量写入期间 SQLite 连接使用的 PRAGMA：不写回滚日志、不等待落盘，写入中途崩溃可能损坏数据库
+BULK_LOAD_PRAGMAS = (('journal_mode', 'OFF'), ('synchronous', 'OFF'), ('temp_store', 'MEMORY'))
+# seed_shard 写入的 SQLite 分片文件中的表，不带索引和约束，由主进程合并到正式的表中
+SHARD_TABLES = (
+    "CREATE TABLE record (user_id INTEGER, amount INTEGER, category TEXT, date TEXT, type TEXT, note TEXT, "
+    "created_version INTEGER, updated_version INTEGER)",
+    "CREATE TABLE daily_rollup (user_id INTEGER, day TEXT, type TEXT, category TEXT, amount INTEGER, count INTEGER)",
+)
+_RECORD_COLUMNS = "user_id, amount, category, date, type, note, created_version, updated_version"
+_ROLLUP_COLUMNS = "user_id, day, type, category, amount, count"
+# 0 点到 23 点的相对频率：三餐和通勤时段高，深夜低
+HOUR_WEIGHTS = (2, 1, 0.5, 0.3, 0.3, 0.5, 2, 6, 9, 6, 4, 7, 12, 8, 4, 4, 5, 7, 11, 10, 8, 7, 5, 3)
+# 周一到周日的相对频率，周末消费更多
+WEEKDAY_WEIGHTS = (1.0, 1.0, 1.0, 1.05, 1.15, 1.4, 1.3)
+# 账本时间范围内记录频率从 ACTIVITY_GROWTH[0] 线性增长到 ACTIVITY_GROWTH[1]，模拟用户越用越多
+ACTIVITY_GROWTH = (0.5, 1.5)
+DEFAULT_START = datetime.date(2020, 1, 1)
+DEFAULT_END = datetime.date(2025, 1, 1)
+
+
+def _category_table(categories, offset):
+    names = [name for name, *_ in categories]
+    weights = np.array([weight for _, weight, *_ in categories], dtype=float)
+    return {
+        "names": names,
+        "p": weights / weights.sum(),
+        "offset": offset,
+        "log_median": np.log([median for _, _, median, *_ in categories]),
+        "sigma": np.array([sigma for *_, sigma, _ in categories]),
+    }
+
+
+_EXPENSE = _category_table(EXPENSE_CATEGORIES, 0)
+_INCOME = _category_table(INCOME_CATEGORIES, len(EXPENSE_CATEGORIES))
+CATEGORY_NAMES = np.array(_EXPENSE["names"] + _INCOME["names"], dtype=object)
+_LOG_MEDIAN = np.concatenate([_EXPENSE["log_median"], _INCOME["log_median"]])
+_SIGMA = np.concatenate([_EXPENSE["sigma"], _INCOME["sigma"]])
+# 所有类别的备注拼成一个数组，按类别的起始位置和个数取值
+_NOTE_LISTS = [notes for *_, notes in EXPENSE_CATEGORIES + INCOME_CATEGORIES]
+NOTES = np.array([note for notes in _NOTE_LISTS for note in notes], dtype=object)
+_NOTE_OFFSETS = np.cumsum([0] + [len(notes) for notes in _NOTE_LISTS[:-1]])
+_NOTE_COUNTS = np.array([len(notes) for notes in _NOTE_LISTS])
+_HOUR_P = np.array(HOUR_WEIGHTS) / sum(HOUR_WEIGHTS)
+_CATEGORY_CODES = {name: code for code, name in enumerate(CATEGORY_NAMES)}
+_CATEGORY_TYPES = np.array(['expense'] * len(_EXPENSE["names"]) + ['income'] * len(_INCOME["names"]), dtype=object)
+# 格式化时间用的“时:分”字符串，下标为一天中的分钟数；格式与 SQLAlchemy 在 SQLite 中存储 DateTime 的格式一致
+_TIME_STRINGS = np.array([f" {minute // 60:02d}:{minute % 60:02d}:00.000000" for minute in range(1440)], dtype=object)
+
+
+def records_per_user(n_users, n_records, seed=0, skew=1.2):
+    """
+    把 n_records 条记录按帕累托分布分给 n_users 个用户，少数活跃用户占大部分记录。
+    返回长度为 n_users 的整数数组，总和为 n_records；相同的参数总是得到相同的结果。
+    """
+    rng = np.random.default_rng([seed, 0])
+    weights = rng.pareto(skew, n_users) + 1
+    return rng.multinomial(n_records, weights / weights.sum())
+
+
+def _day_probabilities(start, end):
+    """账本时间范围内每天的记录概率：按星期几加权，并随时间线性增长。"""
+    n_days = (end - start).days
+    weekdays = (np.arange(n_days) + start.weekday()) % 7
+    weights = np.take(WEEKDAY_WEIGHTS, weekdays) * np.linspace(*ACTIVITY_GROWTH, n_days)
+    return weights / weights.sum()
+
+
+def generate_user_records(user_id, count, seed=0, start=DEFAULT_START, end=DEFAULT_END, chunk_size=100000):
+    """
+    逐块生成一个用户的 count 条记录，每块最多 chunk_size 条，按时间先后排列。
+    每块是一个列字典：user_id、date（numpy datetime64[m]）、amount（整数，单位为分）、
+    type、category、note（object 数组，无备注为 None）。
+    随机数由 (seed, user_id) 决定，同一个用户在任何进程中生成的记录都相同。
+    """
+    if count <= 0:
+        return
+    rng = np.random.default_rng([seed, user_id])
+    # 先抽取所有记录的日期并排序，再按块生成其余字段，块之间的时间连续递增
+    days = np.sort(rng.choice((end - start).days, size=count, p=_day_probabilities(start, end)))
+    origin = np.datetime64(start, 'm')
+
+    for begin in range(0, count, chunk_size):
+        day = days[begin:begin + chunk_size]
+        n = len(day)
+        minute = rng.choice(24, size=n, p=_HOUR_P) * 60 + rng.integers(0, 60, size=n)
+        offsets = np.sort(day.astype(np.int64) * 1440 + minute)
+
+        income = rng.random(n) < INCOME_RATIO
+        category = np.where(
+            income,
+            rng.choice(len(_INCOME["names"]), size=n, p=_INCOME["p"]) + _INCOME["offset"],
+            rng.choice(len(_EXPENSE["names"]), size=n, p=_EXPENSE["p"]),
+        )
+        yuan = np.exp(_LOG_MEDIAN[category] + _SIGMA[category] * rng.standard_normal(n))
+        amount = np.maximum(np.round(yuan * 100), 1).astype(np.int64)
+
+        note = NOTES[_NOTE_OFFSETS[category] + rng.integers(0, 1 << 30, size=n) % _NOTE_COUNTS[category]]
+        note[rng.random(n) >= NOTE_RATIO] = None
+
+        yield {
+            "user_id": np.full(n, user_id, dtype=np.int64),
+            "date": origin + offsets.astype('timedelta64[m]'),
+            "amount": amount,
+            "type": np.where(income, 'income', 'expense').astype(object),
+            "category": CATEGORY_NAMES[category],
+            "note": note,
+        }
+
+
+def generate_records(user_ids, counts, seed=0, start=DEFAULT_START, end=DEFAULT_END, chunk_size=100000):
+    """依次生成多个用户的记录，counts 为每个用户的记录数（可由 records_per_user 得到）。"""
+    for user_id, count in zip(user_ids, counts):
+        yield from generate_user_records(int(user_id), int(count), seed, start, end, chunk_size)
+
+
+def format_dates(dates):
+    """把 datetime64[m] 数组格式化为 SQLite 中 DateTime 列的存储格式（YYYY-MM-DD HH:MM:SS.ffffff）。"""
+    days = dates.astype('datetime64[D]')
+    unique_days, day_index = np.unique(days, return_inverse=True)
+    day_strings = np.array([str(day) for day in unique_days], dtype=object)
+    return day_strings[day_index] + _TIME_STRINGS[(dates - days).astype(np.int64)]
+
+
+def chunk_to_rows(chunk):
+    """把一块生成的记录转换为 Record 模型可插入的字典列表（金额以元为单位，时间为 datetime）。"""
+    return [
+        {"user_id": user_id, "date": date, "amount": amount / 100, "type": type_data,
+         "category": category, "note": note}
+        for user_id, date, amount, type_data, category, note in zip(
+            chunk["user_id"].tolist(), chunk["date"].astype('datetime64[s]').tolist(), chunk["amount"].tolist(),
+            chunk["type"], chunk["category"], chunk["note"]
+        )
+    ]
+
+
+def insert_chunk(connection, chunk):
+    """
+    把一块生成的记录写入 record 表，不维护每日汇总和全文索引（写完后需重建）。
+    SQLite 上直接用 DBAPI 的 executemany 写入格式化好的时间字符串和以分为单位的金额，
+    其他数据库通过 SQLAlchemy 批量插入。
+    """
+    if connection.dialect.name != 'sqlite':
+        connection.execute(insert(Record), chunk_to_rows(chunk))
+        return
+    n = len(chunk["user_id"])
+    zeros = [0] * n
+    rows = zip(chunk["user_id"].tolist(), chunk["amount"].tolist(), chunk["category"], format_dates(chunk["date"]),
+               chunk["type"], chunk["note"], zeros, zeros)
+    _executemany(connection, f"INSERT INTO record ({_RECORD_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+
+def _executemany(connection, statement, rows):
+    cursor = connection.connection.dbapi_connection.cursor()
+    try:
+        cursor.executemany(statement, rows)
+    finally:
+        cursor.close()
+
+
+def daily_totals(chunk):
+    """
+    按 (日期, 类别) 汇总一块生成的记录，返回 (键, 金额, 条数) 三个数组，金额单位为分。
+    键为 日期序号 * 类别数 + 类别序号；生成的数据中类别决定了类型，不需要单独分组。
+    """
+    n = len(chunk["amount"])
+    code = np.fromiter(map(_CATEGORY_CODES.__getitem__, chunk["category"]), dtype=np.int64, count=n)
+    day = chunk["date"].astype('datetime64[D]').astype(np.int64)
+    keys, inverse = np.unique(day * len(CATEGORY_NAMES) + code, return_inverse=True)
+    return keys, np.bincount(inverse, weights=chunk["amount"]).round().astype(np.int64), np.bincount(inverse)
+
+
+def insert_rollups(connection, user_id, totals):
+    """
+    合并一个用户各块的 daily_totals 结果（跨块的同一天会合并）并写入每日汇总表。
+    只适用于新建的用户：直接插入，不与已有的汇总累加。
+    """
+    keys = np.concatenate([key for key, _, _ in totals])
+    keys, inverse = np.unique(keys, return_inverse=True)
+    amount = np.bincount(inverse, weights=np.concatenate([amount for _, amount, _ in totals]))
+    count = np.bincount(inverse, weights=np.concatenate([count for _, _, count in totals]))
+    days = (keys // len(CATEGORY_NAMES)).astype('datetime64[D]')
+    code = keys % len(CATEGORY_NAMES)
+    columns = (_CATEGORY_TYPES[code], CATEGORY_NAMES[code], amount.round().astype(np.int64).tolist(),
+               count.astype(np.int64).tolist())
+
+    if connection.dialect.name != 'sqlite':
+        connection.execute(insert(DailyRollup), [
+            {"user_id": user_id, "day": day, "type": type_data, "category": category, "amount": amount / 100,
+             "count": count}
+            for day, type_data, category, amount, count in zip(days.tolist(), *columns)
+        ])
+        return
+    rows = zip([user_id] * len(keys), days.astype(str).tolist(), *columns)
+    _executemany(connection, f"INSERT INTO daily_rollup ({_ROLLUP_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+
+def load_users(connection, user_ids, counts, seed=0, start=DEFAULT_START, end=DEFAULT_END, chunk_size=100000):
+    """
+    为一组新建的用户生成记录并写入 record 表，同时写入每日汇总，不提交。返回写入的记录数。
+    全文索引不在这里维护。
+    """
+    total = 0
+    for user_id, count in zip(user_ids, counts):
+        user_id, totals = int(user_id), []
+        for chunk in generate_user_records(user_id, int(count), seed, start, end, chunk_size):
+            insert_chunk(connection, chunk)
+            totals.append(daily_totals(chunk))
+            total += len(chunk["amount"])
+        if totals:
+            insert_rollups(connection, user_id, totals)
+    return total
+
+
+def set_pragmas(connection, pragmas):
+    """在 SQLite 连接上依次设置 (PRAGMA, 值)，返回各 PRAGMA 设置后的结果（journal_mode 等会返回实际生效的值）。"""
+    applied = {}
+    for name, value in pragmas:
+        result = connection.exec_driver_sql(f"PRAGMA {name} = {value}")
+        applied[name] = result.scalar() if result.returns_rows else None
+    return applied
+
+
+def shard_users(user_ids, counts, n_shards):
+    """
+    把用户分成 n_shards 组，使各组的记录总数尽量接近（记录最多的用户优先分给当前最少的组）。
+    返回 [(用户 ID 列表, 记录数列表), ...]，组内按用户 ID 排序，空组不返回。
+    """
+    heap = [(0, shard) for shard in range(n_shards)]
+    members = [[] for _ in range(n_shards)]
+    for count, user_id in sorted(zip(counts, user_ids), reverse=True):
+        load, shard = heapq.heappop(heap)
+        members[shard].append((user_id, count))
+        heapq.heappush(heap, (load + count, shard))
+    return [([user_id for user_id, _ in sorted(shard)], [count for _, count in sorted(shard)])
+            for shard in members if shard]
+
+
+def seed_shard(url, user_ids, counts, seed=0, start=DEFAULT_START, end=DEFAULT_END, chunk_size=100000,
+               shard=False, cache_size=-262144):
+    """
+    在工作进程中执行：连接 url 指定的数据库，用 load_users 写入一组用户的记录和每日汇总并提交，返回写入的记录数。
+    shard 为真时 url 是一个新的 SQLite 文件，先建立 SHARD_TABLES，写完后由主进程用 merge_shard 合并。
+    """
+    engine = create_engine(url)
+    try:
+        with engine.begin() as connection:
+            if engine.dialect.name == 'sqlite':
+                set_pragmas(connection, BULK_LOAD_PRAGMAS + (('cache_size', cache_size),))
+            if shard:
+                for statement in SHARD_TABLES:
+                    connection.exec_driver_sql(statement)
+            return load_users(connection, user_ids, counts, seed, start, end, chunk_size)
+    finally:
+        engine.dispose()
+
+
+def merge_shard(connection, path):
+    """把 seed_shard 写入的 SQLite 分片文件中的记录和每日汇总并入 connection 所在的数据库并提交。"""
+    connection.exec_driver_sql("ATTACH DATABASE ? AS shard", (path,))
+    try:
+        connection.exec_driver_sql(
+            f"INSERT INTO record ({_RECORD_COLUMNS}) SELECT {_RECORD_COLUMNS} FROM shard.record")
+        connection.exec_driver_sql(
+            f"INSERT INTO daily_rollup ({_ROLLUP_COLUMNS}) SELECT {_ROLLUP_COLUMNS} FROM shard.daily_rollup")
+        connection.commit()
+    finally:
+        connection.exec_driver_sql("DETACH DATABASE shard")
+
+
+def create_users(connection, n_users, password, prefix='user'):
+    """
+    创建 n_users 个用户（用户名为 prefix 加序号，从 1 开始），所有用户使用同一个密码，只计算一次哈希。
+    返回新用户的 ID 列表。
+    """
+    password_hash = generate_password_hash(password)
+    usernames = [f"{prefix}{i}" for i in range(1, n_users + 1)]
+    result = connection.execute(
+        insert(User).returning(User.id, sort_by_parameter_order=True),
+        [{"username": username, "password_hash": password_hash, "data_version": 0} for username in usernames]
+    )
+    return result.scalars().all()
@@ -1,31 +1,72 @@
 # app/utils.py
 
+import hashlib
 from functools import wraps
-from flask import request, jsonify
+from tempfile import SpooledTemporaryFile
+from flask import request, jsonify, Request
 import jwt
 from .extensions import db
 from .models import User
+from .auth_cache import AuthUser, get_auth_cache
 from flask import current_app
 
 def token_required(f):
+    """
+    校验请求头中的令牌，并把 AuthUser(id, username) 作为第一个参数传给路由。
+    已验证过的令牌在认证缓存中命中时不再解码和查询数据库。
+    """
     @wraps(f)
     def decorated(*args, **kwargs):
         token = request.headers.get('Authorization')
         if not token:
             return jsonify({"error": "令牌缺失。"}), 401
 
-        try:
-            data = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=["HS256"])
-            current_user = db.session.get(User, data['user_id'])
-            if not current_user:
-                raise ValueError("用户不存在。")
-        except Exception as e:
-            return jsonify({"error": f"令牌无效：{str(e)}"}), 401
+        cache = get_auth_cache()
+        current_user = cache.get(token) if cache is not None else None
+        if current_user is None:
+            try:
+                data = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=["HS256"])
+                user = db.session.get(User, data['user_id'])
+                if not user:
+                    raise ValueError("用户不存在。")
+            except Exception as e:
+                return jsonify({"error": f"令牌无效：{str(e)}"}), 401
+
+            current_user = AuthUser(user.id, user.username)
+            if cache is not None:
+                cache.put(token, current_user, data.get('exp'))
 
         return f(current_user, *args, **kwargs)
 
     return decorated
 
+class SpooledUploadRequest(Request):
+    """
+    上传文件先保存在内存中，超过 UPLOAD_SPOOL_MAX_SIZE 后才转存到匿名临时文件。
+    路由直接从 file.stream 解析，不再经过 UPLOAD_FOLDER 写入和回读。
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return SpooledTemporaryFile(max_size=current_app.config['UPLOAD_SPOOL_MAX_SIZE'], mode='rb+')
+
+ALLOWED_EXTENSIONS = {'xls', 'xlsx', 'csv', 'ndjson', 'jsonl'}
+HASH_BLOCK_SIZE = 1024 * 1024
+
+def file_extension(filename):
+    return filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
+
 def allowed_file(filename):
-    allowed_extensions = {'xls', 'xlsx'}
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in allowed_extensions
+    return file_extension(filename) in ALLOWED_EXTENSIONS
+
+def hash_stream(stream, copy_to=None):
+    """
+    计算文件流的 SHA-256，读取完毕后将流重置到开头。
+    copy_to 不为空时同时把内容写入该文件对象，保存文件时不必再读一遍。
+    """
+    digest = hashlib.sha256()
+    for block in iter(lambda: stream.read(HASH_BLOCK_SIZE), b''):
+        digest.update(block)
+        if copy_to is not None:
+            copy_to.write(block)
+    stream.seek(0)
+    return digest.hexdigest()
@@ -0,0 +1,73 @@
+# benchmarks/auth_overhead.py
+"""
+测量 token_required 每次请求的认证开销，对比关闭和开启认证缓存。
+
+- decorator：在请求上下文中直接调用被 token_required 包装的空函数，只包含认证本身；
+- request：通过测试客户端请求 GET /records?limit=1，包含完整的请求处理。
+
+用法：
+    python benchmarks/auth_overhead.py [--calls 5000]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app import create_app  # noqa: E402
+from app.config import Config  # noqa: E402
+from app.extensions import db  # noqa: E402
+from app.utils import token_required  # noqa: E402
+
+
+def _make_app(cache_size, database_uri):
+    config = type('BenchmarkConfig', (Config,), {
+        'SQLALCHEMY_DATABASE_URI': database_uri,
+        'AUTH_CACHE_SIZE': cache_size,
+    })
+    return create_app(config)
+
+
+def _per_call(n, fn):
+    """返回每次调用的平均耗时（微秒）。"""
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def main(n=5000):
+    database_uri = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+    setup_app = _make_app(0, database_uri)
+    with setup_app.app_context():
+        db.create_all()
+    client = setup_app.test_client()
+    client.post('/register', json={"username": "bench", "password": "bench"})
+    token = client.post('/login', json={"username": "bench", "password": "bench"}).get_json()['token']
+    headers = {"Authorization": token}
+
+    noop = token_required(lambda current_user: current_user)
+    print(f"调用次数：{n}")
+    print(f"{'认证缓存':<10}{'decorator(us)':>16}{'request(us)':>14}{'命中率':>10}")
+    for label, cache_size in (('关闭', 0), ('开启', Config.AUTH_CACHE_SIZE)):
+        app = _make_app(cache_size, database_uri)
+        with app.test_request_context(headers=headers):
+            noop()  # 预热：建立连接并填充缓存
+            decorator_us = _per_call(n, noop)
+            db.session.remove()
+
+        client = app.test_client()
+        request_us = _per_call(n, lambda: client.get('/records?limit=1', headers=headers))
+
+        cache = app.extensions['auth_cache']
+        hit_ratio = cache.stats()['hit_ratio'] if cache is not None else None
+        print(f"{label:<10}{decorator_us:>16.1f}{request_us:>14.1f}{str(hit_ratio):>10}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='对比开启和关闭认证缓存时 token_required 的开销。')
+    parser.add_argument('--calls', type=int, default=5000, help='每种配置的调用次数')
+    args = parser.parse_args()
+    main(args.calls)
@@ -0,0 +1,286 @@
+# benchmarks/endpoints.py
+"""
+主要接口的基准测试套件，结果保存为 JSON，可与之前提交的结果比较并在性能退化时以非零状态退出。
+
+在临时 SQLite 数据库中用 app.synthetic 生成 --users 个用户、共 --records 条记录
+（记录数按帕累托分布偏向少数活跃用户，类别频率偏斜，时间按星期和时段加权），
+重建每日汇总表后（不建立全文索引，搜索的耗时见 benchmarks/search.py），通过测试客户端逐项测量：
+- auth：token_required 本身的开销（认证缓存命中 / 关闭缓存）；
+- get_records：最活跃用户的分页查询、按金额排序、带筛选条件，以及中位用户的完整流式输出；
+- get_summary：period 为 year、month、day、overall、custom；
+- get_summary_pie：period 为 year、month、day、overall；
+- upload_file：上传生成的 CSV 和 xlsx 文件（每次内容不同，不会被去重）。
+汇总接口关闭响应缓存，测量的是实际查询。每项先预热一次，再分 --repeat 轮交替测量各项
+（上传只测其中均匀分布的 1/4 轮），记录最短、中位数和 p95 耗时。
+
+用法：
+    python benchmarks/endpoints.py [--users 20] [--records 100000] [--repeat 20] [--upload-rows 5000]
+                                   [--only summary] [--output results.json]
+    python benchmarks/endpoints.py --compare baseline.json [--stat min_ms] [--tolerance 0.25] [--min-delta-ms 0.5]
+
+--compare 按 --stat（默认最短耗时，受机器负载干扰最小）比较同名的测试项：
+比基线慢超过 tolerance 比例且绝对差值超过 min-delta-ms 时视为退化。
+基线和本次的 --users、--records 等参数不同时结果没有可比性，会给出提示。
+"""
+
+import argparse
+import datetime
+import io
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pandas as pd  # noqa: E402
+from app import create_app  # noqa: E402
+from app.config import Config  # noqa: E402
+from app.extensions import db  # noqa: E402
+from app.rollup import rebuild_rollups  # noqa: E402
+from app.synthetic import (create_users, generate_records, generate_user_records, insert_chunk,  # noqa: E402
+                           records_per_user)
+from app.utils import token_required  # noqa: E402
+
+PASSWORD = 'bench'
+# 影响结果可比性的参数
+COMPARABLE_ARGS = ('users', 'records', 'upload_rows', 'seed')
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def _seed(app, args):
+    """生成用户和记录，返回按记录数排序的 (用户名, 记录数) 列表。"""
+    start = time.perf_counter()
+    with app.app_context():
+        db.create_all()
+        with db.engine.begin() as connection:
+            user_ids = create_users(connection, args.users, PASSWORD)
+            create_users(connection, 1, PASSWORD, prefix='upload')
+            counts = records_per_user(args.users, args.records, args.seed)
+            for chunk in generate_records(user_ids, counts, args.seed):
+                insert_chunk(connection, chunk)
+        rebuild_rollups()
+    print(f"生成 {args.users} 个用户、{args.records} 条记录：{time.perf_counter() - start:.1f}s")
+    return sorted(((f"user{i + 1}", int(count)) for i, count in enumerate(counts)), key=lambda item: item[1])
+
+
+def _login(client, username):
+    response = client.post('/login', json={"username": username, "password": PASSWORD})
+    return {"Authorization": response.get_json()['token']}
+
+
+def _upload_file(user_id, rows, seed, extension):
+    """生成一个导入文件，内容由 seed 决定。"""
+    frames = [pd.DataFrame({
+        '时间': pd.to_datetime(chunk['date']).strftime('%Y-%m-%d %H:%M'),
+        '类别': chunk['category'],
+        '金额': chunk['amount'] / 100,
+        '类型': ['收入' if value == 'income' else '支出' for value in chunk['type']],
+        '备注': chunk['note'],
+    }) for chunk in generate_user_records(user_id, rows, seed)]
+    df = pd.concat(frames, ignore_index=True)
+    buffer = io.BytesIO()
+    if extension == 'csv':
+        buffer.write(df.to_csv(index=False).encode('utf-8-sig'))
+    else:
+        df.to_excel(buffer, index=False)
+    return buffer.getvalue()
+
+
+def _request(client, method, path, headers, **kwargs):
+    def call():
+        response = client.open(path, method=method, headers=headers, **kwargs)
+        response.get_data()
+        response.close()
+        if response.status_code != 200:
+            raise RuntimeError(f"{method} {path} 返回 {response.status_code}：{response.get_data(as_text=True)[:200]}")
+    return call
+
+
+def _cases(app, client, users, args):
+    """返回 [(名称, 每次调用的函数, 重复次数)]，上传用例的每次调用使用不同的文件。"""
+    heavy_user, heavy_count = users[-1]
+    median_user, median_count = users[len(users) // 2]
+    heavy, median = _login(client, heavy_user), _login(client, median_user)
+    print(f"最活跃用户 {heavy_user}：{heavy_count} 条记录；中位用户 {median_user}：{median_count} 条记录")
+    cases = []
+
+    noop = token_required(lambda current_user: current_user)
+
+    def auth(cache_enabled):
+        def call():
+            cache = app.extensions['auth_cache']
+            if not cache_enabled:
+                app.extensions['auth_cache'] = None
+            try:
+                with app.test_request_context(headers=heavy):
+                    for _ in range(100):
+                        noop()
+                    db.session.remove()
+            finally:
+                app.extensions['auth_cache'] = cache
+        return call
+
+    cases.append(('auth.token_required[cached]x100', auth(True), args.repeat))
+    cases.append(('auth.token_required[uncached]x100', auth(False), args.repeat))
+
+    for name, path, headers in (
+        ('get_records[limit=100]', '/records?limit=100', heavy),
+        ('get_records[limit=100,sort=-amount]', '/records?limit=100&sort=-amount', heavy),
+        ('get_records[filtered]', '/records?start_date=2024-01-01&end_date=2024-03-31&category=餐饮', heavy),
+        ('get_records[full,median user]', '/records', median),
+    ):
+        cases.append((name, _request(client, 'GET', path, headers), args.repeat))
+
+    for period, query in (('year', ''), ('month', ''), ('day', ''), ('overall', ''),
+                          ('custom', '&start_date=2024-01-01&end_date=2024-12-31')):
+        cases.append((f'get_summary[{period}]', _request(client, 'GET', f'/summary?period={period}{query}', heavy),
+                      args.repeat))
+
+    for period, query in (('year', '&year=2024'), ('month', '&year=2024&month=6'),
+                          ('day', '&year=2024&month=6&day=15'), ('overall', '')):
+        cases.append((f'get_summary_pie[{period}]',
+                      _request(client, 'GET', f'/summary_pie?period={period}{query}', heavy), args.repeat))
+
+    if args.upload_rows > 0 and (not args.only or any('upload' in pattern for pattern in args.only)):
+        upload = _login(client, 'upload1')
+        upload_repeat = max(3, args.repeat // 4)
+        for extension in ('csv', 'xlsx'):
+            # 预先生成文件，不计入耗时；每个文件内容不同，不会命中文件哈希和指纹去重
+            files = iter([_upload_file(1, args.upload_rows, args.seed * 1000 + i, extension)
+                          for i in range(upload_repeat + 1)])
+
+            def call(files=files, extension=extension):
+                _request(client, 'POST', '/upload', upload,
+                         data={'file': (io.BytesIO(next(files)), f'bench.{extension}')})()
+
+            cases.append((f'upload_file[{extension},{args.upload_rows} rows]', call, upload_repeat))
+
+    if args.only:
+        cases = [case for case in cases if any(pattern in case[0] for pattern in args.only)]
+    return cases
+
+
+def _summarize(samples):
+    samples = sorted(samples)
+    return {
+        "n": len(samples),
+        "min_ms": round(samples[0], 3),
+        "median_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+        "mean_ms": round(statistics.fmean(samples), 3),
+    }
+
+
+def measure(cases, rounds):
+    """
+    每项先预热一次，再按轮次交替测量：每轮依次运行各项一次，重复次数较少的项均匀分布在各轮中。
+    机器负载的波动会同时影响各项，而不是集中落在某一项的全部样本上。
+    """
+    for _, fn, _ in cases:
+        fn()
+    samples = {name: [] for name, _, _ in cases}
+    for round_ in range(rounds):
+        for name, fn, repeat in cases:
+            # 第 round_ 轮时该项应完成的次数比上一轮多，才在本轮测量
+            if (round_ + 1) * repeat // rounds > round_ * repeat // rounds:
+                start = time.perf_counter()
+                fn()
+                samples[name].append((time.perf_counter() - start) * 1000)
+    return {name: _summarize(values) for name, values in samples.items()}
+
+
+def compare(baseline, current, stat, tolerance, min_delta_ms):
+    """按 stat 打印与基线的对比，返回退化的测试项名称列表。"""
+    base_args, current_args = baseline["meta"]["args"], current["meta"]["args"]
+    different = [key for key in COMPARABLE_ARGS if base_args.get(key) != current_args.get(key)]
+    if different:
+        print(f"注意：基线的 {', '.join(different)} 参数与本次不同，结果没有可比性。")
+
+    print(f"\n与基线 {baseline['meta'].get('commit')}（{baseline['meta']['created_at']}）比较 {stat}：")
+    print(f"{'测试项':<44}{'基线(ms)':>10}{'本次(ms)':>10}{'变化':>9}")
+    regressions = []
+    for name, result in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            print(f"{name:<44}{'-':>10}{result[stat]:>10.2f}{'新增':>9}")
+            continue
+        ratio = result[stat] / base[stat] if base[stat] else float('inf')
+        regressed = ratio > 1 + tolerance and result[stat] - base[stat] > min_delta_ms
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<44}{base[stat]:>10.2f}{result[stat]:>10.2f}{ratio - 1:>+8.0%}"
+              f"{' 退化' if regressed else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='主要接口的基准测试。')
+    parser.add_argument('--users', type=int, default=20, help='生成的用户数')
+    parser.add_argument('--records', type=int, default=100000, help='生成的记录总数（1 千到 1 千万）')
+    parser.add_argument('--seed', type=int, default=0, help='随机数种子')
+    parser.add_argument('--repeat', type=int, default=20, help='每项重复次数，上传为其 1/4（至少 3 次）')
+    parser.add_argument('--upload-rows', type=int, default=5000, help='上传文件的行数，0 表示不测上传')
+    parser.add_argument('--only', action='append', help='只运行名称包含该字符串的测试项，可重复')
+    parser.add_argument('--output', help='结果 JSON 的保存路径')
+    parser.add_argument('--compare', help='基线结果 JSON，与之比较并在退化时以非零状态退出')
+    parser.add_argument('--stat', default='min_ms', choices=['min_ms', 'median_ms', 'p95_ms', 'mean_ms'],
+                        help='比较时使用的统计量')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='允许的变慢比例')
+    parser.add_argument('--min-delta-ms', type=float, default=0.5, help='小于该绝对差值的变慢不算退化')
+    args = parser.parse_args()
+
+    config = type('BenchmarkConfig', (Config,), {
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db'),
+        'RESPONSE_CACHE_BACKEND': 'none',
+    })
+    app = create_app(config)
+    users = _seed(app, args)
+    client = app.test_client()
+
+    cases = _cases(app, client, users, args)
+    results = measure(cases, args.repeat)
+    print(f"\n{'测试项':<44}{'最短(ms)':>10}{'中位(ms)':>10}{'p95(ms)':>10}")
+    for name, result in results.items():
+        print(f"{name:<44}{result['min_ms']:>10.2f}{result['median_ms']:>10.2f}{result['p95_ms']:>10.2f}")
+
+    current = {
+        "meta": {
+            "commit": _git_commit(),
+            "created_at": datetime.datetime.now().isoformat(timespec='seconds'),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "args": {key: value for key, value in vars(args).items()
+                     if key not in ('output', 'compare', 'stat', 'tolerance', 'min_delta_ms')},
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(current, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已保存到 {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, current, args.stat, args.tolerance, args.min_delta_ms)
+        if regressions:
+            print(f"\n{len(regressions)} 项性能退化：{', '.join(regressions)}", file=sys.stderr)
+            raise SystemExit(1)
+        print("\n没有性能退化。")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+# benchmarks/json_serialization.py
+"""
+比较记录列表序列化方式的吞吐量（行/秒）。
+
+在临时 SQLite 数据库中生成一个用户的记录，分别测量：
+- entity+std：旧实现，读取 Record 实体，每行 strftime 两次，标准库逐行 dumps；
+- row+std：读取 RECORD_COLUMNS 的 Row，日期只格式化一次，标准库每块 dumps 一次；
+- row+orjson：同上，使用 OrjsonProvider（需安装 orjson）；
+- GET /records：通过测试客户端完整请求一次（含认证和流式输出），分别使用 std 和 orjson 提供者。
+
+用法：
+    python benchmarks/json_serialization.py [--sizes 10000,100000] [--repeat 3]
+"""
+
+import argparse
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+from app import create_app  # noqa: E402
+from app.config import Config  # noqa: E402
+from app.extensions import db  # noqa: E402
+from app.json_provider import OrjsonProvider, orjson  # noqa: E402
+from app.models import Record  # noqa: E402
+from app.routes.records import RECORD_COLUMNS, _record_to_dict, _stream_json_array  # noqa: E402
+
+CATEGORIES = ['餐饮', '交通', '购物', '娱乐', '住房', '工资']
+BATCH_SIZE = 1000
+
+
+def _legacy_record_to_dict(record):
+    """改动前的序列化方式，用作对照。"""
+    return {
+        "id": record.id,
+        "amount": record.amount,
+        "category": record.category,
+        "date": record.date.strftime('%Y-%m-%d %H:%M'),
+        "time": record.date.strftime('%Y-%m-%d %H:%M'),
+        "timeStamp": int(record.date.timestamp()) * 1000,
+        "type": record.type,
+        "note": record.note
+    }
+
+
+def _legacy_stream(records, dumps):
+    yield '['
+    first = True
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= BATCH_SIZE:
+            chunk = ','.join(dumps(_legacy_record_to_dict(item)) for item in batch)
+            yield chunk if first else ',' + chunk
+            first, batch = False, []
+    if batch:
+        chunk = ','.join(dumps(_legacy_record_to_dict(item)) for item in batch)
+        yield chunk if first else ',' + chunk
+    yield ']'
+
+
+def _best_of(repeat, fn):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def _populate(app, n):
+    rng = random.Random(n)
+    start = datetime.datetime(2020, 1, 1)
+    with app.app_context():
+        db.create_all()
+        client = app.test_client()
+        client.post('/register', json={"username": "bench", "password": "bench"})
+        token = client.post('/login', json={"username": "bench", "password": "bench"}).get_json()['token']
+        db.session.execute(insert(Record), [{
+            "user_id": 1,
+            "amount": round(rng.uniform(1, 500), 2),
+            "category": rng.choice(CATEGORIES),
+            "date": start + datetime.timedelta(minutes=i * 7),
+            "type": rng.choice(['income', 'expense']),
+            "note": f"备注 {i}",
+        } for i in range(n)])
+        db.session.commit()
+    return {"Authorization": token}
+
+
+def main(sizes=(10000, 100000), repeat=3):
+    providers = [('std', DefaultJSONProvider)] + ([('orjson', OrjsonProvider)] if orjson is not None else [])
+    print(f"重复 {repeat} 次取最短耗时，单位：千行/秒")
+    print(f"{'记录条数':<10}{'方式':<22}{'吞吐量':>10}")
+    for n in sizes:
+        config = type('BenchmarkConfig', (Config,), {
+            'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db'),
+            'RESPONSE_CACHE_BACKEND': 'none',
+        })
+        app = create_app(config)
+        headers = _populate(app, n)
+
+        with app.app_context():
+            def serialize(query, stream):
+                return ''.join(stream(query.yield_per(BATCH_SIZE)))
+
+            entity_query = Record.query.filter_by(user_id=1).order_by(Record.date, Record.id)
+            row_query = db.session.query(*RECORD_COLUMNS).filter_by(user_id=1).order_by(Record.date, Record.id)
+
+            cases = [('entity+std', lambda: serialize(entity_query, lambda rows: _legacy_stream(
+                rows, DefaultJSONProvider(app).dumps)))]
+            for name, provider in providers:
+                def run(provider=provider):
+                    app.json = provider(app)
+                    return serialize(row_query, lambda rows: _stream_json_array(rows, BATCH_SIZE, _record_to_dict))
+                cases.append((f'row+{name}', run))
+
+            for name, fn in cases:
+                elapsed = _best_of(repeat, fn)
+                print(f"{n:<10}{name:<22}{n / elapsed / 1000:>10.1f}")
+                db.session.expunge_all()
+
+        client = app.test_client()
+        for name, provider in providers:
+            app.json = provider(app)
+            elapsed = _best_of(repeat, lambda: client.get('/records', headers=headers).get_data())
+            print(f"{n:<10}{'GET /records ' + name:<22}{n / elapsed / 1000:>10.1f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='对比标准库 json 与 orjson 的序列化吞吐量。')
+    parser.add_argument('--sizes', default='10000,100000', help='记录条数，逗号分隔')
+    parser.add_argument('--repeat', type=int, default=3, help='重复次数，取最短耗时')
+    args = parser.parse_args()
+    main(tuple(int(size) for size in args.sizes.split(',')), args.repeat)
@@ -0,0 +1,203 @@
+# benchmarks/load_test.py
+"""
+生产入口（gunicorn + wsgi.py）的压测脚本，输出每个接口的吞吐量（req/s）和 p50/p99 延迟。
+
+默认在临时目录中创建 SQLite 数据库文件，写入一个用户和指定条数的记录，
+再用 gunicorn.conf.py 启动 gunicorn，以多个线程通过 HTTP 长连接按权重循环请求各接口。
+传入 --url 时改为压测已经运行的服务（需已存在 --username/--password 对应的用户）。
+
+用法：
+    python benchmarks/load_test.py [--records 100000] [--duration 30] [--concurrency 16]
+                                   [--workers N] [--worker-class gthread] [--threads 4]
+    python benchmarks/load_test.py --url http://127.0.0.1:5000 --username bench --password bench
+
+压测客户端本身受 GIL 限制，服务端核数较多时可在另一台机器上运行，或同时运行多个客户端。
+"""
+
+import argparse
+import datetime
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import quote, urlsplit
+
+BACK_END = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CATEGORIES = ['餐饮', '交通', '购物', '娱乐', '住房', '工资']
+NOTES = ['午饭', '晚饭', '地铁', '打车', '超市', '房租', '咖啡', '电影']
+
+# (名称, 方法, 路径, 请求体, 权重)
+ENDPOINTS = [
+    ('GET /records?limit=100', 'GET', '/records?limit=100', None, 30),
+    ('GET /records?since', 'GET', '/records?since=0&fields=id', None, 5),
+    ('GET /records/search', 'GET', '/records/search?q=' + quote('午饭'), None, 10),
+    ('GET /summary', 'GET', '/summary?period=month', None, 20),
+    ('GET /summary_pie', 'GET', '/summary_pie?period=overall', None, 20),
+    ('POST /records', 'POST', '/records',
+     {"amount": 12.5, "category": "餐饮", "type": "expense", "note": "压测"}, 15),
+]
+
+
+def _seed(database_path, n, username, password):
+    """在新的 SQLite 文件中写入一个用户和 n 条记录，并重建每日汇总表和全文索引。"""
+    os.environ['DATABASE_URL'] = 'sqlite:///' + database_path
+    sys.path.insert(0, BACK_END)
+    from sqlalchemy import insert
+    from app import create_app
+    from app.extensions import db
+    from app.models import Record
+    from app.rollup import rebuild_rollups
+    from app.search import rebuild_search_index
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        app.test_client().post('/register', json={"username": username, "password": password})
+        rng = random.Random(0)
+        start = datetime.datetime(2023, 1, 1)
+        for offset in range(0, n, 20000):
+            db.session.execute(insert(Record), [{
+                "user_id": 1,
+                "amount": round(rng.uniform(1, 500), 2),
+                "category": rng.choice(CATEGORIES),
+                "date": start + datetime.timedelta(minutes=i * 5),
+                "type": 'income' if rng.random() < 0.1 else 'expense',
+                "note": rng.choice(NOTES),
+            } for i in range(offset, min(n, offset + 20000))])
+        db.session.commit()
+        rebuild_rollups()
+        rebuild_search_index()
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _start_server(database_path, args):
+    port = _free_port()
+    env = dict(os.environ, DATABASE_URL='sqlite:///' + database_path, GUNICORN_ACCESS_LOG='',
+               GUNICORN_WORKER_CLASS=args.worker_class, GUNICORN_THREADS=str(args.threads))
+    if args.workers:
+        env['WEB_CONCURRENCY'] = str(args.workers)
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--bind', f'127.0.0.1:{port}',
+         '--log-level', 'warning', 'wsgi:app'],
+        cwd=BACK_END, env=env
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline and process.poll() is None:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return process, f'http://127.0.0.1:{port}'
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("gunicorn 启动失败或超时。")
+
+
+def _login(url, username, password):
+    parts = urlsplit(url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port)
+    conn.request('POST', '/login', json.dumps({"username": username, "password": password}),
+                 {'Content-Type': 'application/json'})
+    response = conn.getresponse()
+    body = json.loads(response.read())
+    conn.close()
+    if response.status != 200:
+        raise RuntimeError(f"登录失败：{body}")
+    return body['token']
+
+
+def _worker(url, token, deadline, schedule, results):
+    """单个压测线程：保持一条长连接，按 schedule 循环发送请求，记录 (接口, 耗时, 状态码)。"""
+    parts = urlsplit(url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=60)
+    headers = {'Authorization': token, 'Content-Type': 'application/json'}
+    samples = []
+    i = random.randrange(len(schedule))
+    while time.perf_counter() < deadline:
+        name, method, path, body = schedule[i % len(schedule)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            conn.request(method, path, json.dumps(body) if body is not None else None, headers)
+            response = conn.getresponse()
+            response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=60)
+            status = 0
+        samples.append((name, time.perf_counter() - start, status))
+    conn.close()
+    results.extend(samples)
+
+
+def _percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run(url, token, duration, concurrency):
+    schedule = [(name, method, path, body) for name, method, path, body, weight in ENDPOINTS for _ in range(weight)]
+    random.Random(1).shuffle(schedule)
+    results = []
+    deadline = time.perf_counter() + duration
+    threads = [threading.Thread(target=_worker, args=(url, token, deadline, schedule, results))
+               for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    print(f"持续 {duration}s，并发 {concurrency}")
+    print(f"{'接口':<26}{'请求数':>8}{'req/s':>10}{'p50(ms)':>10}{'p99(ms)':>10}{'错误':>6}")
+    for name in [endpoint[0] for endpoint in ENDPOINTS] + ['合计']:
+        samples = [sample for sample in results if name == '合计' or sample[0] == name]
+        if not samples:
+            continue
+        latencies = sorted(sample[1] * 1000 for sample in samples)
+        errors = sum(1 for sample in samples if not 200 <= sample[2] < 400)
+        print(f"{name:<26}{len(samples):>8}{len(samples) / duration:>10.1f}"
+              f"{_percentile(latencies, 0.5):>10.1f}{_percentile(latencies, 0.99):>10.1f}{errors:>6}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='压测 gunicorn 部署的各个接口。')
+    parser.add_argument('--url', help='压测已运行的服务，不传时在临时 SQLite 数据库上启动 gunicorn')
+    parser.add_argument('--username', default='bench')
+    parser.add_argument('--password', default='bench')
+    parser.add_argument('--records', type=int, default=100000, help='临时数据库中生成的记录条数')
+    parser.add_argument('--duration', type=float, default=30, help='压测持续时间（秒）')
+    parser.add_argument('--concurrency', type=int, default=16, help='并发连接数')
+    parser.add_argument('--workers', type=int, default=None, help='gunicorn 工作进程数，默认按 CPU 核数计算')
+    parser.add_argument('--worker-class', default='gthread', choices=['gthread', 'sync'])
+    parser.add_argument('--threads', type=int, default=4, help='gthread 每个工作进程的线程数')
+    args = parser.parse_args()
+
+    process = None
+    url = args.url
+    try:
+        if url is None:
+            database_path = os.path.join(tempfile.mkdtemp(), 'load_test.db')
+            start = time.perf_counter()
+            _seed(database_path, args.records, args.username, args.password)
+            print(f"已生成 {args.records} 条记录：{time.perf_counter() - start:.1f}s（{database_path}）")
+            process, url = _start_server(database_path, args)
+        run(url, _login(url, args.username, args.password), args.duration, args.concurrency)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+# benchmarks/money_aggregates.py
+"""
+比较金额以浮点数存储和以整数分（Money）存储时的聚合精度与耗时。
+
+在内存 SQLite 中分别建两张表写入相同的随机金额，测量：
+- SUM 聚合耗时，以及与 Decimal 精确合计的偏差；
+- 读取全部金额（含类型转换）的耗时。
+
+用法：
+    python benchmarks/money_aggregates.py [--rows 200000] [--repeat 5]
+"""
+
+import argparse
+import os
+import sys
+import random
+import time
+from decimal import Decimal
+
+from sqlalchemy import create_engine, MetaData, Table, Column, Integer, Float, select, func
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.models import Money  # noqa: E402
+
+
+def _best_of(repeat, fn):
+    """执行 repeat 次，返回 (最短耗时, 最后一次的结果)。"""
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main(rows=200000, repeat=5):
+    random.seed(42)
+    # 生成两位小数的金额，用分的整数保存精确值
+    cents = [random.randint(1, 5_000_000) for _ in range(rows)]
+    amounts = [value / 100 for value in cents]
+    exact = Decimal(sum(cents)) / 100
+
+    engine = create_engine('sqlite://')
+    metadata = MetaData()
+    tables = {
+        'float': Table('ledger_float', metadata, Column('id', Integer, primary_key=True), Column('amount', Float)),
+        'cents': Table('ledger_cents', metadata, Column('id', Integer, primary_key=True), Column('amount', Money)),
+    }
+    metadata.create_all(engine)
+
+    with engine.begin() as conn:
+        for table in tables.values():
+            conn.execute(table.insert(), [{'amount': amount} for amount in amounts])
+
+    print(f"行数：{rows}，重复 {repeat} 次取最短耗时")
+    print(f"精确合计：{exact}")
+    print(f"{'存储':<8}{'SUM 耗时(ms)':>14}{'读取耗时(ms)':>14}{'SUM 结果':>22}{'偏差':>14}")
+    with engine.connect() as conn:
+        for name, table in tables.items():
+            sum_time, total = _best_of(repeat, lambda: conn.execute(select(func.sum(table.c.amount))).scalar())
+            read_time, _ = _best_of(repeat, lambda: conn.execute(select(table.c.amount)).scalars().all())
+            drift = Decimal(repr(total)) - exact
+            print(f"{name:<8}{sum_time * 1000:>14.2f}{read_time * 1000:>14.2f}{total!r:>22}{str(drift):>14}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='对比浮点数与整数分保存金额时的聚合耗时和精度。')
+    parser.add_argument('--rows', type=int, default=200000, help='行数')
+    parser.add_argument('--repeat', type=int, default=5, help='重复次数，取最短耗时')
+    args = parser.parse_args()
+    main(args.rows, args.repeat)
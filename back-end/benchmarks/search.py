@@ -0,0 +1,105 @@
+# benchmarks/search.py
+"""
+测量 GET /records/search 在大账本上的查询耗时，对比 FTS5 全文索引与 LIKE 子串扫描。
+
+在临时 SQLite 数据库中生成一个用户的随机账本（备注和类别由常见词随机组合），
+建立全文索引后，分别用单字、两字、多字和多词关键词查询第一页（20 条，相关度打分窗口为 SEARCH_RANK_WINDOW），
+输出每次查询的平均耗时。
+
+用法：
+    python benchmarks/search.py [--records 1000000] [--repeat 20]
+"""
+
+import argparse
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sqlalchemy import insert  # noqa: E402
+from app import create_app  # noqa: E402
+from app.config import Config  # noqa: E402
+from app.extensions import db  # noqa: E402
+from app.models import Record, User  # noqa: E402
+from app.search import rebuild_search_index, search_record_ids  # noqa: E402
+
+CATEGORIES = ['餐饮', '交通', '购物', '娱乐', '住房', '医疗', '工资', '理财']
+WORDS = ['午饭', '晚饭', '早餐', '咖啡', '地铁', '打车', '超市', '外卖', '电影', '房租', '水电',
+         '药店', '奖金', '基金', '和同事', '周末', '出差', 'Taxi', 'Coffee', 'Netflix', 'Amazon']
+QUERIES = ['饭', '咖', '地铁', '外卖', '和同事', '周末 电影', 'coffee', 'net', '不存在的词']
+PAGE_SIZE = 20
+BATCH_SIZE = 20000
+
+
+def _generate(user_id, n, seed=0):
+    rng = random.Random(seed)
+    start = datetime.datetime(2020, 1, 1)
+    for i in range(n):
+        yield {
+            "user_id": user_id,
+            "amount": round(rng.uniform(1, 500), 2),
+            "category": rng.choice(CATEGORIES),
+            "date": start + datetime.timedelta(minutes=i * 3),
+            "type": 'expense',
+            "note": ' '.join(rng.sample(WORDS, rng.randint(1, 3))),
+        }
+
+
+def _mean_ms(repeat, fn):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main(n=1000000, repeat=20):
+    config = type('BenchmarkConfig', (Config,), {
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db'),
+    })
+    app = create_app(config)
+    with app.app_context():
+        db.create_all()
+        user = User(username='bench', password_hash='-')
+        db.session.add(user)
+        db.session.commit()
+
+        start = time.perf_counter()
+        batch = []
+        for row in _generate(user.id, n):
+            batch.append(row)
+            if len(batch) == BATCH_SIZE:
+                db.session.execute(insert(Record), batch)
+                batch = []
+        if batch:
+            db.session.execute(insert(Record), batch)
+        db.session.commit()
+        print(f"生成 {n} 条记录：{time.perf_counter() - start:.1f}s")
+
+        start = time.perf_counter()
+        rebuild_search_index()
+        print(f"建立全文索引：{time.perf_counter() - start:.1f}s")
+
+        def like(query):
+            return [row.id for row in db.session.query(Record.id).filter(
+                Record.user_id == user.id,
+                Record.note.contains(query, autoescape=True) | Record.category.contains(query, autoescape=True)
+            ).order_by(Record.date.desc(), Record.id.desc()).limit(PAGE_SIZE)]
+
+        window = app.config['SEARCH_RANK_WINDOW']
+        print(f"{'关键词':<12}{'FTS5(ms)':>10}{'LIKE(ms)':>10}{'命中':>6}")
+        for query in QUERIES:
+            hits = len(search_record_ids(user.id, query, PAGE_SIZE, 0, window))
+            fts_ms = _mean_ms(repeat, lambda: search_record_ids(user.id, query, PAGE_SIZE, 0, window))
+            like_ms = _mean_ms(max(1, repeat // 10), lambda: like(query))
+            print(f"{query:<12}{fts_ms:>10.2f}{like_ms:>10.2f}{hits:>6}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='对比 FTS5 全文索引与 LIKE 子串匹配的搜索耗时。')
+    parser.add_argument('--records', type=int, default=1000000, help='生成的记录条数')
+    parser.add_argument('--repeat', type=int, default=20, help='每个关键词的查询次数')
+    args = parser.parse_args()
+    main(args.records, args.repeat)
@@ -0,0 +1,113 @@
+# benchmarks/sqlite_concurrency.py
+"""
+多进程同时读写同一个 SQLite 文件时，对比不设置 PRAGMA（回滚日志、synchronous=FULL）
+与默认 PRAGMA（WAL、synchronous=NORMAL、mmap、cache_size、busy_timeout）的吞吐量和错误数。
+
+每个进程模拟一个 gunicorn 工作进程，创建自己的应用和多个线程，
+按 write_ratio 混合请求 POST /records（写）和 GET /summary?period=month（读，关闭响应缓存），
+统计成功请求数、失败请求数（通常是 database is locked）和每秒请求数。
+
+用法：
+    python benchmarks/sqlite_concurrency.py [--processes 4] [--threads 4] [--duration 10] [--write-ratio 0.3]
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app import create_app  # noqa: E402
+from app.config import Config  # noqa: E402
+from app.extensions import db  # noqa: E402
+
+
+def _config(database_path, pragmas):
+    return type('BenchmarkConfig', (Config,), {
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + database_path,
+        'SQLITE_PRAGMAS': pragmas,
+        'RESPONSE_CACHE_BACKEND': 'none',
+    })
+
+
+def _process(database_path, pragmas, threads, duration, write_ratio, token, queue):
+    app = create_app(_config(database_path, pragmas))
+    headers = {"Authorization": token}
+    counts = {"ok": 0, "errors": 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def run(seed):
+        rng = random.Random(seed)
+        client = app.test_client()
+        ok = errors = 0
+        while time.perf_counter() < deadline:
+            if rng.random() < write_ratio:
+                response = client.post('/records', json={"amount": round(rng.uniform(1, 100), 2), "category": "餐饮",
+                                                         "type": "expense", "note": "并发"}, headers=headers)
+            else:
+                response = client.get('/summary?period=month', headers=headers)
+            response.get_data()
+            if response.status_code == 200:
+                ok += 1
+            else:
+                errors += 1
+        with lock:
+            counts["ok"] += ok
+            counts["errors"] += errors
+
+    workers = [threading.Thread(target=run, args=(os.getpid() * 100 + i,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    queue.put(counts)
+
+
+def _measure(pragmas, processes, threads, duration, write_ratio):
+    database_path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    app = create_app(_config(database_path, pragmas))
+    with app.app_context():
+        db.create_all()
+    client = app.test_client()
+    client.post('/register', json={"username": "bench", "password": "bench"})
+    token = client.post('/login', json={"username": "bench", "password": "bench"}).get_json()['token']
+    for i in range(2000):
+        client.post('/records', json={"amount": 10.0, "category": "餐饮", "type": "expense",
+                                      "timeStamp": 1704067200000 + i * 3600000}, headers={"Authorization": token})
+    with app.app_context():
+        db.engine.dispose()
+
+    context = multiprocessing.get_context('fork')
+    queue = context.Queue()
+    workers = [context.Process(target=_process,
+                               args=(database_path, pragmas, threads, duration, write_ratio, token, queue))
+               for _ in range(processes)]
+    for worker in workers:
+        worker.start()
+    results = [queue.get() for _ in workers]
+    for worker in workers:
+        worker.join()
+    return sum(result["ok"] for result in results), sum(result["errors"] for result in results)
+
+
+def main(processes=4, threads=4, duration=10, write_ratio=0.3):
+    print(f"{processes} 个进程 × {threads} 个线程，持续 {duration}s，写请求比例 {write_ratio}")
+    print(f"{'配置':<12}{'成功':>8}{'失败':>8}{'req/s':>10}")
+    for label, pragmas in (('无 PRAGMA', False), ('默认 PRAGMA', True)):
+        ok, errors = _measure(pragmas, processes, threads, duration, write_ratio)
+        print(f"{label:<12}{ok:>8}{errors:>8}{ok / duration:>10.1f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='多进程混合读写下对比设置与不设置 SQLite PRAGMA 的吞吐量。')
+    parser.add_argument('--processes', type=int, default=4, help='进程数')
+    parser.add_argument('--threads', type=int, default=4, help='每个进程的线程数')
+    parser.add_argument('--duration', type=int, default=10, help='每种配置的持续秒数')
+    parser.add_argument('--write-ratio', type=float, default=0.3, help='写请求比例')
+    args = parser.parse_args()
+    main(args.processes, args.threads, args.duration, args.write_ratio)
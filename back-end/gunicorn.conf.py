@@ -0,0 +1,50 @@
+# gunicorn.conf.py
+"""
+gunicorn 配置，在 back-end 目录下运行 gunicorn 时自动加载：
+
+    gunicorn wsgi:app
+
+以下参数均可通过环境变量覆盖。平滑重载：向主进程发送 HUP 信号（kill -HUP <pid>），
+gunicorn 会启动新的工作进程并等待旧进程处理完正在进行的请求（最长 graceful_timeout 秒）后退出。
+预加载（preload_app）时 HUP 不会重新导入应用代码：部署新代码时先发送 USR2 启动新的主进程，
+确认新进程正常后再向旧主进程发送 QUIT；或设置 GUNICORN_PRELOAD=0。
+"""
+
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+
+# 工作进程数默认为 CPU 核数 * 2 + 1；WEB_CONCURRENCY 是 gunicorn 约定的环境变量
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+# gthread：每个工作进程内多个线程处理请求，适合等待数据库和文件 IO 的请求；sync：每个进程一次处理一个请求
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.environ.get('GUNICORN_THREADS', 4)) if worker_class == 'gthread' else 1
+
+# 在主进程中执行 create_app 后再 fork，工作进程共享已导入的代码，启动更快、内存占用更少
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
+# 与反向代理之间的长连接保持时间（秒），应小于代理端的空闲超时
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+# 单个请求的超时时间（秒），大文件同步导入可能较慢
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+# 重载或退出时等待正在处理的请求完成的时间（秒）
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+
+# 每个工作进程处理一定数量的请求后自动重启，避免内存缓慢增长；jitter 错开各进程的重启时间，0 表示不重启
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 10000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 1000))
+
+# 访问日志默认输出到标准输出，设为空字符串时关闭
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-') or None
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+
+def post_fork(server, worker):
+    """预加载时数据库连接池在主进程中创建，fork 后丢弃继承的连接，每个工作进程使用自己的连接。"""
+    if preload_app:
+        from wsgi import app
+        from app.extensions import db
+        with app.app_context():
+            db.engine.dispose(close=False)
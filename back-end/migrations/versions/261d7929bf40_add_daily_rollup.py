@@ -0,0 +1,41 @@
+"""add daily_rollup table
+
+Revision ID: 261d7929bf40
+Revises: d6a45efae286
+Create Date: 2026-10-18 17:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '261d7929bf40'
+down_revision = 'd6a45efae286'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('daily_rollup',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('type', sa.String(length=10), nullable=False),
+        sa.Column('category', sa.String(length=50), nullable=False),
+        sa.Column('amount', sa.Float(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('user_id', 'day', 'type', 'category')
+    )
+
+    # 用已有记录回填汇总表
+    op.execute(
+        "INSERT INTO daily_rollup (user_id, day, type, category, amount, count) "
+        "SELECT user_id, date(date), type, category, sum(amount), count(*) FROM record "
+        "WHERE date IS NOT NULL "
+        "GROUP BY user_id, date(date), type, category"
+    )
+
+
+def downgrade():
+    op.drop_table('daily_rollup')
@@ -0,0 +1,44 @@
+"""use AUTOINCREMENT for record ids on SQLite
+
+Revision ID: 5d3a3a46d6c5
+Revises: e30b6e302fa1
+Create Date: 2026-10-19 10:20:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '5d3a3a46d6c5'
+down_revision = 'e30b6e302fa1'
+branch_labels = None
+depends_on = None
+
+
+def _rebuild_record(autoincrement):
+    # SQLite 不能修改已有表的主键属性，只能按新定义重建 record 表并复制数据（索引一并重建）
+    with op.batch_alter_table('record', recreate='always',
+                              table_kwargs={'sqlite_autoincrement': autoincrement}) as batch_op:
+        pass
+
+
+def upgrade():
+    # 其他数据库的自增序列本来就不会复用已删除的 ID
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    _rebuild_record(True)
+    # 复制数据后序列从现有的最大 ID 开始；已删除且比它大的 ID 仍留在墓碑中，序列需从墓碑中的最大 ID 之后开始
+    op.execute(
+        "INSERT INTO sqlite_sequence (name, seq) SELECT 'record', 0 "
+        "WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = 'record')"
+    )
+    op.execute(
+        "UPDATE sqlite_sequence SET seq = max(seq, coalesce((SELECT max(record_id) FROM record_tombstone), 0)) "
+        "WHERE name = 'record'"
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    _rebuild_record(False)
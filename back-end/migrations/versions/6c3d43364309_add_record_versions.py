@@ -0,0 +1,45 @@
+"""add record versions and record_tombstone table
+
+Revision ID: 6c3d43364309
+Revises: 1ebc91c2933d
+Create Date: 2026-10-18 19:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6c3d43364309'
+down_revision = '1ebc91c2933d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # 已有记录的版本为 0，客户端用 since=0 即可取得全部记录
+    op.add_column('record', sa.Column('created_version', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('record', sa.Column('updated_version', sa.Integer(), nullable=False, server_default='0'))
+    op.create_index('ix_record_user_updated_version', 'record', ['user_id', 'updated_version'], unique=False)
+
+    op.create_table('record_tombstone',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('record_id', sa.Integer(), nullable=False),
+        sa.Column('created_version', sa.Integer(), nullable=False),
+        sa.Column('deleted_version', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_record_tombstone_user_version', 'record_tombstone', ['user_id', 'deleted_version'],
+                    unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_record_tombstone_user_version', table_name='record_tombstone')
+    op.drop_table('record_tombstone')
+
+    op.drop_index('ix_record_user_updated_version', table_name='record')
+    with op.batch_alter_table('record', schema=None) as batch_op:
+        batch_op.drop_column('updated_version')
+        batch_op.drop_column('created_version')
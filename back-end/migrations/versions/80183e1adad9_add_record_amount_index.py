@@ -0,0 +1,24 @@
+"""add record (user_id, amount) index
+
+Revision ID: 80183e1adad9
+Revises: 6c3d43364309
+Create Date: 2026-10-18 19:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '80183e1adad9'
+down_revision = '6c3d43364309'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_record_user_amount', 'record', ['user_id', 'amount'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_record_user_amount', table_name='record')
@@ -0,0 +1,111 @@
+"""add record fingerprint and imported_file table
+
+Revision ID: 9a854693aa12
+Revises: 0d5f63e31af5
+Create Date: 2026-10-18 18:20:00.000000
+
+"""
+import hashlib
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a854693aa12'
+down_revision = '0d5f63e31af5'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 5000
+
+record = sa.table(
+    'record',
+    sa.column('id', sa.Integer),
+    sa.column('user_id', sa.Integer),
+    sa.column('amount', sa.Float),
+    sa.column('category', sa.String),
+    sa.column('date', sa.DateTime),
+    sa.column('type', sa.String),
+    sa.column('note', sa.String),
+    sa.column('fingerprint', sa.String),
+)
+
+
+def _fingerprint(row):
+    # 与 app.importer.record_fingerprint 保持一致，迁移中不依赖应用代码
+    parts = [
+        str(row.user_id),
+        row.date.strftime('%Y-%m-%d %H:%M:%S'),
+        str(round(row.amount * 100)),
+        row.type,
+        row.category,
+        row.note or '',
+    ]
+    return hashlib.sha256('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
+
+def _backfill_fingerprints():
+    """为已有记录补算指纹，重复的记录只保留第一条的指纹，其余保持为空。"""
+    bind = op.get_bind()
+    seen = set()
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(record.c.id, record.c.user_id, record.c.amount, record.c.category,
+                      record.c.date, record.c.type, record.c.note)
+            .where(record.c.id > last_id, record.c.date.isnot(None))
+            .order_by(record.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        updates = []
+        for row in rows:
+            fingerprint = _fingerprint(row)
+            if fingerprint not in seen:
+                seen.add(fingerprint)
+                updates.append({'record_id': row.id, 'fingerprint': fingerprint})
+        if updates:
+            bind.execute(
+                record.update().where(record.c.id == sa.bindparam('record_id'))
+                .values(fingerprint=sa.bindparam('fingerprint')),
+                updates
+            )
+        last_id = rows[-1].id
+
+
+def upgrade():
+    op.add_column('record', sa.Column('fingerprint', sa.String(length=64), nullable=True))
+
+    _backfill_fingerprints()
+
+    op.create_index('ux_record_fingerprint', 'record', ['fingerprint'], unique=True)
+
+    op.create_table('imported_file',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('sha256', sa.String(length=64), nullable=False),
+        sa.Column('filename', sa.String(length=255), nullable=True),
+        sa.Column('imported_records', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'sha256', name='uq_imported_file_user_sha256')
+    )
+
+    op.add_column('import_job', sa.Column('rows_duplicate', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('import_job', sa.Column('file_hash', sa.String(length=64), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('import_job', schema=None) as batch_op:
+        batch_op.drop_column('file_hash')
+        batch_op.drop_column('rows_duplicate')
+
+    op.drop_table('imported_file')
+
+    op.drop_index('ux_record_fingerprint', table_name='record')
+    # SQLite 删除列需要重建表
+    with op.batch_alter_table('record', schema=None) as batch_op:
+        batch_op.drop_column('fingerprint')
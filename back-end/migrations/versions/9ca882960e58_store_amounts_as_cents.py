@@ -0,0 +1,39 @@
+"""store amounts as integer cents
+
+Revision ID: 9ca882960e58
+Revises: 9a854693aa12
+Create Date: 2026-10-18 18:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9ca882960e58'
+down_revision = '9a854693aa12'
+branch_labels = None
+depends_on = None
+
+TABLES = ['record', 'daily_rollup']
+
+
+def upgrade():
+    for table in TABLES:
+        # 先在原列上换算成分，再修改列类型（SQLite 通过重建表完成）
+        op.execute(f"UPDATE {table} SET amount = ROUND(amount * 100)")
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.alter_column('amount',
+                                  existing_type=sa.Float(),
+                                  type_=sa.BigInteger(),
+                                  existing_nullable=False)
+
+
+def downgrade():
+    for table in TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.alter_column('amount',
+                                  existing_type=sa.BigInteger(),
+                                  type_=sa.Float(),
+                                  existing_nullable=False)
+        op.execute(f"UPDATE {table} SET amount = amount / 100.0")
@@ -0,0 +1,48 @@
+"""initial schema
+
+Revision ID: a6d62071290f
+Revises: 
+Create Date: 2026-10-18 17:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6d62071290f'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # 已有数据库（由 db.create_all() 创建）中表已存在，只创建缺失的表
+    existing_tables = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if 'user' not in existing_tables:
+        op.create_table('user',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('username', sa.String(length=80), nullable=False),
+            sa.Column('password_hash', sa.String(length=128), nullable=False),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('username')
+        )
+
+    if 'record' not in existing_tables:
+        op.create_table('record',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('amount', sa.Float(), nullable=False),
+            sa.Column('category', sa.String(length=50), nullable=False),
+            sa.Column('date', sa.DateTime(), nullable=True),
+            sa.Column('type', sa.String(length=10), nullable=False),
+            sa.Column('note', sa.String(length=255), nullable=True),
+            sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+
+def downgrade():
+    op.drop_table('record')
+    op.drop_table('user')
@@ -0,0 +1,25 @@
+"""add import_job.heartbeat_at
+
+Revision ID: b7c41f0e9a2d
+Revises: 5d3a3a46d6c5
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7c41f0e9a2d'
+down_revision = '5d3a3a46d6c5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('import_job', sa.Column('heartbeat_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('import_job', schema=None) as batch_op:
+        batch_op.drop_column('heartbeat_at')
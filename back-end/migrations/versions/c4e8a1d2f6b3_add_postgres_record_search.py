@@ -0,0 +1,96 @@
+"""add record_search tsvector index (PostgreSQL only)
+
+Revision ID: c4e8a1d2f6b3
+Revises: b7c41f0e9a2d
+Create Date: 2026-10-20 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4e8a1d2f6b3'
+down_revision = 'b7c41f0e9a2d'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 5000
+TS_MAX_POSITION = 16383
+
+record = sa.table(
+    'record',
+    sa.column('id', sa.Integer),
+    sa.column('user_id', sa.Integer),
+    sa.column('category', sa.String),
+    sa.column('note', sa.String),
+)
+
+
+def _search_terms(value):
+    # 与 app.search.search_terms 保持一致
+    runs, current = [], []
+    for char in (value or '').lower():
+        if char.isalnum():
+            current.append(char)
+        elif current:
+            runs.append(''.join(current))
+            current = []
+    if current:
+        runs.append(''.join(current))
+    terms = []
+    for run in runs:
+        terms.extend(run[i:i + 2] for i in range(len(run) - 1))
+        terms.append(run[-1])
+    return terms
+
+
+def _quote_lexeme(lexeme):
+    return "'" + lexeme.replace('\\', '\\\\').replace("'", "''") + "'"
+
+
+def _tsvector_literal(user_id, note, category):
+    # 与 app.search.tsvector_literal 保持一致
+    lexemes = [_quote_lexeme(f'#{user_id}')]
+    position = 0
+    for value, weight in ((note, 'B'), (category, 'A')):
+        for term in _search_terms(value):
+            position += 1
+            lexemes.append(f"{_quote_lexeme(term)}:{min(position, TS_MAX_POSITION)}{weight}")
+        position += 1
+    return ' '.join(lexemes)
+
+
+def _backfill_search_index():
+    """为已有记录建立全文索引。"""
+    bind = op.get_bind()
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(record.c.id, record.c.user_id, record.c.note, record.c.category)
+            .where(record.c.id > last_id)
+            .order_by(record.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        bind.execute(
+            sa.text("INSERT INTO record_search (id, document) VALUES (:id, CAST(:document AS tsvector))"),
+            [{'id': row.id, 'document': _tsvector_literal(row.user_id, row.note, row.category)} for row in rows]
+        )
+        last_id = rows[-1].id
+
+
+def upgrade():
+    # SQLite 的 FTS5 索引表见 e30b6e302fa1，其他数据库的搜索直接查询 record 表
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute("CREATE TABLE IF NOT EXISTS record_search (id INTEGER PRIMARY KEY, document TSVECTOR NOT NULL)")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_record_search_document ON record_search USING GIN (document)")
+    _backfill_search_index()
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute("DROP TABLE IF EXISTS record_search")
@@ -0,0 +1,27 @@
+"""add composite indexes for record access paths
+
+Revision ID: d6a45efae286
+Revises: a6d62071290f
+Create Date: 2026-10-18 17:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd6a45efae286'
+down_revision = 'a6d62071290f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_record_user_date', 'record', ['user_id', 'date'], unique=False)
+    op.create_index('ix_record_user_type_category_date', 'record',
+                    ['user_id', 'type', 'category', 'date'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_record_user_type_category_date', table_name='record')
+    op.drop_index('ix_record_user_date', table_name='record')
@@ -0,0 +1,86 @@
+"""add record_search full-text index (SQLite only)
+
+Revision ID: e30b6e302fa1
+Revises: 80183e1adad9
+Create Date: 2026-10-18 23:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e30b6e302fa1'
+down_revision = '80183e1adad9'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 5000
+
+# 与 app.search.CREATE_SEARCH_TABLE 保持一致，迁移中不依赖应用代码
+CREATE_SEARCH_TABLE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS record_search "
+    "USING fts5(owner, note, category, tokenize='unicode61 remove_diacritics 2', prefix='1')"
+)
+
+record = sa.table(
+    'record',
+    sa.column('id', sa.Integer),
+    sa.column('user_id', sa.Integer),
+    sa.column('category', sa.String),
+    sa.column('note', sa.String),
+)
+
+
+def _search_terms(value):
+    # 与 app.search.search_terms 保持一致
+    runs, current = [], []
+    for char in (value or '').lower():
+        if char.isalnum():
+            current.append(char)
+        elif current:
+            runs.append(''.join(current))
+            current = []
+    if current:
+        runs.append(''.join(current))
+    terms = []
+    for run in runs:
+        terms.extend(run[i:i + 2] for i in range(len(run) - 1))
+        terms.append(run[-1])
+    return ' '.join(terms)
+
+
+def _backfill_search_index():
+    """为已有记录建立全文索引。"""
+    bind = op.get_bind()
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(record.c.id, record.c.user_id, record.c.note, record.c.category)
+            .where(record.c.id > last_id)
+            .order_by(record.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        bind.execute(
+            sa.text("INSERT INTO record_search (rowid, owner, note, category) "
+                    "VALUES (:id, :owner, :note, :category)"),
+            [{'id': row.id, 'owner': f'u{row.user_id}', 'note': _search_terms(row.note),
+              'category': _search_terms(row.category)} for row in rows]
+        )
+        last_id = rows[-1].id
+
+
+def upgrade():
+    # 其他数据库的搜索直接查询 record 表，不需要索引表
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    op.execute(CREATE_SEARCH_TABLE)
+    _backfill_search_index()
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    op.execute("DROP TABLE IF EXISTS record_search")
@@ -0,0 +1,60 @@
+# tests/conftest.py
+
+import os
+import pytest
+from app import create_app
+from app.config import Config
+from app.extensions import db
+
+
+@pytest.fixture
+def make_app(tmp_path):
+    """返回创建应用的函数：在临时 SQLite 数据库上创建应用，关键字参数覆盖默认配置。"""
+    apps = []
+
+    def make(**config):
+        config_class = type('TestConfig', (Config,), {
+            'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(tmp_path, 'test.db'),
+            'TESTING': True,
+            **config,
+        })
+        app = create_app(config_class)
+        with app.app_context():
+            db.create_all()
+        apps.append(app)
+        return app
+
+    yield make
+    for app in apps:
+        with app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+
+
+@pytest.fixture
+def app(make_app):
+    """默认配置的应用；测试模块可以重新定义该 fixture 以修改配置。"""
+    return make_app()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def headers(client):
+    """注册并登录一个用户，返回带令牌的请求头。"""
+    client.post('/register', json={"username": "tester", "password": "tester"})
+    token = client.post('/login', json={"username": "tester", "password": "tester"}).get_json()['token']
+    return {"Authorization": token}
+
+
+@pytest.fixture
+def create_record(client, headers):
+    """通过 POST /records 新建一条记录。"""
+    def create(amount=1.0, category='餐饮', type_data='expense', **fields):
+        response = client.post('/records', json={"amount": amount, "category": category, "type": type_data,
+                                                 **fields}, headers=headers)
+        assert response.status_code == 200, response.get_json()
+    return create
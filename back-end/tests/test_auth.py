@@ -0,0 +1,65 @@
+# tests/test_auth.py
+
+import jwt
+from app.auth_cache import AuthCache, AuthUser, get_auth_cache
+from app.extensions import db
+from app.models import User
+
+
+def _count_decodes(monkeypatch):
+    calls = []
+    decode = jwt.decode
+
+    def counting_decode(*args, **kwargs):
+        calls.append(args[0])
+        return decode(*args, **kwargs)
+
+    monkeypatch.setattr('app.utils.jwt.decode', counting_decode)
+    return calls
+
+
+def test_cached_token_skips_decode(app, client, headers, monkeypatch):
+    decodes = _count_decodes(monkeypatch)
+    for _ in range(3):
+        assert client.get('/records', headers=headers).status_code == 200
+    assert len(decodes) == 1
+    with app.app_context():
+        stats = get_auth_cache().stats()
+    assert (stats['size'], stats['hits'], stats['misses']) == (1, 2, 1)
+
+
+def test_password_change_and_delete_invalidate(app, client, headers, monkeypatch):
+    assert client.get('/records', headers=headers).status_code == 200
+    decodes = _count_decodes(monkeypatch)
+
+    with app.app_context():
+        user = db.session.execute(db.select(User).filter_by(username='tester')).scalar_one()
+        user_id = user.id
+        user.password_hash = 'changed'
+        db.session.commit()
+        assert get_auth_cache().stats()['size'] == 0
+    assert client.get('/records', headers=headers).status_code == 200
+    assert len(decodes) == 1
+
+    with app.app_context():
+        db.session.delete(db.session.get(User, user_id))
+        db.session.commit()
+    response = client.get('/records', headers=headers)
+    assert response.status_code == 401
+    assert len(decodes) == 2
+
+
+def test_entries_expire_and_evict(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr('app.auth_cache.time.time', lambda: now[0])
+    cache = AuthCache(max_size=2, ttl=60)
+    cache.put('a', AuthUser(1, 'a'))
+    cache.put('b', AuthUser(2, 'b'), token_exp=1010)
+    cache.put('c', AuthUser(3, 'c'))
+    assert cache.get('a') is None
+    assert cache.stats()['evictions'] == 1
+
+    now[0] = 1020
+    # b 在令牌本身的 exp 到期，c 仍在缓存有效期内
+    assert cache.get('b') is None
+    assert cache.get('c') == AuthUser(3, 'c')
@@ -0,0 +1,44 @@
+# tests/test_benchmarks.py
+
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+
+BENCHMARKS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks')
+
+
+def _load_endpoints():
+    spec = importlib.util.spec_from_file_location('bench_endpoints', os.path.join(BENCHMARKS, 'endpoints.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_endpoints_benchmark_runs_and_compares(tmp_path):
+    # 用很小的账本跑一遍，保证基准脚本与接口同步演进；耗时数据本身不做断言
+    output = tmp_path / 'result.json'
+    command = [sys.executable, os.path.join(BENCHMARKS, 'endpoints.py'), '--users', '2', '--records', '1000',
+               '--repeat', '1', '--upload-rows', '20']
+    result = subprocess.run(command + ['--output', str(output)], capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr[-2000:]
+
+    data = json.loads(output.read_text(encoding='utf-8'))
+    names = list(data['results'])
+    for prefix in ('auth', 'get_records', 'get_summary[', 'get_summary_pie', 'upload_file'):
+        assert any(name.startswith(prefix) for name in names), prefix
+    assert all(item['min_ms'] > 0 for item in data['results'].values())
+
+    result = subprocess.run(command + ['--only', 'get_summary[year]', '--compare', str(output),
+                                       '--tolerance', '1000'], capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr[-2000:]
+
+
+def test_compare_flags_regressions():
+    endpoints = _load_endpoints()
+    meta = {"args": {"records": 1000}, "commit": None, "created_at": ""}
+    baseline = {"meta": meta, "results": {"a": {"min_ms": 10.0}, "b": {"min_ms": 10.0}, "c": {"min_ms": 0.1}}}
+    current = {"meta": meta, "results": {"a": {"min_ms": 20.0}, "b": {"min_ms": 11.0}, "c": {"min_ms": 0.5}}}
+    # b 变慢未超过比例，c 超过比例但绝对差值不到 min_delta_ms
+    assert endpoints.compare(baseline, current, 'min_ms', 0.25, 0.5) == ['a']
@@ -0,0 +1,18 @@
+# tests/test_commands.py
+
+def test_check_query_plans(app):
+    result = app.test_cli_runner().invoke(args=['check-query-plans'])
+    assert result.exit_code == 0, result.output
+    assert '所有路由查询均使用索引' in result.output
+
+
+def test_check_startup(app):
+    runner = app.test_cli_runner()
+    # 放宽耗时和内存的上限，避免测试机负载影响结果；预算本身用 flask check-startup 的默认值检查
+    result = runner.invoke(args=['check-startup', '--runs', '1', '--max-seconds', '30', '--max-rss', '1024'])
+    assert result.exit_code == 0, result.output
+    assert '启动耗时和内存均在预算内' in result.output
+
+    result = runner.invoke(args=['check-startup', '--runs', '1', '--max-rss', '1'])
+    assert result.exit_code == 1
+    assert '峰值内存' in result.output
@@ -0,0 +1,76 @@
+# tests/test_diagnostics.py
+
+import json
+import logging
+import pytest
+from app.diagnostics import logger, statement_shape
+from app.extensions import db
+from app.models import User
+
+
+@pytest.fixture
+def events(caplog, monkeypatch):
+    """收集诊断日志中的事件。诊断日志不向上传播，直接把 caplog 的处理器挂到诊断日志上。"""
+    logger.addHandler(caplog.handler)
+    caplog.set_level(logging.INFO, logger=logger.name)
+    monkeypatch.setattr(logger, 'propagate', False)
+    records = []
+
+    def read(name):
+        records[:] = [json.loads(record.getMessage()) for record in caplog.records
+                      if record.name == logger.name]
+        return [record for record in records if record['event'] == name]
+
+    yield read
+    logger.removeHandler(caplog.handler)
+
+
+def test_slow_queries_are_logged_with_plan(make_app, events):
+    app = make_app(SQL_DIAGNOSTICS=True, SQL_SLOW_QUERY_MS=0)
+    client = app.test_client()
+    client.post('/register', json={"username": "tester", "password": "tester"})
+    token = client.post('/login', json={"username": "tester", "password": "tester"}).get_json()['token']
+    client.get('/summary?period=overall', headers={"Authorization": token})
+
+    selects = [event for event in events('slow_query') if event.get('endpoint') == 'summary.get_summary'
+               and event['statement'].lstrip().startswith('SELECT')]
+    assert selects
+    assert all(event['plan'] and event['path'] == '/summary' for event in selects)
+    assert any(isinstance(event['parameters'], list) and event['parameters'] for event in selects)
+
+
+def test_repeated_statements_are_reported(make_app, events):
+    app = make_app(SQL_DIAGNOSTICS=True, SQL_N_PLUS_ONE_THRESHOLD=3, SQL_TIMELINE=True)
+
+    @app.route('/users-one-by-one')
+    def users_one_by_one():
+        # 逐个按 ID 查询，形状相同的语句执行 4 次
+        for user_id in range(1, 5):
+            db.session.execute(db.select(User).where(User.id == user_id)).all()
+        return 'ok'
+
+    app.test_client().get('/users-one-by-one')
+    n_plus_one, = events('n_plus_one')
+    assert n_plus_one['count'] == 4
+    assert n_plus_one['endpoint'] == 'users_one_by_one'
+    assert n_plus_one['statement'].startswith('SELECT')
+
+    timeline, = events('sql_timeline')
+    assert timeline['status'] == 200
+    assert timeline['statement_count'] == len(timeline['statements']) == 4
+    assert not timeline['truncated']
+    # 默认阈值 100ms，这些查询不算慢查询
+    assert events('slow_query') == []
+
+
+def test_statement_shape():
+    assert statement_shape("SELECT * FROM record WHERE id IN (?, ?, ?) AND note = 'a''b' AND amount > 10") == \
+        statement_shape("SELECT *  FROM record\nWHERE id IN (?) AND note = 'x' AND amount > 2.5") == \
+        "SELECT * FROM record WHERE id IN (?) AND note = ? AND amount > ?"
+
+
+def test_diagnostics_disabled_by_default(app, caplog):
+    assert app.extensions['sql_diagnostics'] is None
+    with caplog.at_level(logging.INFO, logger=logger.name):
+        app.test_client().get('/records')
+    assert not caplog.records
@@ -0,0 +1,102 @@
+# tests/test_jobs.py
+
+import datetime
+import hashlib
+import io
+import time
+import uuid
+import pytest
+from sqlalchemy import update
+from app import importer, jobs
+from app.extensions import db
+from app.models import ImportJob, ImportedFile, User
+
+CONTENT = '时间,类别,金额,类型,备注\n2024/05/01 10:00,交通,3,支出,地铁\n2024/05/01 11:00,餐饮,x,支出,\n'.encode('utf-8-sig')
+
+
+def _wait(client, headers, job_id):
+    for _ in range(200):
+        status = client.get(f'/upload/jobs/{job_id}', headers=headers).get_json()
+        if status['status'] not in ('pending', 'running'):
+            return status
+        time.sleep(0.05)
+    pytest.fail('导入任务未结束')
+
+
+def _submit(client, headers, content=CONTENT):
+    return client.post('/upload/jobs', data={'file': (io.BytesIO(content), 'records.csv')}, headers=headers)
+
+
+@pytest.fixture
+def user_id(app, headers):
+    with app.app_context():
+        return User.query.filter_by(username='tester').one().id
+
+
+def _add_job(app, user_id, **fields):
+    with app.app_context():
+        job = ImportJob(id=uuid.uuid4().hex, user_id=user_id, filename='records.csv',
+                        file_hash=hashlib.sha256(CONTENT).hexdigest(), **fields)
+        db.session.add(job)
+        db.session.commit()
+        return job.id
+
+
+def test_job_imports_file(client, headers):
+    response = _submit(client, headers)
+    assert response.status_code == 202
+    status = _wait(client, headers, response.get_json()['job_id'])
+    assert status['status'] == 'completed'
+    assert (status['rows_processed'], status['rows_imported'], status['rows_rejected']) == (2, 1, 1)
+    assert status['rejected_rows'] == [{"row": 3, "error": "无效的金额：x"}]
+    # 完整导入的文件记录哈希，再次提交返回 409
+    assert _submit(client, headers).status_code == 409
+
+
+def test_stale_job_is_expired(app, client, headers, user_id):
+    job_id = _add_job(app, user_id, status='running', created_at=datetime.datetime(2024, 1, 1))
+    # 执行任务的进程已退出：查询时标记为失败，同一文件可以重新提交
+    status = client.get(f'/upload/jobs/{job_id}', headers=headers).get_json()
+    assert status['status'] == 'failed'
+    response = _submit(client, headers)
+    assert response.status_code == 202
+    assert _wait(client, headers, response.get_json()['job_id'])['status'] == 'completed'
+
+
+def test_worker_does_not_overwrite_expiry(app, user_id, tmp_path, monkeypatch):
+    job_id = _add_job(app, user_id, status='pending')
+    path = tmp_path / 'records.csv'
+    path.write_bytes(CONTENT)
+
+    insert_records = importer.insert_records
+
+    def insert_then_expire(rows, chunk_size):
+        # 模拟处理这一块时租约过期，被其他进程的 expire_stale_jobs 标记为失败
+        inserted = insert_records(rows, chunk_size)
+        db.session.execute(update(ImportJob).where(ImportJob.id == job_id)
+                           .values(status='failed', error='执行任务的进程已退出，任务中断。'))
+        return inserted
+
+    monkeypatch.setattr(importer, 'insert_records', insert_then_expire)
+    jobs._run_import_job(app, job_id, str(path))
+
+    with app.app_context():
+        job = db.session.get(ImportJob, job_id)
+        assert (job.status, job.error) == ('failed', '执行任务的进程已退出，任务中断。')
+        assert ImportedFile.query.count() == 0
+    assert not path.exists()
+
+
+def test_cancelled_before_start(app, user_id, tmp_path):
+    job_id = _add_job(app, user_id, status='pending', cancel_requested=True)
+    path = tmp_path / 'records.csv'
+    path.write_bytes(CONTENT)
+    jobs._run_import_job(app, job_id, str(path))
+    with app.app_context():
+        assert db.session.get(ImportJob, job_id).status == 'cancelled'
+
+
+def test_unreadable_file_fails_job_with_message(client, headers):
+    response = client.post('/upload/jobs', data={'file': (io.BytesIO(b''), 'empty.csv')}, headers=headers)
+    status = _wait(client, headers, response.get_json()['job_id'])
+    assert (status['status'], status['error']) == ('failed', '文件为空。')
@@ -0,0 +1,57 @@
+# tests/test_json_provider.py
+
+import datetime
+import decimal
+import json
+import pytest
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from app import json_provider
+from app.json_provider import OrjsonProvider, init_json_provider
+
+orjson = pytest.importorskip('orjson')
+
+
+def _app(provider):
+    app = Flask(__name__)
+    app.config['JSON_PROVIDER'] = provider
+    init_json_provider(app)
+    return app
+
+
+def test_output_matches_default_provider():
+    app = Flask(__name__)
+    fast, std = OrjsonProvider(app), DefaultJSONProvider(app)
+    value = {"b": [1, 2.5, None, True], "a": {"类别": "餐饮", "z": "x"},
+             "date": datetime.datetime(2024, 5, 1, 12, 30), "amount": decimal.Decimal('1.10')}
+    # 非 ASCII 字符不再转义，其余与默认提供者一致（键排序、datetime 和 Decimal 的格式）
+    assert fast.dumps(value) == json.dumps(json.loads(std.dumps(value)), ensure_ascii=False,
+                                           sort_keys=True, separators=(',', ':'))
+    assert json.loads(fast.dumps(value)) == json.loads(std.dumps(value))
+    assert '餐饮' in fast.dumps(value)
+    # 超过 64 位的整数退回标准库
+    assert fast.dumps({"big": 2 ** 70}) == std.dumps({"big": 2 ** 70})
+
+    assert fast.loads('{"a": [1, "午饭"]}') == {"a": [1, "午饭"]}
+    # orjson 不接受的输入退回标准库
+    assert fast.loads('NaN') != fast.loads('NaN')
+
+
+def test_responses_match(app, client, headers, create_record):
+    create_record(12.5, note='午饭')
+    fast_body = client.get('/records', headers=headers).get_json()
+    app.json = DefaultJSONProvider(app)
+    assert client.get('/records', headers=headers).get_json() == fast_body
+
+
+def test_provider_selection(monkeypatch):
+    assert isinstance(_app('auto').json, OrjsonProvider)
+    assert isinstance(_app('orjson').json, OrjsonProvider)
+    assert type(_app('std').json) is DefaultJSONProvider
+    with pytest.raises(ValueError):
+        _app('ujson')
+
+    monkeypatch.setattr(json_provider, 'orjson', None)
+    assert type(_app('auto').json) is DefaultJSONProvider
+    with pytest.raises(RuntimeError):
+        _app('orjson')
@@ -0,0 +1,49 @@
+# tests/test_metrics.py
+
+import pytest
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app(METRICS_ENABLED=True)
+
+
+def _samples(client):
+    """读取 /metrics，返回 {指标名和标签: 值}。"""
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    samples = {}
+    for line in response.get_data(as_text=True).splitlines():
+        if line and not line.startswith('#'):
+            name, value = line.rsplit(' ', 1)
+            samples[name] = float(value)
+    return samples
+
+
+def test_metrics_per_endpoint(client, headers, create_record):
+    for amount in (1.0, 2.0, 3.0):
+        create_record(amount)
+    # 流式响应在关闭（发送完毕）时才记录
+    with client.get('/records', headers=headers) as response:
+        body = response.get_data()
+    client.get('/no-such-page').close()
+
+    samples = _samples(client)
+    labels = 'endpoint="records.get_records",method="GET"'
+    assert samples[f'http_requests_total{{{labels},status="200"}}'] == 1
+    assert samples[f'http_requests_total{{endpoint="records.add_record",method="POST",status="200"}}'] == 3
+    assert samples['http_requests_total{endpoint="unmatched",method="GET",status="404"}'] == 1
+    # 按实际发送的字节和输出的行数记录
+    assert samples[f'http_response_size_bytes_sum{{{labels}}}'] == len(body)
+    assert samples[f'http_response_rows_sum{{{labels}}}'] == 3
+    assert samples[f'http_response_rows_bucket{{{labels},le="5"}}'] == 1
+    assert samples[f'http_response_rows_bucket{{{labels},le="2"}}'] == 0
+    assert samples[f'db_statements_per_request_sum{{{labels}}}'] >= 1
+    assert samples[f'http_request_duration_seconds_count{{{labels}}}'] == 1
+    assert samples['auth_cache_hits_total'] == 3
+    assert samples['response_cache_size'] == 0
+
+
+def test_metrics_disabled_by_default(make_app):
+    assert make_app().test_client().get('/metrics').status_code == 404
@@ -0,0 +1,35 @@
+# tests/test_models.py
+
+import decimal
+import pytest
+from app.extensions import db
+from app.models import Money, MAX_AMOUNT
+
+
+def test_money_round_trip(app):
+    money = Money()
+    with app.app_context():
+        dialect = db.engine.dialect
+    for amount in (0.0, 0.01, 0.1, 19.99, -2.5, 1234567.89, MAX_AMOUNT, -MAX_AMOUNT):
+        cents = money.process_bind_param(amount, dialect)
+        assert isinstance(cents, int)
+        assert money.process_result_value(cents, dialect) == amount
+    # PostgreSQL 的 SUM(bigint) 返回 Decimal，读出后仍为浮点数
+    assert money.process_result_value(decimal.Decimal(30), dialect) == 0.3
+    assert money.process_bind_param(None, dialect) is None
+
+
+def test_money_rejects_unstorable_values(app):
+    money = Money()
+    with app.app_context():
+        dialect = db.engine.dialect
+    for amount in (float('nan'), float('inf'), 1e17):
+        with pytest.raises(ValueError):
+            money.process_bind_param(amount, dialect)
+
+
+def test_sums_are_exact(client, headers, create_record):
+    for amount in (0.1, 0.2, 0.1, 0.2, 0.1, 0.2):
+        create_record(amount)
+    summary = client.get('/summary?period=overall', headers=headers).get_json()['summary'][0]
+    assert summary['total_expense'] == 0.9
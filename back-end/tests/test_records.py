@@ -0,0 +1,320 @@
+# tests/test_records.py
+
+import json
+from sqlalchemy import event
+from app.extensions import db
+from app.models import User
+from app.rollup import find_rollup_mismatches
+
+MAY_1 = 1714537200000
+DAY = 86400000
+
+
+def _record_ids(client, headers):
+    return [record['id'] for record in client.get('/records', headers=headers).get_json()]
+
+
+def _overall(client, headers):
+    return client.get('/summary?period=overall', headers=headers).get_json()['summary'][0]
+
+
+def _pages(client, headers, query):
+    """按游标依次读取所有分页，返回每页的记录 ID 列表。"""
+    pages, cursor = [], None
+    while True:
+        url = f'/records?{query}' + (f'&cursor={cursor}' if cursor else '')
+        response = client.get(url, headers=headers)
+        assert response.status_code == 200, response.get_json()
+        page = response.get_json()
+        pages.append([record['id'] for record in page['records']])
+        cursor = page['next_cursor']
+        if cursor is None:
+            return pages
+
+
+def test_keyset_pages_follow_sort_order(client, headers, create_record):
+    # 时间和金额都有重复值，分页需按 (key, id) 越过游标
+    for i in range(7):
+        create_record(float(i % 3), timeStamp=MAY_1 + (i % 2) * DAY)
+    records = client.get('/records', headers=headers).get_json()
+
+    by_date = [r['id'] for r in sorted(records, key=lambda r: (r['timeStamp'], r['id']))]
+    assert _pages(client, headers, 'limit=3') == [by_date[:3], by_date[3:6], by_date[6:]]
+
+    by_amount_desc = [r['id'] for r in sorted(records, key=lambda r: (-r['amount'], -r['id']))]
+    assert sum(_pages(client, headers, 'limit=2&sort=-amount'), []) == by_amount_desc
+
+
+def test_cursor_survives_deleting_its_row(client, headers, create_record):
+    for i in range(4):
+        create_record(timeStamp=MAY_1 + i * DAY)
+    first, second, third, fourth = _record_ids(client, headers)
+    page = client.get('/records?limit=2', headers=headers).get_json()
+    assert client.delete(f'/records/{second}', headers=headers).status_code == 200
+
+    page = client.get(f"/records?limit=2&cursor={page['next_cursor']}", headers=headers).get_json()
+    assert [record['id'] for record in page['records']] == [third, fourth]
+    assert page['next_cursor'] is None
+
+
+def test_invalid_paging_parameters(client, headers, create_record):
+    create_record()
+    create_record()
+    for query in ('limit=abc', 'limit=0', 'limit=-1', 'limit=1001', 'limit=abc&stream=ndjson',
+                  'limit=1&cursor=abc', 'limit=1&cursor=e30'):
+        assert client.get(f'/records?{query}', headers=headers).status_code == 400, query
+
+    # 游标只能用于生成它时的排序方式
+    cursor = client.get('/records?limit=1', headers=headers).get_json()['next_cursor']
+    assert client.get(f'/records?limit=1&sort=-date&cursor={cursor}', headers=headers).status_code == 400
+
+
+def test_streaming_outputs_match(client, headers, create_record, app):
+    app.config['RECORDS_STREAM_BATCH_SIZE'] = 2
+    for i in range(5):
+        create_record(float(i), note=f'第 {i} 条', timeStamp=MAY_1 + i * DAY)
+
+    response = client.get('/records', headers=headers)
+    assert response.is_streamed
+    records = response.get_json()
+    assert [record['amount'] for record in records] == [0.0, 1.0, 2.0, 3.0, 4.0]
+
+    response = client.get('/records?stream=ndjson', headers=headers)
+    assert response.mimetype == 'application/x-ndjson'
+    assert [json.loads(line) for line in response.get_data(as_text=True).splitlines()] == records
+    accept = client.get('/records', headers={**headers, 'Accept': 'application/x-ndjson'})
+    assert accept.get_data() == response.get_data()
+
+    # ndjson 带 limit 时只输出前 limit 条，不分页
+    limited = client.get('/records?stream=ndjson&limit=2', headers=headers).get_data(as_text=True)
+    assert [json.loads(line) for line in limited.splitlines()] == records[:2]
+
+
+def test_amounts_out_of_range_are_rejected(client, headers, create_record):
+    create_record(1.0)
+    record_id, = _record_ids(client, headers)
+    for amount in (1e17, -1e17, 'inf', 'nan', 'abc', None, True, 10 ** 400):
+        response = client.post('/records', json={"amount": amount, "category": '餐饮', "type": 'expense'},
+                               headers=headers)
+        assert response.status_code == 400, amount
+        response = client.put(f'/records/{record_id}', json={"amount": amount}, headers=headers)
+        assert response.status_code == 400, amount
+        response = client.post('/records/batch', json={"operations": [
+            {"op": "create", "amount": amount, "category": '餐饮', "type": 'expense'}]}, headers=headers)
+        assert response.status_code == 400, amount
+    for query in ('min_amount=1e20', 'max_amount=-1e20', 'min_amount=inf', 'max_amount=nan'):
+        assert client.get(f'/records?{query}', headers=headers).status_code == 400, query
+    assert [r['amount'] for r in client.get('/records', headers=headers).get_json()] == [1.0]
+
+
+def test_since_reports_changes(client, headers, create_record):
+    for amount in (1.0, 2.0, 3.0):
+        create_record(amount)
+    first, second, third = sorted(_record_ids(client, headers))
+
+    initial = client.get('/records?since=0', headers=headers).get_json()
+    assert initial['inserted'] == [first, second, third]
+    assert initial['updated'] == [] and initial['deleted'] == []
+    token = initial['change_token']
+
+    client.put(f'/records/{first}', json={"amount": 9.0}, headers=headers)
+    client.delete(f'/records/{third}', headers=headers)
+    create_record(4.0)
+    # 窗口内新增又删除的记录不出现在结果中
+    create_record(5.0)
+    transient = max(_record_ids(client, headers))
+    client.delete(f'/records/{transient}', headers=headers)
+
+    changes = client.get(f'/records?since={token}', headers=headers).get_json()
+    assert changes['updated'] == [first]
+    assert changes['deleted'] == [third]
+    assert len(changes['inserted']) == 1
+    # 已删除记录的 ID 不会被新记录复用，否则客户端无法区分删除与新增
+    assert third < changes['inserted'][0] < transient
+    assert changes['change_token'] > token
+
+    assert client.get(f"/records?since={changes['change_token']}", headers=headers).get_json() == {
+        "change_token": changes['change_token'], "inserted": [], "updated": [], "deleted": []
+    }
+    assert client.get('/records?since=-1', headers=headers).status_code == 400
+
+
+def test_batch_create_does_not_reuse_deleted_ids(client, headers, create_record):
+    create_record(1.0)
+    create_record(2.0)
+    last = max(_record_ids(client, headers))
+    results = client.post('/records/batch', json={"operations": [
+        {"op": "delete", "id": last},
+        {"op": "create", "amount": 3.0, "category": "餐饮", "type": "expense"},
+    ]}, headers=headers).get_json()['results']
+    assert results[1]['id'] > last
+
+
+def test_records_etag_revalidation(client, headers, create_record):
+    create_record(1.0)
+    first = client.get('/records', headers=headers)
+    first.get_data()
+    etag, token = first.headers['ETag'], first.headers['X-Change-Token']
+    assert client.get('/records', headers={**headers, 'If-None-Match': etag}).status_code == 304
+    # 不同的 Accept 返回不同格式，ETag 也不同
+    ndjson = client.get('/records', headers={**headers, 'Accept': 'application/x-ndjson'})
+    ndjson.get_data()
+    assert ndjson.headers['ETag'] != etag
+
+    create_record(2.0)
+    changed = client.get('/records', headers={**headers, 'If-None-Match': etag})
+    assert len(changed.get_json()) == 2
+    assert int(changed.headers['X-Change-Token']) > int(token)
+
+
+def test_summary_etag_distinguishes_category_case(client, headers, create_record):
+    create_record(1.0, 'Food', timeStamp=MAY_1)
+    create_record(2.0, 'food', timeStamp=MAY_1)
+    lower = client.get('/summary_pie?period=overall&category=food', headers=headers)
+    upper = client.get('/summary_pie?period=overall&category=Food', headers=headers)
+    assert lower.headers['ETag'] != upper.headers['ETag']
+    # period 不区分大小写，共用同一个缓存项
+    assert client.get('/summary?period=Overall', headers=headers).headers['ETag'] == \
+        client.get('/summary?period=overall', headers=headers).headers['ETag']
+
+
+def test_batch_keeps_rollups_consistent(app, client, headers, create_record):
+    create_record(10.0, '餐饮', timeStamp=MAY_1)
+    create_record(20.0, '交通', timeStamp=MAY_1)
+    first, second = sorted(_record_ids(client, headers))
+
+    response = client.post('/records/batch', json={"operations": [
+        {"op": "create", "amount": 1.25, "category": "购物", "type": "expense", "timeStamp": MAY_1 + DAY},
+        {"op": "update", "id": first, "amount": 3.0, "category": "交通"},
+        {"op": "delete", "id": second},
+    ]}, headers=headers)
+    assert response.status_code == 200, response.get_json()
+    result = response.get_json()
+    assert (result['created'], result['updated'], result['deleted']) == (1, 1, 1)
+    assert [(item['op'], item['id']) for item in result['results'][1:]] == [('update', first), ('delete', second)]
+
+    # 校验失败时整批不执行，汇总表不变
+    response = client.post('/records/batch', json={"operations": [
+        {"op": "update", "id": first, "amount": 100.0},
+        {"op": "delete", "id": 999},
+    ]}, headers=headers)
+    assert response.status_code == 400
+    assert response.get_json()['errors'] == [{"index": 1, "error": "记录未找到。"}]
+
+    with app.app_context():
+        assert find_rollup_mismatches() == []
+    assert _overall(client, headers)['total_expense'] == 4.25
+
+
+def test_batch_validation_errors(client, headers, create_record):
+    create_record(1.0)
+    record_id, = _record_ids(client, headers)
+    response = client.post('/records/batch', json={"operations": [
+        {"op": "move", "id": record_id},
+        {"op": "create", "amount": 1.0, "category": " ", "type": "expense"},
+        {"op": "update", "id": "1"},
+        {"op": "update", "id": record_id, "type": "gift"},
+        {"op": "delete", "id": record_id},
+    ]}, headers=headers)
+    assert response.status_code == 400
+    assert [item['index'] for item in response.get_json()['errors']] == [0, 1, 2, 3, 4]
+    assert client.post('/records/batch', json={"operations": []}, headers=headers).status_code == 400
+    assert _record_ids(client, headers) == [record_id]
+
+
+def test_filters_fields_and_sort(client, headers, create_record):
+    create_record(10.0, '餐饮', timeStamp=MAY_1, note='午饭 100%')
+    create_record(20.0, '交通', timeStamp=MAY_1 + DAY, note='地铁')
+    create_record(30.0, '工资', 'income', timeStamp=MAY_1 + 2 * DAY)
+    create_record(40.0, '餐饮', timeStamp=MAY_1 + 3 * DAY, note='晚饭')
+
+    def amounts(query):
+        response = client.get(f'/records?{query}', headers=headers)
+        assert response.status_code == 200, response.get_json()
+        return [record['amount'] for record in response.get_json()]
+
+    assert amounts('start_date=2024-05-02&end_date=2024-05-03') == [20.0, 30.0]
+    assert amounts('type=income') == [30.0]
+    assert amounts('category=餐饮,交通') == amounts('category=餐饮&category=交通') == [10.0, 20.0, 40.0]
+    assert amounts('min_amount=20&max_amount=30') == [20.0, 30.0]
+    # note 按字面子串匹配，% 不是通配符
+    assert amounts('note=饭') == [10.0, 40.0]
+    assert amounts('note=0%25') == [10.0]
+    assert amounts('type=expense&sort=-amount') == [40.0, 20.0, 10.0]
+
+    records = client.get('/records?fields=amount,category&category=交通', headers=headers).get_json()
+    assert records == [{"amount": 20.0, "category": '交通'}]
+
+    for query in ('start_date=2024-13-01', 'type=gift', 'min_amount=abc', 'sort=note', 'fields=id,password'):
+        response = client.get(f'/records?{query}', headers=headers)
+        assert response.status_code == 400, query
+        assert 'error' in response.get_json()
+
+
+def test_update_keeps_rollups_consistent(app, client, headers, create_record):
+    create_record(10.0, '餐饮', timeStamp=MAY_1)
+    create_record(20.0, '交通', timeStamp=MAY_1)
+    first, second = sorted(_record_ids(client, headers))
+
+    # 修改金额、类别、类型和日期，旧分组减去、新分组加上
+    assert client.put(f'/records/{first}', json={"amount": 5.5}, headers=headers).status_code == 200
+    assert client.put(f'/records/{second}', json={"category": "餐饮", "type": "income",
+                                                   "timeStamp": MAY_1 + DAY}, headers=headers).status_code == 200
+    assert client.put('/records/999', json={"amount": 1.0}, headers=headers).status_code == 404
+
+    with app.app_context():
+        assert find_rollup_mismatches() == []
+    summary = _overall(client, headers)
+    assert summary['total_expense'] == 5.5
+    assert summary['total_income'] == 20.0
+
+
+def _statements(app):
+    """记录之后执行的 SQL 语句。"""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement.split(None, 2)[:2])
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', capture)
+    return statements
+
+
+def _data_version(app):
+    with app.app_context():
+        return db.session.execute(db.select(User.data_version).filter_by(username='tester')).scalar_one()
+
+
+def test_writes_lock_user_before_record(app, client, headers, create_record):
+    create_record(1.0)
+    record_id, = _record_ids(client, headers)
+    statements = _statements(app)
+    for method, url, body in (('put', f'/records/{record_id}', {"amount": 2.0}),
+                              ('delete', f'/records/{record_id}', None)):
+        statements.clear()
+        assert getattr(client, method)(url, json=body, headers=headers).status_code == 200
+        writes = [words for words in statements if words[0] in ('UPDATE', 'DELETE', 'INSERT')]
+        # 第一条写语句是给用户行加版本号（同时加锁），之后才修改记录表
+        assert writes[0] == ['UPDATE', 'user'], (method, writes)
+
+
+def test_missing_record_leaves_data_version(app, client, headers, create_record):
+    create_record(1.0)
+    version = _data_version(app)
+    assert client.delete('/records/999', headers=headers).status_code == 404
+    assert client.put('/records/999', json={"note": "x"}, headers=headers).status_code == 404
+    assert _data_version(app) == version
+
+
+def test_update_rejects_invalid_fields(app, client, headers, create_record):
+    create_record(1.0)
+    record_id, = _record_ids(client, headers)
+    version = _data_version(app)
+    for body in ({"amount": "abc"}, {"amount": None}, {"type": "gift"}, {"category": " "},
+                 {"timeStamp": "today"}, [1, 2]):
+        response = client.put(f'/records/{record_id}', json=body, headers=headers)
+        assert response.status_code == 400, body
+        assert 'error' in response.get_json()
+    assert _data_version(app) == version
+    assert client.get('/records', headers=headers).get_json()[0]['amount'] == 1.0
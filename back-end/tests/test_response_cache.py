@@ -0,0 +1,69 @@
+# tests/test_response_cache.py
+
+from app.response_cache import RedisCacheBackend, get_response_cache
+
+SUMMARY = '/summary?period=overall'
+
+
+class FakeRedis:
+    """只实现 RedisCacheBackend 用到的 get 和 set(ex=)。"""
+
+    def __init__(self):
+        self.values = {}
+        self.expiry = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value, ex=None):
+        self.values[key] = value
+        self.expiry[key] = ex
+
+
+def test_etag_revalidation(client, headers, create_record):
+    create_record(10.0)
+    first = client.get(SUMMARY, headers=headers)
+    etag = first.headers['ETag']
+    assert first.headers['Cache-Control'] == 'private, no-cache'
+
+    revalidated = client.get(SUMMARY, headers={**headers, 'If-None-Match': etag})
+    assert revalidated.status_code == 304
+    assert revalidated.data == b''
+    # 参数顺序和 period 的大小写不影响 ETag
+    assert client.get('/summary?period=Overall', headers={**headers, 'If-None-Match': etag}).status_code == 304
+
+    create_record(5.0)
+    changed = client.get(SUMMARY, headers={**headers, 'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+    assert changed.get_json()['summary'][0]['total_expense'] == 15.0
+
+
+def test_lru_backend_serves_repeated_requests(app, client, headers, create_record):
+    create_record(10.0)
+    bodies = [client.get(SUMMARY, headers=headers).data for _ in range(3)]
+    assert bodies[0] == bodies[1] == bodies[2]
+    with app.app_context():
+        stats = get_response_cache().stats()
+    assert (stats['hits'], stats['misses']) == (2, 1)
+
+
+def test_redis_backend(app, client, headers, create_record):
+    fake = FakeRedis()
+    app.extensions['response_cache'] = RedisCacheBackend(client=fake, ttl=120)
+    create_record(10.0)
+
+    first = client.get(SUMMARY, headers=headers)
+    assert len(fake.values) == 1
+    key, = fake.values
+    assert key.startswith('response:') and fake.expiry[key] == 120
+
+    # 第二次请求直接返回 Redis 中的响应体
+    fake.values[key] = fake.values[key].replace(b'10.0', b'99.0')
+    assert client.get(SUMMARY, headers=headers).get_json()['summary'][0]['total_expense'] == 99.0
+
+    # 写入后版本号变化，旧条目不再命中
+    create_record(5.0)
+    assert client.get(SUMMARY, headers=headers).get_json()['summary'][0]['total_expense'] == 15.0
+    assert len(fake.values) == 2
+    assert first.headers['ETag'] != client.get(SUMMARY, headers=headers).headers['ETag']
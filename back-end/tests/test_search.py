@@ -0,0 +1,70 @@
+# tests/test_search.py
+
+from app import search
+from app.search import LikeSearchBackend, tsquery_literal, tsvector_literal, _query_phrases
+
+
+def _notes(client, headers, query):
+    response = client.get(f'/records/search?q={query}', headers=headers)
+    assert response.status_code == 200, response.get_json()
+    return [record['note'] for record in response.get_json()['records']]
+
+
+def test_search_matches_substrings(client, headers, create_record):
+    create_record(note='午饭 Lunch')
+    create_record(note='去吃午饭的地铁', category='交通')
+    create_record(note='100% 充值', category='通讯')
+    assert _notes(client, headers, '饭') == ['去吃午饭的地铁', '午饭 Lunch']
+    assert _notes(client, headers, 'LUNCH') == ['午饭 Lunch']
+    assert _notes(client, headers, '吃午 交通') == ['去吃午饭的地铁']
+    assert _notes(client, headers, '0%') == ['100% 充值']
+    # 短语不跨越备注和类别两列
+    assert _notes(client, headers, '铁交') == []
+
+    client.post('/register', json={"username": "other", "password": "other"})
+    token = client.post('/login', json={"username": "other", "password": "other"}).get_json()['token']
+    assert _notes(client, {"Authorization": token}, '饭') == []
+
+
+def test_search_ranking_and_window(app, client, headers, create_record):
+    create_record(category='午饭', note='公司')
+    create_record(note='午饭')
+    create_record(note='午饭 午饭 午饭')
+    create_record(note='没有关系')
+    # 类别命中的权重高于备注，词频高的排在前面
+    assert _notes(client, headers, '午饭') == ['公司', '午饭 午饭 午饭', '午饭']
+
+    # 窗口外的较早匹配按录入时间倒序排在窗口之后
+    app.config['SEARCH_RANK_WINDOW'] = 2
+    assert _notes(client, headers, '午饭') == ['午饭 午饭 午饭', '午饭', '公司']
+    response = client.get('/records/search?q=午饭&limit=1&offset=2', headers=headers).get_json()
+    assert [record['note'] for record in response['records']] == ['公司']
+    assert response['next_offset'] is None
+
+
+def test_index_follows_writes(client, headers, create_record):
+    create_record(note='午饭')
+    create_record(note='晚饭')
+    first, second = sorted(record['id'] for record in client.get('/records', headers=headers).get_json())
+    client.put(f'/records/{first}', json={"note": '早饭'}, headers=headers)
+    client.delete(f'/records/{second}', headers=headers)
+    assert _notes(client, headers, '饭') == ['早饭']
+    assert _notes(client, headers, '午饭') == []
+
+
+def test_fallback_without_index(client, headers, create_record, monkeypatch):
+    monkeypatch.setattr(search, 'SEARCH_BACKENDS', {})
+    create_record(note='午饭', timeStamp=1714537200000)
+    create_record(note='晚饭', timeStamp=1714537200000 - 86400000)
+    create_record(note='100%', category='午饭')
+    assert _notes(client, headers, '饭') == ['100%', '午饭', '晚饭']
+    assert _notes(client, headers, '午 100%') == ['100%']
+    with client.application.app_context():
+        assert isinstance(search.get_search_backend(), LikeSearchBackend)
+
+
+def test_postgres_literals():
+    assert tsvector_literal(5, "午饭 it's", '餐饮') == \
+        "'#5' '午饭':1B '饭':2B 'it':3B 't':4B 's':5B '餐饮':7A '饮':8A"
+    assert tsquery_literal(5, _query_phrases('午饭 l 餐饮a')) == \
+        "'#5' & '午饭' & 'l':* & ('餐饮' <-> '饮a')"
@@ -0,0 +1,104 @@
+# tests/test_upload.py
+
+import io
+import pandas as pd
+
+HEADER = '时间,类别,金额,类型,备注\n'
+ROW = '2024/05/01 10:00,交通,3,支出,地铁\n'
+
+
+def _csv(*rows):
+    return (HEADER + ''.join(rows)).encode('utf-8-sig')
+
+
+def _upload(client, headers, content, filename='records.csv', url='/upload'):
+    return client.post(url, data={'file': (io.BytesIO(content), filename)}, headers=headers)
+
+
+def test_upload_reports_rejected_rows(client, headers):
+    content = _csv(
+        '2024-05-01 09:00,工资,5000,收入,五月工资\n',
+        '2024/05/02 12:30,餐饮,abc,支出,午饭\n',
+        '2024/05/03 12:30,,20,支出,\n',
+        '2024/05/04 12:30,餐饮,20,转账,\n',
+        '05-05 12:30,餐饮,20,支出,\n',
+        ',餐饮,,支出,\n',
+        '2024/05/06 08:00,交通,2.5,支出,\n',
+    )
+    response = _upload(client, headers, content)
+    assert response.status_code == 200, response.get_json()
+    result = response.get_json()
+    assert result['imported_records'] == 2
+    assert result['rejected_count'] == 5
+    assert result['rejected_rows'] == [
+        {"row": 3, "error": "无效的金额：abc"},
+        {"row": 4, "error": "类别不能为空：空"},
+        {"row": 5, "error": "无效的类型：转账"},
+        {"row": 6, "error": "无效的时间：05-05 12:30"},
+        # 空单元格显示为“空”，而不是 nan
+        {"row": 7, "error": "无效的金额：空"},
+    ]
+
+    records = client.get('/records', headers=headers).get_json()
+    assert [(r['date'], r['category'], r['amount'], r['type'], r['note']) for r in records] == [
+        ('2024-05-01 09:00', '工资', 5000.0, 'income', '五月工资'),
+        ('2024-05-06 08:00', '交通', 2.5, 'expense', None),
+    ]
+
+
+def test_upload_excel(client, headers):
+    buffer = io.BytesIO()
+    pd.DataFrame({'时间': ['2024/05/01 10:00', '2024/05/02 11:00'], '类别': ['餐饮', '交通'],
+                  '金额': [12.5, 'x'], '类型': ['支出', '支出'], '备注': ['午饭', None]}).to_excel(buffer, index=False)
+    result = _upload(client, headers, buffer.getvalue(), 'records.xlsx').get_json()
+    assert (result['imported_records'], result['rejected_rows']) == (1, [{"row": 3, "error": "无效的金额：x"}])
+
+
+def test_upload_missing_columns(client, headers):
+    response = _upload(client, headers, '时间,金额\n2024/05/01 10:00,3\n'.encode('utf-8'))
+    assert response.status_code == 400
+    assert '缺少列' in response.get_json()['error']
+
+
+def test_unreadable_files_are_client_errors(client, headers):
+    for content, filename in ((b'', 'empty.csv'), (b'', 'empty.ndjson'), (b'', 'empty.xlsx'),
+                              ('时间,类别,金额,类型,备注\n2024/05/01 10:00,餐饮,3,支出,午饭\n'.encode('gbk'), 'gbk.csv')):
+        response = _upload(client, headers, content, filename)
+        assert response.status_code == 400, filename
+    assert '编码' in response.get_json()['error']
+
+
+def test_encoding_error_after_first_chunk_rolls_back(app, client, headers):
+    # 编码错误出现在读取若干块之后，已插入的块整体回滚
+    app.config['IMPORT_CHUNK_SIZE'] = 5000
+    rows = ''.join(f'2024/05/01 10:00,交通,{i},支出,地铁\n' for i in range(20000))
+    content = _csv(rows) + '2024/05/02 10:00,餐饮,3,支出,午饭\n'.encode('gbk')
+    assert _upload(client, headers, content).status_code == 400
+    assert client.get('/records', headers=headers).get_json() == []
+
+
+def test_identical_rows_in_one_file_are_kept(app, client, headers):
+    # 分块边界落在相同行之间，序号需跨块累计
+    app.config['IMPORT_CHUNK_SIZE'] = 2
+    result = _upload(client, headers, _csv(ROW * 3)).get_json()
+    assert (result['imported_records'], result['duplicate_records']) == (3, 0)
+
+    # 再次导入时已有的三行判为重复，多出的第四行和新的一行导入
+    result = _upload(client, headers, _csv(ROW * 4, '2024/05/01 11:00,交通,3,支出,地铁\n'), 'more.csv').get_json()
+    assert (result['imported_records'], result['duplicate_records']) == (2, 3)
+
+
+def test_rows_without_time_deduplicate_on_reimport(client, headers):
+    content = _csv(',餐饮,12,支出,午饭\n', ',餐饮,12,支出,午饭\n')
+    assert _upload(client, headers, content).get_json()['imported_records'] == 2
+    # 文件哈希不同（多了一个空格），逐行指纹仍判为重复
+    result = _upload(client, headers, content + b' ', 'again.csv').get_json()
+    assert (result['imported_records'], result['duplicate_records']) == (0, 2)
+
+
+def test_out_of_range_amounts_are_rejected(client, headers):
+    content = _csv('2024-05-01 09:00,工资,1e20,收入,\n', '2024-05-01 09:00,工资,-inf,收入,\n', ROW)
+    result = _upload(client, headers, content).get_json()
+    assert result['imported_records'] == 1
+    assert result['rejected_rows'] == [{"row": 2, "error": "无效的金额：1e20"},
+                                       {"row": 3, "error": "无效的金额：-inf"}]
@@ -0,0 +1,12 @@
+# wsgi.py
+"""
+生产环境的 WSGI 入口，供 gunicorn 等服务器加载：
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+开发时仍可使用 python run.py 启动带调试和自动重载的开发服务器。
+"""
+
+from app import create_app
+
+app = create_app()